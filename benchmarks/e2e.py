@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""End-to-end agent run benchmark against local fixture sites.
+
+Serves benchmarks/fixtures from an in-process HTTP server and drives run_browser_task
+with a scripted chat model, so runs are reproducible and need no network or API key.
+Requires the Playwright Chromium build (`playwright install chromium`).
+
+Reports per fixture: cold and warm run latency, live view frames per second, log events
+per second, peak RSS and the size of the MCP response the run would produce.
+
+Usage:
+    python -m benchmarks.e2e [--fixtures forms,spa] [--runs 3] [--llm-latency 0.0]
+                             [--save results.json] [--compare baseline.json --tolerance 0.25]
+
+Reference run (--runs 2, headless Chromium, single CPU):
+
+    fixture          cold s  warm s    fps  logs/s  console  network  payload KB  rss MB
+    forms             17.57   19.58   12.9     4.2       22        0       306.4     115
+    spa               28.88   24.62   10.7    12.4       42      108       276.0     120
+    console_storm     30.27   24.75   12.2   180.6     1000        0       166.2     133
+    iframes           26.38   24.97    6.4     6.5       46       48       224.4     134
+
+Most of each step is browser-use's page settle wait (about 1.5-2 s), and run-to-run
+noise on a loaded machine is large (the same forms run took 12-33 s), so compare
+against a baseline saved on the same machine rather than against these numbers.
+"""
+
+import os
+
+# Keep runs offline and quiet before browser_use is imported
+os.environ.setdefault("ANONYMIZED_TELEMETRY", "false")
+
+import argparse
+import asyncio
+import json
+import resource
+import statistics
+import sys
+import time
+from typing import Any, Dict, List
+
+from benchmarks.fixture_server import FixtureServer
+from benchmarks.scripted_llm import ScriptedChatModel
+
+DEFAULT_DASHBOARD_PORT = 5019
+
+def fixture_scripts(server: FixtureServer) -> Dict[str, List[List[Dict[str, Any]]]]:
+    """Action scripts per fixture; each inner list is one agent step."""
+    return {
+        "forms": [
+            [{"go_to_url": {"url": server.url("forms.html")}}],
+            [{"send_keys": {"keys": "Jane Doe"}}],
+            [{"scroll_down": {}}],
+            [{"scroll_down": {}}],
+        ],
+        "spa": [
+            [{"go_to_url": {"url": server.url("spa.html")}}],
+            [{"scroll_down": {}}],
+            [{"scroll_down": {}}],
+            [{"scroll_to_text": {"text": "Item 60"}}],
+        ],
+        "console_storm": [
+            [{"go_to_url": {"url": server.url("console_storm.html")}}],
+            [{"wait": {"seconds": 2}}],
+            [{"scroll_down": {}}],
+        ],
+        "iframes": [
+            [{"go_to_url": {"url": server.url("iframes.html")}}],
+            [{"wait": {"seconds": 1}}],
+            [{"scroll_down": {}}],
+        ],
+    }
+
+def _out(message: str = "") -> None:
+    # The log server thread points sys.stdout at devnull, so write to the real stdout
+    print(message, file=sys.__stdout__, flush=True)
+
+def _peak_rss_mb() -> Dict[str, float]:
+    # ru_maxrss is in KiB on Linux; children covers browser processes that have exited
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+    }
+
+def _mcp_payload_bytes(result: Dict[str, Any], url: str, task: str) -> int:
+    """Size of the text and images handle_web_evaluation would return for this run."""
+    from webEvalAgent.src.browser_utils import console_groups, console_log_storage, network_request_storage
+    from webEvalAgent.src.tool_handlers import format_agent_result
+
+    text = format_agent_result(result.get("result", ""), url, task, console_log_storage, network_request_storage, result.get("timings"),
+                               history=result.get("history"), console_groups=console_groups)
+    images = sum(len(s.get("screenshot", "")) for s in result.get("screenshots", []))
+    return len(text.encode("utf-8")) + images
+
+async def run_once(name: str, script: List[List[Dict[str, Any]]], server: FixtureServer, llm_latency: float, headless: bool) -> Dict[str, Any]:
+    from webEvalAgent.src import log_server
+    from webEvalAgent.src.browser_utils import console_log_storage, network_request_storage, run_browser_task
+
+    llm = ScriptedChatModel(script=script, latency=llm_latency)
+    task = f"Benchmark fixture '{name}'"
+    log_server.reset_event_counters()
+
+    started = time.perf_counter()
+    result = await run_browser_task(task, tool_call_id=f"bench-{name}", headless=headless, llm=llm)
+    elapsed = time.perf_counter() - started
+
+    counts = dict(log_server.event_counts)
+    return {
+        "ok": not str(result.get("result", "")).startswith("Error"),
+        "error": None if not str(result.get("result", "")).startswith("Error") else str(result["result"])[:500],
+        "seconds": elapsed,
+        "steps": llm.calls,
+        "frames_per_second": counts.get("browser_update", 0) / elapsed if elapsed else 0.0,
+        "log_events_per_second": counts.get("log_message", 0) / elapsed if elapsed else 0.0,
+        "console_logs": len(console_log_storage),
+        "network_requests": len(network_request_storage),
+        "emitted_bytes": sum(log_server.event_bytes.values()),
+        "mcp_payload_bytes": _mcp_payload_bytes(result, server.url(f"{name}.html"), task),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+def summarize(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    warm = runs[1:] or runs
+    return {
+        "cold_seconds": runs[0]["seconds"],
+        "warm_seconds": statistics.median(r["seconds"] for r in warm),
+        "frames_per_second": statistics.median(r["frames_per_second"] for r in runs),
+        "log_events_per_second": statistics.median(r["log_events_per_second"] for r in runs),
+        "console_logs": runs[-1]["console_logs"],
+        "network_requests": runs[-1]["network_requests"],
+        "emitted_bytes": runs[-1]["emitted_bytes"],
+        "mcp_payload_bytes": runs[-1]["mcp_payload_bytes"],
+        "peak_rss_mb": runs[-1]["peak_rss_mb"],
+    }
+
+def compare(results: Dict[str, Any], baseline_path: str, tolerance: float) -> List[str]:
+    """Return regressions of warm latency and payload size against a saved baseline."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)["fixtures"]
+    regressions = []
+    for name, summary in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        for metric in ("warm_seconds", "mcp_payload_bytes"):
+            if before[metric] and summary[metric] > before[metric] * (1 + tolerance):
+                regressions.append(f"{name}: {metric} {summary[metric]:.2f} vs baseline {before[metric]:.2f}")
+    return regressions
+
+async def main_async(args) -> int:
+    from webEvalAgent.src.log_server import start_log_server
+
+    start_log_server(port=args.dashboard_port)
+    results: Dict[str, Any] = {}
+    failures = []
+
+    with FixtureServer() as server:
+        scripts = fixture_scripts(server)
+        names = [n for n in args.fixtures.split(",") if n] if args.fixtures else list(scripts)
+        for name in names:
+            if name not in scripts:
+                failures.append(f"unknown fixture {name!r} (choose from {', '.join(scripts)})")
+                continue
+            runs = []
+            for i in range(args.runs):
+                run = await run_once(name, scripts[name], server, args.llm_latency, not args.headed)
+                if not run["ok"]:
+                    failures.append(f"{name} run {i + 1} failed: {run['error']}")
+                    break
+                runs.append(run)
+                _out(f"  {name} run {i + 1}: {run['seconds']:.2f}s, {run['steps']} model calls")
+            if runs:
+                results[name] = summarize(runs)
+
+    _out()
+    _out(f"{'fixture':<15}{'cold s':>8}{'warm s':>8}{'fps':>7}{'logs/s':>8}{'console':>9}{'network':>9}{'payload KB':>12}{'rss MB':>8}")
+    for name, s in results.items():
+        _out(f"{name:<15}{s['cold_seconds']:>8.2f}{s['warm_seconds']:>8.2f}{s['frames_per_second']:>7.1f}"
+             f"{s['log_events_per_second']:>8.1f}{s['console_logs']:>9}{s['network_requests']:>9}"
+             f"{s['mcp_payload_bytes'] / 1024:>12.1f}{s['peak_rss_mb']['self']:>8.0f}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"runs": args.runs, "llm_latency": args.llm_latency, "fixtures": results}, f, indent=2)
+        _out(f"Saved results to {args.save}")
+    if args.compare:
+        failures.extend(compare(results, args.compare, args.tolerance))
+
+    for failure in failures:
+        _out(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fixtures", default="", help="Comma-separated fixture names (default: all)")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per fixture; the first is reported as cold")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Simulated model response time in seconds")
+    parser.add_argument("--headed", action="store_true", help="Run the browser with a visible window")
+    parser.add_argument("--dashboard-port", type=int, default=DEFAULT_DASHBOARD_PORT, help="Port for the benchmark's log server")
+    parser.add_argument("--save", help="Write the results as JSON to this path")
+    parser.add_argument("--compare", help="Baseline JSON from --save to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression against the baseline")
+    args = parser.parse_args()
+    args.runs = max(1, args.runs)
+    return asyncio.run(main_async(args))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""In-process HTTP server for the benchmark fixture sites in benchmarks/fixtures."""
+
+import json
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+class FixtureRequestHandler(SimpleHTTPRequestHandler):
+    """Serves the fixture pages plus the small JSON API the SPA fixture talks to."""
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output clean
+
+    def _send_json(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        if parsed.path == "/api/items":
+            page = int(parse_qs(parsed.query).get("page", ["0"])[0])
+            items = [{"id": page * 20 + i, "title": f"Item {page * 20 + i}"} for i in range(20)]
+            return self._send_json(200, {"page": page, "items": items})
+        if parsed.path == "/api/status":
+            return self._send_json(200, {"ok": True})
+        if parsed.path == "/api/fail":
+            return self._send_json(500, {"error": "Internal Server Error"})
+        return super().do_GET()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        return self._send_json(200, {"saved": True})
+
+class FixtureServer:
+    """Serve benchmarks/fixtures on an ephemeral localhost port from a background thread."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        handler = partial(FixtureRequestHandler, directory=str(FIXTURES_DIR))
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fixture-server", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, path: str) -> str:
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def start(self) -> "FixtureServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "FixtureServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Import-time budget check for the MCP server entry point.
+
+Runs `python -X importtime -c "import webEvalAgent.mcp_server"` in a fresh interpreter,
+reports the slowest imports and fails when the cumulative import time exceeds the budget
+or when one of the heavy stacks that should load on first tool invocation is imported eagerly.
+
+Usage:
+    python -m benchmarks.import_time [--budget-ms 800] [--runs 3] [--top 15]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+TARGET_MODULE = "webEvalAgent.mcp_server"
+
+# Top-level packages that must not be imported before the first tool call
+DEFERRED_MODULES = (
+    "browser_use",
+    "langchain_anthropic",
+    "playwright",
+    "flask",
+    "flask_socketio",
+    "requests",
+)
+
+DEFAULT_BUDGET_MS = 800
+
+def run_importtime(module: str) -> List[Tuple[int, int, str]]:
+    """Import a module in a fresh interpreter and parse the -X importtime report.
+
+    Args:
+        module: Dotted name of the module to import
+
+    Returns:
+        List[Tuple[int, int, str]]: (self_us, cumulative_us, name) for every imported module
+    """
+    env = dict(os.environ)
+    # Keep the measurement about imports, not about the pre-warm thread or telemetry
+    env["OPERATIVE_PREWARM"] = "0"
+    env["ANONYMIZED_TELEMETRY"] = "false"
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env, check=False,
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{process.stderr[-2000:]}")
+
+    entries = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            self_us, cumulative_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue  # Header line
+        entries.append((self_us, cumulative_us, parts[2].strip()))
+    return entries
+
+def measure(runs: int) -> Tuple[int, List[Tuple[int, int, str]]]:
+    """Return the best cumulative import time of the target over several runs, with its report."""
+    best_us, best_entries = None, []
+    for _ in range(runs):
+        entries = run_importtime(TARGET_MODULE)
+        total_us = next((cumulative for _, cumulative, name in entries if name == TARGET_MODULE), 0)
+        if best_us is None or total_us < best_us:
+            best_us, best_entries = total_us, entries
+    return best_us or 0, best_entries
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=float(os.environ.get("OPERATIVE_IMPORT_BUDGET_MS", DEFAULT_BUDGET_MS)),
+                        help="Maximum cumulative import time of the MCP server module")
+    parser.add_argument("--runs", type=int, default=3, help="Number of fresh interpreters to measure (best is kept)")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to list")
+    args = parser.parse_args()
+
+    total_us, entries = measure(max(1, args.runs))
+    imported: Dict[str, int] = {name: cumulative for _, cumulative, name in entries}
+
+    print(f"{TARGET_MODULE}: {total_us / 1000:.1f} ms cumulative (budget {args.budget_ms:.0f} ms)")
+    print("Slowest imports:")
+    for self_us, cumulative_us, name in sorted(entries, key=lambda e: e[1], reverse=True)[:args.top]:
+        print(f"  {cumulative_us / 1000:9.1f} ms  {name}")
+
+    failures = []
+    if total_us / 1000 > args.budget_ms:
+        failures.append(f"import time {total_us / 1000:.1f} ms exceeds budget of {args.budget_ms:.0f} ms")
+    for module in DEFERRED_MODULES:
+        if module in imported:
+            failures.append(f"{module} is imported eagerly ({imported[module] / 1000:.1f} ms)")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print("OK")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""Fan-out benchmark for the log server backends.
+
+Starts the log server in-process, connects N raw Socket.IO (Engine.IO v4 websocket)
+clients, then emits live view frames and log lines at fixed rates for a while. Reports
+what each client actually received: frames and logs per second, delivery latency and
+the server's RSS. "sent/s" is the rate the emitting thread achieved; a blocking backend
+slows the agent down instead of dropping events. The clients run in the same process,
+so absolute latencies include their share of the GIL.
+
+Usage:
+    python -m benchmarks.log_server_fanout [--backend threading|asgi|both] [--clients 8]
+                                           [--seconds 10] [--fps 10] [--logs-per-second 200]
+                                           [--frame-kb 60]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+
+# Keep runs offline and quiet before browser_use is imported
+os.environ.setdefault("ANONYMIZED_TELEMETRY", "false")
+
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+DEFAULT_PORT = 5029
+
+def _out(message: str = "") -> None:
+    # The log server thread points sys.stdout at devnull, so write to the real stdout
+    print(message, file=sys.__stdout__, flush=True)
+
+class FanoutClient:
+    """Minimal Socket.IO client that counts received events and their delivery latency."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.connected = asyncio.Event()
+        self.rejected = False
+        self.frames = 0
+        self.logs = 0
+        self.bytes = 0
+        self.latencies: List[float] = []
+
+    async def run(self, stop: asyncio.Event) -> None:
+        import websockets
+
+        try:
+            async with websockets.connect(self.url, max_size=None) as ws:
+                reader = asyncio.create_task(self._read(ws))
+                await ws.send("40")  # Connect to the default namespace
+                await stop.wait()
+                reader.cancel()
+        except Exception:
+            self.rejected = True
+            self.connected.set()
+
+    async def _read(self, ws) -> None:
+        async for message in ws:
+            self.bytes += len(message)
+            if message == "2":
+                await ws.send("3")  # Engine.IO ping/pong
+            elif message.startswith("40"):
+                self.connected.set()
+            elif message.startswith("44"):
+                self.rejected = True  # Namespace connection refused (client limit)
+                self.connected.set()
+            elif message.startswith("42"):
+                event, data = json.loads(message[2:])[:2]
+                if event == "browser_update":
+                    self.frames += 1
+                elif event == "log_message" and "t=" in data.get("data", ""):
+                    self.logs += 1
+                    sent_at = data.get("data", "").rsplit("t=", 1)[-1]
+                    try:
+                        self.latencies.append(time.time() - float(sent_at))
+                    except ValueError:
+                        pass
+
+def _produce(seconds: float, fps: float, logs_per_second: float, frame_kb: int) -> Dict[str, int]:
+    """Emit frames and log lines at fixed rates from a plain thread, like the agent does."""
+    from webEvalAgent.src.log_server import send_browser_view, send_log
+
+    frame = "data:image/jpeg;base64," + "A" * (frame_kb * 1024)
+    loop = asyncio.new_event_loop()
+    sent = {"frames": 0, "logs": 0}
+    start = time.perf_counter()
+    next_frame = next_log = start
+    try:
+        while (now := time.perf_counter()) - start < seconds:
+            if fps and now >= next_frame:
+                loop.run_until_complete(send_browser_view(frame))
+                sent["frames"] += 1
+                next_frame += 1 / fps
+            if logs_per_second and now >= next_log:
+                send_log(f"benchmark log line t={time.time()}", "🧪", log_type='status')
+                sent["logs"] += 1
+                next_log += 1 / logs_per_second
+            time.sleep(max(0.0, min(next_frame, next_log) - time.perf_counter()))
+    finally:
+        loop.close()
+    return sent
+
+async def _wait_for_port(port: int, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Log server did not start on port {port}")
+            await asyncio.sleep(0.1)
+
+async def run_backend(args) -> Dict[str, Any]:
+    from webEvalAgent.src import log_server
+    # send_browser_view imports browser_utils on first use; keep that out of the measurement
+    import webEvalAgent.src.browser_utils  # noqa: F401
+
+    log_server.start_log_server(port=args.port)
+    url = f"ws://127.0.0.1:{args.port}/socket.io/?EIO=4&transport=websocket"
+
+    await _wait_for_port(args.port)
+
+    clients = [FanoutClient(url) for _ in range(args.clients)]
+    stop = asyncio.Event()
+    tasks = []
+    for client in clients:
+        tasks.append(asyncio.create_task(client.run(stop)))
+        try:
+            await asyncio.wait_for(client.connected.wait(), timeout=5)
+        except asyncio.TimeoutError:
+            client.rejected = True
+
+    accepted = [c for c in clients if not c.rejected]
+    started = time.perf_counter()
+    sent = await asyncio.to_thread(_produce, args.seconds, args.fps, args.logs_per_second, args.frame_kb)
+    await asyncio.sleep(1.0)  # Let in-flight events arrive
+    elapsed = min(time.perf_counter() - started, args.seconds)
+
+    stop.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    shutdown_started = time.perf_counter()
+    stopped = log_server.stop_log_server()
+    shutdown_seconds = time.perf_counter() - shutdown_started
+
+    latencies = sorted(l for c in accepted for l in c.latencies)
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0.0
+
+    return {
+        "backend": log_server.get_log_server_backend(),
+        "clients": len(accepted),
+        "rejected": len(clients) - len(accepted),
+        "sent_frames": sent["frames"],
+        "sent_logs": sent["logs"],
+        "sent_per_second": (sent["frames"] + sent["logs"]) / args.seconds,
+        "frames_per_second": statistics.mean(c.frames / elapsed for c in accepted) if accepted else 0.0,
+        "logs_per_second": statistics.mean(c.logs / elapsed for c in accepted) if accepted else 0.0,
+        "delivered_ratio": (sum(c.frames + c.logs for c in accepted) / ((sent["frames"] + sent["logs"]) * len(accepted))) if accepted else 0.0,
+        "latency_p50_ms": percentile(0.5),
+        "latency_p99_ms": percentile(0.99),
+        "shutdown_seconds": shutdown_seconds,
+        "stopped": stopped,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+def _print_table(results: List[Dict[str, Any]]) -> None:
+    _out(f"{'backend':<11}{'clients':>8}{'rej':>5}{'sent/s':>8}{'frames/s':>10}{'logs/s':>9}{'deliv':>7}{'p50 ms':>8}{'p99 ms':>8}{'stop s':>8}{'rss MB':>8}")
+    for r in results:
+        _out(f"{r['backend']:<11}{r['clients']:>8}{r['rejected']:>5}{r['sent_per_second']:>8.0f}{r['frames_per_second']:>10.1f}{r['logs_per_second']:>9.1f}"
+             f"{r['delivered_ratio'] * 100:>6.0f}%{r['latency_p50_ms']:>8.1f}{r['latency_p99_ms']:>8.1f}"
+             f"{r['shutdown_seconds']:>8.2f}{r['peak_rss_mb']:>8.0f}")
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", default="both", choices=["threading", "asgi", "both"])
+    parser.add_argument("--clients", type=int, default=8, help="Number of connected dashboard clients")
+    parser.add_argument("--seconds", type=float, default=10.0, help="How long to emit events")
+    parser.add_argument("--fps", type=float, default=10.0, help="Live view frames emitted per second")
+    parser.add_argument("--logs-per-second", type=float, default=200.0, help="Log lines emitted per second")
+    parser.add_argument("--frame-kb", type=int, default=60, help="Size of each emitted frame in KiB")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port for the benchmark's log server")
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON (used for --backend both)")
+    args = parser.parse_args()
+
+    if args.backend == "both":
+        # One process per backend: the log server is a per-process singleton
+        results = []
+        for backend in ("threading", "asgi"):
+            env = dict(os.environ, OPERATIVE_LOG_SERVER_BACKEND=backend)
+            argv = ["--clients", str(args.clients), "--seconds", str(args.seconds), "--fps", str(args.fps),
+                    "--logs-per-second", str(args.logs_per_second), "--frame-kb", str(args.frame_kb), "--port", str(args.port)]
+            process = subprocess.run([sys.executable, "-m", "benchmarks.log_server_fanout", "--backend", backend, "--json", *argv],
+                                     capture_output=True, text=True, env=env, check=False)
+            if process.returncode != 0:
+                _out(f"FAIL: {backend} backend:\n{process.stderr[-2000:]}")
+                return 1
+            results.append(json.loads(process.stdout.strip().splitlines()[-1]))
+        _print_table(results)
+        return 0
+
+    os.environ["OPERATIVE_LOG_SERVER_BACKEND"] = args.backend
+    result = asyncio.run(run_backend(args))
+    if args.json:
+        _out(json.dumps(result))
+    else:
+        _print_table([result])
+    return 0 if result["stopped"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Scripted stand-in for ChatAnthropic so agent runs are reproducible and offline."""
+
+import asyncio
+import json
+from typing import Any, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableLambda
+from pydantic import PrivateAttr
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Chat model that answers browser-use's structured-output calls from a fixed script.
+
+    Each entry of `script` is the list of actions for one agent step, e.g.
+    [{"go_to_url": {"url": "..."}}]. When the script runs out the model answers with
+    a successful `done` action. `latency` simulates model response time in seconds.
+    """
+
+    script: List[List[Dict[str, Any]]]
+    latency: float = 0.0
+    model_name: str = "scripted-benchmark-model"
+
+    _calls: int = PrivateAttr(default=0)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    @property
+    def calls(self) -> int:
+        return self._calls
+
+    def _next_actions(self) -> List[Dict[str, Any]]:
+        step = self._calls
+        self._calls += 1
+        if step < len(self.script):
+            return self.script[step]
+        return [{"done": {"text": "Scripted run complete", "success": True}}]
+
+    def _next_output(self, schema: Any) -> Dict[str, Any]:
+        actions = self._next_actions()
+        payload = {
+            "current_state": {
+                "evaluation_previous_goal": "Success",
+                "memory": f"Scripted step {self._calls}",
+                "next_goal": ", ".join(name for action in actions for name in action),
+            },
+            "action": actions,
+        }
+        parsed = schema.model_validate(payload) if hasattr(schema, "model_validate") else payload
+        raw = AIMessage(content=json.dumps(payload))
+        return {"raw": raw, "parsed": parsed, "parsing_error": None}
+
+    def with_structured_output(self, schema: Any, *, include_raw: bool = False, **kwargs: Any):
+        async def respond(_messages: Any) -> Any:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            output = self._next_output(schema)
+            return output if include_raw else output["parsed"]
+        return RunnableLambda(respond)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        # Plain (unstructured) calls, e.g. the extract_content action
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="Scripted response"))])
@@ -8,10 +8,10 @@ import uuid
 from enum import Enum
 import subprocess
 import json
+import threading
+from contextlib import redirect_stdout
 from pathlib import Path
-import requests
 
-from webEvalAgent.src.utils import stop_log_server
 import json
 import sys
 from typing import Any, Dict, List, Union
@@ -28,18 +28,9 @@ from mcp.types import TextContent
 # from mcp.server.tool import Tool, register_tool
 
 # Import our modules
-from webEvalAgent.src.browser_manager import PlaywrightBrowserManager
-# from webEvalAgent.src.browser_utils import cleanup_resources # Removed import
-from webEvalAgent.src.api_utils import validate_api_key
-from webEvalAgent.src.tool_handlers import handle_web_evaluation, handle_setup_browser_state
-
-# MCP server modules
-from webEvalAgent.src.browser_utils import handle_browser_input
-from webEvalAgent.src.log_server import start_log_server, open_log_dashboard
-
-# Stop any existing log server to avoid conflicts
-# This doesn't start a new server, just ensures none is running
-stop_log_server()
+# tool_handlers pulls in browser_use, langchain_anthropic, playwright and Flask, so it is
+# loaded on first tool invocation (or pre-warmed after the handshake) by _load_tool_handlers()
+from webEvalAgent.src.api_utils import validate_api_key, fetch_api_key_status, close_http_client
 
 # Create the MCP server
 mcp = FastMCP("Operative")
@@ -49,6 +40,39 @@ class BrowserTools(str, Enum):
     WEB_EVAL_AGENT = "web_eval_agent"
     SETUP_BROWSER_STATE = "setup_browser_state"  # Add new tool enum
 
+# Seconds to wait after the server starts before pre-warming the heavy imports.
+# Set OPERATIVE_PREWARM=0 to load them only on first tool invocation.
+PREWARM_DELAY_SECONDS = 2.0
+_tool_handlers_lock = threading.Lock()
+
+def _load_tool_handlers():
+    """Import the tool handlers and the browser/LLM stacks behind them on first use.
+
+    browser_use configures a stdout logging handler at import time, which would corrupt the
+    MCP stdio stream once the server is running, so the import is done with stdout pointed at
+    stderr. The lock keeps the pre-warm thread and a tool call from swapping sys.stdout concurrently.
+    """
+    with _tool_handlers_lock:
+        if "webEvalAgent.src.tool_handlers" not in sys.modules:
+            with redirect_stdout(sys.stderr):
+                import webEvalAgent.src.tool_handlers
+    return sys.modules["webEvalAgent.src.tool_handlers"]
+
+def _prewarm_tool_handlers():
+    """Load the heavy imports in a background thread once the MCP handshake had time to finish."""
+    if os.environ.get("OPERATIVE_PREWARM", "1").lower() in ("0", "false", "no"):
+        return
+
+    def prewarm():
+        threading.Event().wait(PREWARM_DELAY_SECONDS)
+        try:
+            _load_tool_handlers()
+            send_log("Browser and LLM modules pre-warmed.", "🔥")
+        except Exception as e:
+            send_log(f"Pre-warming tool modules failed, they will load on first use: {e}", "⚠️")
+
+    threading.Thread(target=prewarm, name="operative-prewarm", daemon=True).start()
+
 # Parse command line arguments (keeping the parser for potential future arguments)
 # parser = argparse.ArgumentParser(description='Run the MCP server with browser debugging capabilities')
 # args = parser.parse_args()
@@ -93,8 +117,113 @@ OPERATIVE_LOGO = """                                    $$$$
                                    $$$$$$                                   
 """
 
+PLAYWRIGHT_MARKER_FILE = CONFIG_DIR / "playwright_browsers.json"
+# Browsers the agent launches: headed runs use chromium, headless runs use the headless shell
+REQUIRED_PLAYWRIGHT_BROWSERS = ("chromium", "chromium-headless-shell")
+
+def _playwright_package_dir():
+    """Locate the installed playwright package without importing it."""
+    import importlib.util
+    spec = importlib.util.find_spec("playwright")
+    if spec is None or not spec.origin:
+        return None
+    return Path(spec.origin).parent
+
+def _playwright_browsers_dir(package_dir: Path) -> Path:
+    """Mirror Playwright's registry lookup for the browsers download directory."""
+    custom_path = os.environ.get("PLAYWRIGHT_BROWSERS_PATH")
+    if custom_path == "0":
+        return package_dir / "driver" / "package" / ".local-browsers"
+    if custom_path:
+        return Path(custom_path).expanduser()
+    if sys.platform == "darwin":
+        return Path.home() / "Library" / "Caches" / "ms-playwright"
+    if sys.platform.startswith("win"):
+        return Path(os.environ.get("LOCALAPPDATA", Path.home() / "AppData" / "Local")) / "ms-playwright"
+    return Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "ms-playwright"
+
+def _playwright_executable_path(browsers_dir: Path, name: str, revision: str) -> Path:
+    """Return the executable Playwright installs for a browser revision on this platform."""
+    if sys.platform == "darwin":
+        platform_dir, chromium_exe, shell_exe = "chrome-mac", "Chromium.app/Contents/MacOS/Chromium", "headless_shell"
+    elif sys.platform.startswith("win"):
+        platform_dir, chromium_exe, shell_exe = "chrome-win", "chrome.exe", "headless_shell.exe"
+    else:
+        platform_dir, chromium_exe, shell_exe = "chrome-linux", "chrome", "headless_shell"
+    if name == "chromium-headless-shell":
+        return browsers_dir / f"chromium_headless_shell-{revision}" / platform_dir / shell_exe
+    return browsers_dir / f"chromium-{revision}" / platform_dir / chromium_exe
+
+def _expected_playwright_browsers():
+    """Read the browser revisions the installed playwright package expects.
+
+    Returns:
+        dict: Mapping of browser name to {"revision", "executable_path"}, or None if unknown.
+    """
+    package_dir = _playwright_package_dir()
+    if package_dir is None:
+        return None
+    browsers_json = package_dir / "driver" / "package" / "browsers.json"
+    try:
+        browsers = json.loads(browsers_json.read_text()).get("browsers", [])
+    except (OSError, json.JSONDecodeError):
+        return None
+
+    browsers_dir = _playwright_browsers_dir(package_dir)
+    expected = {}
+    for browser in browsers:
+        name = browser.get("name")
+        if name in REQUIRED_PLAYWRIGHT_BROWSERS and browser.get("revision"):
+            revision = str(browser["revision"])
+            expected[name] = {
+                "revision": revision,
+                "executable_path": str(_playwright_executable_path(browsers_dir, name, revision)),
+            }
+    return expected or None
+
+def _playwright_marker_is_valid(expected) -> bool:
+    """Check the installation marker against the expected revisions and the filesystem."""
+    if not expected or not PLAYWRIGHT_MARKER_FILE.exists():
+        return False
+    try:
+        recorded = json.loads(PLAYWRIGHT_MARKER_FILE.read_text()).get("browsers", {})
+    except (OSError, json.JSONDecodeError):
+        return False
+    for name, info in expected.items():
+        entry = recorded.get(name) or {}
+        if entry.get("revision") != info["revision"] or entry.get("executable_path") != info["executable_path"]:
+            return False
+        if not Path(info["executable_path"]).exists():
+            return False
+    return True
+
+def _write_playwright_marker(expected) -> None:
+    """Record the installed browser revisions once the executables are present on disk."""
+    if not expected:
+        return
+    missing = [name for name, info in expected.items() if not Path(info["executable_path"]).exists()]
+    if missing:
+        send_log(f"{YELLOW}ℹ Playwright executables not found for {', '.join(missing)}; installation marker not written.{NC}", "⚠️")
+        return
+    try:
+        CONFIG_DIR.mkdir(parents=True, exist_ok=True)
+        PLAYWRIGHT_MARKER_FILE.write_text(json.dumps({"browsers": expected}, indent=2))
+    except OSError as e:
+        send_log(f"{YELLOW}ℹ Could not write Playwright installation marker {PLAYWRIGHT_MARKER_FILE}: {e}{NC}", "⚠️")
+
 def ensure_playwright_browsers():
-    """Checks and installs Playwright browsers if necessary."""
+    """Checks and installs Playwright browsers if necessary.
+
+    A marker under ~/.operative records the installed browser revisions and executable
+    paths, so repeated launches only pay for a filesystem check. The installer runs when
+    the marker is missing, points at another revision, or the executables are gone.
+    """
+    expected = _expected_playwright_browsers()
+    if _playwright_marker_is_valid(expected):
+        revisions = ", ".join(f"{name} r{info['revision']}" for name, info in expected.items())
+        send_log(f"{GREEN}✓ Playwright browsers already installed ({revisions}){NC}", "✅")
+        return
+
     try:
         send_log(f"{BOLD}Checking and installing Playwright browsers if necessary...{NC}", "🚀")
         # Using playwright's Python API to check/install is more robust if available.
@@ -103,6 +232,7 @@ def ensure_playwright_browsers():
         process = subprocess.run(["playwright", "install", "--with-deps"], capture_output=True, text=True, check=False, timeout=300)
         if process.returncode == 0:
             send_log(f"{GREEN}✓ Playwright browsers are installed successfully{NC}", "✅")
+            _write_playwright_marker(expected)
             if process.stdout:
                 send_log(f"Playwright install STDOUT: {process.stdout.strip()}", "⚙️")
             if process.stderr:
@@ -195,27 +325,29 @@ def _configure_cursor_mcp_json(agent_project_path: Path, api_key=None):
     return None, None
 
 def _validate_api_key_server_side(api_key_to_validate):
-    """Validates API key with the backend server."""
+    """Validates API key with the backend server and seeds the validation cache for tool calls."""
     send_log(f"{BOLD}Validating API key with Operative servers...{NC}", "➡️")
+    import httpx
+
+    async def _check():
+        try:
+            return await fetch_api_key_status(api_key_to_validate)
+        finally:
+            # The startup loop ends here; tool calls get a fresh client on the server's loop
+            await close_http_client()
+
     try:
-        response = requests.get(
-            "https://operative-backend.onrender.com/api/validate-key",
-            headers={"x-operative-api-key": api_key_to_validate},
-            timeout=15
-        )
-        response.raise_for_status()
-        data = response.json()
-        if data.get("valid"):
+        is_valid, message = asyncio.run(_check())
+        if is_valid:
             send_log(f"{GREEN}✓ API key validated successfully server-side.{NC}", "✅")
-            return True, data.get("message", "Valid")
+            return True, message
         else:
-            error_message = data.get("message", "Unknown validation error.")
-            send_log(f"{RED}✗ API key validation failed: {error_message}{NC}", "❌")
-            return False, error_message
-    except requests.exceptions.Timeout:
+            send_log(f"{RED}✗ API key validation failed: {message}{NC}", "❌")
+            return False, message
+    except httpx.TimeoutException:
         send_log(f"{RED}✗ API key validation timed out.{NC}", "❌")
         return False, "Connection to validation server timed out."
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         send_log(f"{RED}✗ Could not connect to validation server: {e}{NC}", "❌")
         return False, f"Could not connect to validation server: {e}"
     except json.JSONDecodeError:
@@ -330,7 +462,7 @@ def get_and_validate_api_key():
 
 
 @mcp.tool(name=BrowserTools.WEB_EVAL_AGENT)
-async def web_eval_agent(url: str, task: str, ctx: Context, headless_browser: bool = False) -> list[TextContent]:
+async def web_eval_agent(url: str, task: str, ctx: Context, headless_browser: bool = False, replay_actions: bool = False, output_format: str = "text") -> list[TextContent]:
     """Evaluate the user experience / interface of a web application.
 
     This tool allows the AI to assess the quality of user experience and interface design
@@ -347,6 +479,12 @@ async def web_eval_agent(url: str, task: str, ctx: Context, headless_browser: bo
              Be as detailed as possible in your task description. It could be anywhere from 2 sentences to 2 paragraphs.
         headless_browser: Optional. Whether to hide the browser window popup during evaluation.
         If headless_browser is True, only the operative control center browser will show, and no popup browser will be shown.
+        replay_actions: Optional. Re-run the actions saved from the last successful evaluation of this url and task
+            directly in the browser, without the AI agent. Falls back to a full agent run if an element can't be found.
+            Use this to quickly re-verify a known flow after a change.
+        output_format: Optional. "text" (default) for the readable report with inline screenshots, or "json" for a
+            compact JSON document with steps, success, console errors, failed requests, timings and screenshot ids
+            (screenshots are not inlined; view them in the dashboard gallery).
 
     Returns:
         list[list[TextContent, ImageContent]]: A detailed evaluation of the web application's UX/UI, including
@@ -365,8 +503,9 @@ async def web_eval_agent(url: str, task: str, ctx: Context, headless_browser: bo
     try:
         # Generate a new tool_call_id for this specific tool call
         tool_call_id = str(uuid.uuid4())
-        return await handle_web_evaluation(
-            {"url": url, "task": task, "headless": headless, "tool_call_id": tool_call_id},
+        tool_handlers = _load_tool_handlers()
+        return await tool_handlers.handle_web_evaluation(
+            {"url": url, "task": task, "headless": headless, "tool_call_id": tool_call_id, "replay_actions": replay_actions, "output_format": output_format},
             ctx,
             api_key # Pass the validated key
         )
@@ -440,7 +579,8 @@ async def setup_browser_state(url: str = None, ctx: Context = None) -> list[Text
         # Generate a new tool_call_id for this specific tool call
         tool_call_id = str(uuid.uuid4())
         send_log(f"Generated new tool_call_id for setup_browser_state: {tool_call_id}", "📝")
-        return await handle_setup_browser_state(
+        tool_handlers = _load_tool_handlers()
+        return await tool_handlers.handle_setup_browser_state(
             {"url": url, "tool_call_id": tool_call_id},
             ctx,
             api_key
@@ -522,6 +662,7 @@ def main():
             send_log(f"{BOLD}Found existing configuration. Using current settings.{NC}", "📝")
             
             send_log(f"{BOLD}API key validated. Starting MCP server...{NC}", "🛰️")
+            _prewarm_tool_handlers()
             # Run the FastMCP server
             mcp.run(transport='stdio')
 
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from playwright.async_api import async_playwright, Page as PlaywrightPage
+
+from browser_use.agent.views import ActionResult, AgentHistory, AgentHistoryList, StepMetadata
+from browser_use.browser.context import BrowserContext
+from browser_use.browser.views import BrowserStateHistory, TabInfo
+
+from .log_server import send_log, send_browser_view
+from .browser_state import load_persisted_state
+
+# Saved action scripts, one file per (url, task)
+ACTION_SCRIPTS_DIR = os.path.expanduser("~/.operative/action_scripts")
+ACTION_SCRIPT_VERSION = 1
+
+# How long to wait for a recorded element before falling back to the agent
+ELEMENT_TIMEOUT_MS = 5000
+NAVIGATION_TIMEOUT_MS = 30000
+
+# Actions that only read the page; replaying them is a no-op
+READ_ONLY_ACTIONS = {"extract_content", "get_dropdown_options"}
+
+class ElementNotFoundError(Exception):
+    """A recorded element could not be located on the page during replay."""
+
+def _script_path(url: str, task: str) -> str:
+    key = hashlib.sha256(f"{url.strip()}\n{task.strip()}".encode("utf-8")).hexdigest()[:32]
+    return os.path.join(ACTION_SCRIPTS_DIR, f"{key}.json")
+
+def _element_locator(element: Any) -> Optional[Dict[str, Any]]:
+    """Serialize the parts of an interacted DOM element needed to find it again."""
+    if element is None:
+        return None
+    css_selector = getattr(element, "css_selector", None)
+    if not css_selector:
+        try:
+            css_selector = BrowserContext._enhanced_css_selector_for_element(element)
+        except Exception:
+            css_selector = None
+    return {
+        "tag_name": element.tag_name,
+        "xpath": element.xpath,
+        "css_selector": css_selector,
+        "attributes": dict(element.attributes or {}),
+    }
+
+def save_action_script(url: str, task: str, history: AgentHistoryList) -> Optional[str]:
+    """
+    Save the successfully executed actions of an agent run as a replayable script.
+
+    Args:
+        url: The evaluated URL
+        task: The evaluation task
+        history: The agent history of a successful run
+
+    Returns:
+        Optional[str]: Path of the saved script, or None if the run had nothing to save
+    """
+    steps = []
+    for item in history.history:
+        if not item.model_output:
+            continue
+        actions = []
+        for action, element, result in zip(item.model_output.action, item.state.interacted_element, item.result):
+            if result.error:
+                continue
+            dumped = action.model_dump(exclude_none=True)
+            if not dumped:
+                continue
+            name, params = next(iter(dumped.items()))
+            actions.append({
+                "name": name,
+                "params": params or {},
+                "element": _element_locator(element),
+                "result": result.extracted_content,
+            })
+        if actions:
+            steps.append({"url": item.state.url, "actions": actions})
+
+    if not steps:
+        return None
+
+    path = _script_path(url, task)
+    os.makedirs(ACTION_SCRIPTS_DIR, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "version": ACTION_SCRIPT_VERSION,
+            "url": url,
+            "task": task,
+            "created_at": time.time(),
+            "steps": steps,
+        }, f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+def load_action_script(url: str, task: str) -> Optional[Dict[str, Any]]:
+    """Load the saved action script for a URL and task, if there is one."""
+    try:
+        with open(_script_path(url, task), "r", encoding="utf-8") as f:
+            script = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if script.get("version") != ACTION_SCRIPT_VERSION or not script.get("steps"):
+        return None
+    return script
+
+async def _locate(page: PlaywrightPage, element: Optional[Dict[str, Any]]):
+    """Find a recorded element by CSS selector, then by XPath."""
+    if not element:
+        raise ElementNotFoundError("No element was recorded for this action")
+    selectors = []
+    if element.get("css_selector"):
+        selectors.append(element["css_selector"])
+    if element.get("xpath"):
+        selectors.append(f"xpath=/{element['xpath'].lstrip('/')}")
+    for selector in selectors:
+        locator = page.locator(selector).first
+        try:
+            await locator.wait_for(state="attached", timeout=ELEMENT_TIMEOUT_MS / len(selectors))
+            return locator
+        except Exception:
+            continue
+    raise ElementNotFoundError(f"Element <{element.get('tag_name')}> not found ({element.get('xpath')})")
+
+async def _run_action(page: PlaywrightPage, action: Dict[str, Any]) -> PlaywrightPage:
+    """Execute one recorded action directly with Playwright; returns the active page."""
+    name, params = action["name"], action.get("params") or {}
+
+    if name == "go_to_url":
+        await page.goto(params["url"], timeout=NAVIGATION_TIMEOUT_MS)
+        await page.wait_for_load_state()
+    elif name == "open_tab":
+        page = await page.context.new_page()
+        await page.goto(params["url"], timeout=NAVIGATION_TIMEOUT_MS)
+        await page.wait_for_load_state()
+    elif name == "switch_tab":
+        page = page.context.pages[params["page_id"]]
+        await page.wait_for_load_state()
+    elif name == "go_back":
+        await page.go_back(timeout=NAVIGATION_TIMEOUT_MS)
+    elif name == "search_google":
+        await page.goto(f"https://www.google.com/search?q={params['query']}&udm=14", timeout=NAVIGATION_TIMEOUT_MS)
+    elif name == "click_element":
+        pages_before = len(page.context.pages)
+        locator = await _locate(page, action.get("element"))
+        await locator.click(timeout=ELEMENT_TIMEOUT_MS)
+        if len(page.context.pages) > pages_before:
+            page = page.context.pages[-1]
+        await page.wait_for_load_state()
+    elif name == "input_text":
+        locator = await _locate(page, action.get("element"))
+        await locator.fill(params.get("text", ""), timeout=ELEMENT_TIMEOUT_MS)
+    elif name == "select_dropdown_option":
+        locator = await _locate(page, action.get("element"))
+        await locator.select_option(label=params.get("text"), timeout=ELEMENT_TIMEOUT_MS)
+    elif name == "send_keys":
+        try:
+            await page.keyboard.press(params["keys"])
+        except Exception as e:
+            if "Unknown key" not in str(e):
+                raise
+            # Like browser-use's send_keys: a string that isn't a key name is pressed per character
+            for key in params["keys"]:
+                await page.keyboard.press(key)
+    elif name in ("scroll_down", "scroll_up"):
+        amount = params.get("amount")
+        sign = 1 if name == "scroll_down" else -1
+        if amount is not None:
+            await page.evaluate(f"window.scrollBy(0, {sign * int(amount)});")
+        else:
+            await page.evaluate(f"window.scrollBy(0, {sign} * window.innerHeight);")
+    elif name == "scroll_to_text":
+        locator = page.get_by_text(params["text"], exact=False).first
+        try:
+            await locator.scroll_into_view_if_needed(timeout=ELEMENT_TIMEOUT_MS)
+        except Exception:
+            raise ElementNotFoundError(f"Text '{params['text']}' not found")
+    elif name == "wait":
+        await asyncio.sleep(params.get("seconds", 3))
+    elif name in READ_ONLY_ACTIONS or name == "done":
+        pass
+    else:
+        raise ElementNotFoundError(f"Action '{name}' cannot be replayed without the agent")
+    return page
+
+async def replay_action_script(script: Dict[str, Any], headless: bool = True) -> Dict[str, Any]:
+    """
+    Re-execute a saved action script against Playwright without any LLM calls.
+
+    Console and network logs are captured with the same handlers as agent runs, and a
+    screenshot is taken after every step.
+
+    Args:
+        script: A script returned by load_action_script
+        headless: Whether to run the browser headless
+
+    Returns:
+        Dict[str, Any]: The same keys as run_browser_task ("result", "screenshots", "history")
+        plus "replayed": True. If an action fails for another reason, the history ends with
+        the failed step and "replay_error" is set; the agent is not run then, since earlier
+        actions (a submitted form, a click) may already have changed the site. If an element
+        cannot be found, only "fallback_reason" is set and the caller should run the agent instead.
+    """
+    from .browser_utils import (
+        run_memory, screenshot_storage, start_har_writer, close_har_writer,
+        handle_console_message, handle_request, handle_request_failed, handle_response,
+        handle_request_finished, handle_web_error, handle_page_error,
+    )
+
+    run_memory.reset()
+    har_writer = start_har_writer(f"replay-{uuid.uuid4()}")
+
+    history: List[AgentHistory] = []
+    total_actions = sum(len(step["actions"]) for step in script["steps"])
+    send_log(f"Replaying {total_actions} recorded actions in {len(script['steps'])} steps (no LLM calls)", "🔁", log_type='status')
+
+    playwright = await async_playwright().start()
+    browser = None
+    try:
+        browser = await playwright.chromium.launch(headless=headless)
+        persisted_state = load_persisted_state()
+        context = await browser.new_context(storage_state=persisted_state.data if persisted_state else None)
+        context.on("console", handle_console_message)
+        context.on("request", handle_request)
+        context.on("requestfailed", handle_request_failed)
+        context.on("response", handle_response)
+        context.on("requestfinished", handle_request_finished)
+        context.on("weberror", handle_web_error)
+        context.on("pageerror", handle_page_error)
+        page = await context.new_page()
+
+        replay_error = None
+        for step_number, step in enumerate(script["steps"], start=1):
+            step_start = time.time()
+            results = []
+            for action in step["actions"]:
+                try:
+                    page = await _run_action(page, action)
+                except ElementNotFoundError as e:
+                    send_log(f"Replay step {step_number}: {e}; falling back to the agent", "⚠️", log_type='status')
+                    return {"fallback_reason": f"Step {step_number} ({action['name']}): {e}"}
+                except Exception as e:
+                    replay_error = f"Step {step_number} ({action['name']}): {e}"
+                    send_log(f"Replay step {step_number} failed: {e}", "❌", log_type='status')
+                    results.append(ActionResult(
+                        is_done=True,
+                        success=False,
+                        error=f"Replay failed: {e}",
+                        extracted_content=f"Replay of the recorded actions failed at {replay_error}",
+                        include_in_memory=True,
+                    ))
+                    break
+
+                if action["name"] == "done":
+                    conclusion = action.get("params", {}).get("text") or action.get("result") or ""
+                    results.append(ActionResult(
+                        is_done=True,
+                        success=True,
+                        extracted_content=f"Replayed {total_actions} recorded actions without errors. Recorded conclusion: {conclusion}",
+                    ))
+                else:
+                    results.append(ActionResult(
+                        extracted_content=f"🔁 Replayed {action['name']}: {json.dumps(action.get('params') or {})}",
+                        include_in_memory=True,
+                    ))
+
+            if replay_error is None:
+                send_log(f"Replay step {step_number}/{len(script['steps'])} done: {page.url}", "🔁", log_type='agent')
+            title = ""
+            try:
+                screenshot_bytes = await page.screenshot(type='jpeg', quality=80)
+                screenshot_data_url = f"data:image/jpeg;base64,{base64.b64encode(screenshot_bytes).decode('utf-8')}"
+                run_memory.add_screenshot({
+                    'step': step_number,
+                    'url': page.url,
+                    'timestamp': time.time(),
+                    'screenshot': screenshot_data_url
+                })
+                await send_browser_view(screenshot_data_url)
+                title = await page.title()
+            except Exception:
+                if replay_error is None:
+                    raise  # After a failed action the page may be gone; keep the step without a screenshot
+
+            history.append(AgentHistory(
+                model_output=None,
+                result=results,
+                state=BrowserStateHistory(
+                    url=page.url,
+                    title=title,
+                    tabs=[TabInfo(page_id=i, url=p.url, title="") for i, p in enumerate(context.pages)],
+                    interacted_element=[None] * len(results),
+                ),
+                metadata=StepMetadata(step_number=step_number, step_start_time=step_start, step_end_time=time.time(), input_tokens=0),
+            ))
+            if replay_error is not None:
+                break
+
+        agent_history = AgentHistoryList(history=history)
+        if not agent_history.is_done():
+            # Scripts always end with the recorded done action; mark completion explicitly otherwise
+            history[-1].result.append(ActionResult(is_done=True, success=True, extracted_content=f"Replayed {total_actions} recorded actions without errors."))
+        return {
+            "result": agent_history.final_result() or "",
+            "screenshots": screenshot_storage,
+            "history": agent_history,
+            "memory": run_memory.usage(),
+            "har_run_id": har_writer.run_id if har_writer else None,
+            "replayed": True,
+            "replay_error": replay_error,
+        }
+    finally:
+        if browser:
+            await browser.close()
+        await playwright.stop()
+        close_har_writer()
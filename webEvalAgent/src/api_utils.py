@@ -2,27 +2,148 @@
 
 import httpx
 import asyncio
+import hashlib
+import time
+import weakref
+from typing import Dict, Optional, Tuple
 from .env_utils import get_backend_url
 
+# How long a validation result is trusted before it is checked again
+VALID_KEY_TTL_SECONDS = 300.0
+INVALID_KEY_TTL_SECONDS = 30.0
+
+VALIDATION_TIMEOUT_SECONDS = 15.0
+
+# Shared clients for backend API requests, one per event loop (a client's connections
+# belong to the loop that opened them). The LLM requests go through ChatAnthropic's own
+# transport and are not pooled here.
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+# sha256(api key) -> (valid, message, checked_at monotonic)
+_validation_cache: Dict[str, Tuple[bool, str, float]] = {}
+# sha256(api key) -> in-flight validation task, so concurrent calls share one request
+_inflight_validations: Dict[str, asyncio.Task] = {}
+
+def _cache_key(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Get the shared keep-alive client for Operative backend API requests (key validation).
+
+    Each event loop gets its own client (e.g. the startup check runs under asyncio.run
+    before the MCP server starts its own loop), so a client is only used and closed on
+    the loop its connections belong to. LLM requests use ChatAnthropic's own transport.
+
+    Returns:
+        httpx.AsyncClient: The pooled client for the running event loop
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(VALIDATION_TIMEOUT_SECONDS, connect=5.0),
+            limits=httpx.Limits(max_connections=10, max_keepalive_connections=5, keepalive_expiry=120.0),
+        )
+        _clients[loop] = client
+    return client
+
+async def close_http_client() -> None:
+    """Close the running event loop's shared client, e.g. before that loop ends.
+
+    Clients of other loops are left open for their loops to use and close.
+    """
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+async def fetch_api_key_status(api_key: str) -> Tuple[bool, str]:
+    """
+    Ask the Operative backend whether an API key is valid and cache the answer.
+
+    Args:
+        api_key: The API key to validate
+
+    Returns:
+        Tuple[bool, str]: Whether the key is valid and the backend's message
+
+    A 4xx reply is the backend refusing the key (unknown, invalid or revoked), so it is
+    cached as invalid like any other answer; only transport errors, 5xx and 429 raise.
+
+    Raises:
+        httpx.HTTPError: If the backend could not be reached, failed (5xx) or rate limited the request
+        ValueError: If a successful backend response is not valid JSON
+    """
+    response = await get_http_client().get(
+        get_backend_url("api/validate-key"),
+        headers={
+            "x-operative-api-key": api_key
+        }
+    )
+    if response.status_code >= 500 or response.status_code == 429:
+        response.raise_for_status()
+    try:
+        result = response.json()
+    except ValueError:
+        if response.is_success:
+            raise
+        result = {}  # A refusal without a JSON body is still a refusal
+    if not isinstance(result, dict):
+        result = {}
+    valid = response.is_success and bool(result.get("valid", False))
+    message = result.get("message") or ("Valid" if valid else f"Unknown validation error (HTTP {response.status_code}).")
+    _validation_cache[_cache_key(api_key)] = (valid, message, time.monotonic())
+    return valid, message
+
+async def _revalidate(api_key: str) -> bool:
+    """Validate against the backend; transport errors and 5xx keep a previously valid result."""
+    key = _cache_key(api_key)
+    try:
+        valid, _ = await fetch_api_key_status(api_key)
+        return valid
+    except Exception:
+        cached = _validation_cache.get(key)
+        return bool(cached and cached[0])
+    finally:
+        _inflight_validations.pop(key, None)
+
+def _start_revalidation(api_key: str) -> asyncio.Task:
+    key = _cache_key(api_key)
+    task = _inflight_validations.get(key)
+    if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+        task = asyncio.ensure_future(_revalidate(api_key))
+        _inflight_validations[key] = task
+    return task
+
 async def validate_api_key(api_key: str) -> bool:
     """
     Validate the API key against the Operative backend service.
-    
+
+    Results are cached per key: valid keys for VALID_KEY_TTL_SECONDS and invalid keys for
+    INVALID_KEY_TTL_SECONDS. A valid key whose entry has expired is still accepted
+    immediately while it is revalidated in the background.
+
     Args:
         api_key: The API key to validate
-        
+
     Returns:
         bool: True if the API key is valid, False otherwise
     """
+    if not api_key:
+        return False
+
+    cached = _validation_cache.get(_cache_key(api_key))
+    if cached is not None:
+        valid, _, checked_at = cached
+        age = time.monotonic() - checked_at
+        if valid:
+            if age >= VALID_KEY_TTL_SECONDS:
+                _start_revalidation(api_key)
+            return True
+        if age < INVALID_KEY_TTL_SECONDS:
+            return False
+
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                get_backend_url("api/validate-key"),
-                headers={
-                    "x-operative-api-key": api_key
-                }
-            )
-            result = response.json()
-            return result.get("valid", False)
+        return await _start_revalidation(api_key)
     except Exception as e:
         return False
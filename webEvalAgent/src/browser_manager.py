@@ -2,12 +2,13 @@
 
 import asyncio
 import base64
-import socket
+import time
 from typing import Dict, List, Optional
 
 # Import log server functions
 # We will add send_browser_view later
-from .log_server import start_log_server, open_log_dashboard, send_log, send_browser_view
+from .log_server import start_log_server, send_log, send_browser_view
+from .input_channel import cdp_input_commands
 
 class PlaywrightBrowserManager:
     # Class variable to hold the singleton instance
@@ -47,20 +48,13 @@ class PlaywrightBrowserManager:
         if not PlaywrightBrowserManager._log_server_started:
             try:
                 send_log("Initializing Operative Agent (Browser Manager)...", "🚀", log_type='status')
-                s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                try:
-                    s.connect(('localhost', 5009))
-                    s.close()
-                    PlaywrightBrowserManager._log_server_started = True
-                    send_log("Connected to existing log server (Browser Manager).", "✅", log_type='status')
-                except (socket.error, Exception):
-                    s.close()
-                    start_log_server()
-                    await asyncio.sleep(1)
-                    # Use the enhanced open_log_dashboard which will refresh existing tabs
-                    # instead of opening new ones
-                    open_log_dashboard()
+                # Starts the server, or reuses a healthy one from this or another process,
+                # and returns once it accepts connections. The tool handlers open the dashboard.
+                if await asyncio.to_thread(start_log_server):
                     PlaywrightBrowserManager._log_server_started = True
+                    send_log("Log server ready (Browser Manager).", "✅", log_type='status')
+                else:
+                    send_log("Log server did not become ready (Browser Manager).", "⚠️", log_type='status')
             except Exception as e:
                 send_log(f"Error with log server/dashboard (Browser Manager): {e}", "❌", log_type='status')
 
@@ -210,7 +204,7 @@ class PlaywrightBrowserManager:
             "type": message.type,
             "text": message.text,
             "location": message.location,
-            "timestamp": asyncio.get_event_loop().time()
+            "timestamp": time.time()
         }
         self.console_logs.append(log_entry)
         try:
@@ -224,7 +218,7 @@ class PlaywrightBrowserManager:
             "url": request.url,
             "method": request.method,
             "headers": request.headers,
-            "timestamp": asyncio.get_event_loop().time(),
+            "timestamp": time.time(),
             "resourceType": request.resource_type,
             "id": id(request)
         }
@@ -236,7 +230,7 @@ class PlaywrightBrowserManager:
 
     async def _handle_response(self, response) -> None:
         """Handle network responses."""
-        response_timestamp = asyncio.get_event_loop().time()
+        response_timestamp = time.time()
         response_data = {
             "status": response.status,
             "statusText": response.status_text,
@@ -308,124 +302,15 @@ class PlaywrightBrowserManager:
             send_log(f"Input error: Screencast not running", "❌", log_type='status')
             return
 
-        if event_type != 'scroll':
-            send_log(f"Processing input: {event_type}", "🔄", log_type='status')
+        commands = cdp_input_commands(event_type, details)
+        if not commands:
+            send_log(f"Unknown input type: {event_type}", "❓", log_type='status')
+            return
 
         try:
-            if event_type == 'click':
-                # CDP expects separate press and release events for a click
-                button = details.get('button', 'left')
-                x = details.get('x', 0)
-                y = details.get('y', 0)
-                click_count = details.get('clickCount', 1)
-                # Modifiers might be needed for complex interactions, but start simple
-                modifiers = 0 # TODO: Map ctrlKey, shiftKey etc. if needed
-                
-                # Mouse Pressed
-                mouse_pressed_params = {
-                    "type": "mousePressed",
-                    "button": button,
-                    "x": x,
-                    "y": y,
-                    "modifiers": modifiers,
-                    "clickCount": click_count
-                }
-                
-                try:
-                    await self.cdp_session.send("Input.dispatchMouseEvent", mouse_pressed_params)
-                except Exception as press_error:
-                    send_log(f"Input error: Failed to send mousePressed: {press_error}", "❌", log_type='status')
-                    return
-                
-                # Short delay often helps reliability
-                await asyncio.sleep(0.05)
-                
-                # Mouse Released
-                mouse_released_params = {
-                    "type": "mouseReleased",
-                    "button": button,
-                    "x": x,
-                    "y": y,
-                    "modifiers": modifiers,
-                    "clickCount": click_count
-                }
-                
-                try:
-                    await self.cdp_session.send("Input.dispatchMouseEvent", mouse_released_params)
-                except Exception as release_error:
-                    send_log(f"Input error: Failed to send mouseReleased: {release_error}", "❌", log_type='status')
-                    return
-                
-                send_log(f"Click sent at ({x},{y})", "👆", log_type='status')
-
-            elif event_type == 'keydown':
-                # Map frontend details to CDP key event parameters
-                key = details.get('key', '')
-                code = details.get('code', '')
-                modifiers = self._map_modifiers(details)
-                
-                key_params = {
-                    "type": "keyDown",
-                    "modifiers": modifiers,
-                    "key": key,
-                    "code": code,
-                }
-                
-                try:
-                    await self.cdp_session.send("Input.dispatchKeyEvent", key_params)
-                except Exception as key_error:
-                    send_log(f"Input error: Failed to send keyDown: {key_error}", "❌", log_type='status')
-                    return
-                
-                send_log(f"Key down sent: {key}", "⌨️", log_type='status')
-
-            elif event_type == 'keyup':
-                key = details.get('key', '')
-                code = details.get('code', '')
-                modifiers = self._map_modifiers(details)
-                
-                key_params = {
-                    "type": "keyUp",
-                    "modifiers": modifiers,
-                    "key": key,
-                    "code": code,
-                }
-                
-                try:
-                    await self.cdp_session.send("Input.dispatchKeyEvent", key_params)
-                except Exception as key_error:
-                    send_log(f"Input error: Failed to send keyUp: {key_error}", "❌", log_type='status')
-                    return
-                
-                send_log(f"Key up sent: {key}", "⌨️", log_type='status')
-
-            elif event_type == 'scroll':
-                # Use dispatchMouseEvent with type 'mouseWheel'
-                x = details.get('x', 0)
-                y = details.get('y', 0)
-                delta_x = details.get('deltaX', 0)
-                delta_y = details.get('deltaY', 0)
-                
-                wheel_params = {
-                    "type": "mouseWheel",
-                    "x": x,
-                    "y": y,
-                    "deltaX": delta_x,
-                    "deltaY": delta_y,
-                    "modifiers": 0 # Modifiers usually not needed for scroll
-                }
-                
-                try:
-                    await self.cdp_session.send("Input.dispatchMouseEvent", wheel_params)
-                except Exception as wheel_error:
-                    send_log(f"Input error: Failed to send mouseWheel: {wheel_error}", "❌", log_type='status')
-                    return
-                
-                # send_log(f"Scroll sent: dY={delta_y}", "📜", log_type='status')
-
-            else:
-                send_log(f"Unknown input type: {event_type}", "❓", log_type='status')
-
+            # CDP handles a session's commands in order, so no delay is needed between them
+            for method, params in commands:
+                await self.cdp_session.send(method, params)
         except Exception as e:
             send_log(f"Input error: {e}", "❌", log_type='status')
             
@@ -439,12 +324,3 @@ class PlaywrightBrowserManager:
                     except: 
                         pass
                     self.cdp_session = None
-
-    def _map_modifiers(self, details: Dict) -> int:
-        """Maps modifier keys from frontend details to CDP modifier bitmask."""
-        modifiers = 0
-        if details.get('altKey'): modifiers |= 1
-        if details.get('ctrlKey'): modifiers |= 2
-        if details.get('metaKey'): modifiers |= 4 # Command key on Mac
-        if details.get('shiftKey'): modifiers |= 8
-        return modifiers
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+# Location where setup_browser_state saves cookies and localStorage
+STATE_DIR = os.path.expanduser("~/.operative/browser_state")
+STATE_FILE = os.path.join(STATE_DIR, "state.json")
+
+class PersistedState(NamedTuple):
+    """A parsed Playwright storage state together with where it came from."""
+    path: str
+    data: Dict[str, Any]
+    # sha1 of the raw file contents; equal fingerprints mean identical state
+    fingerprint: str
+
+# (path, mtime_ns, size) -> parsed state; only the most recent file version is kept
+_cache_key: Optional[Tuple[str, int, int]] = None
+_cached_state: Optional[PersistedState] = None
+_cache_lock = threading.Lock()
+
+def load_persisted_state(path: str = STATE_FILE) -> Optional[PersistedState]:
+    """
+    Load the persisted browser state, parsing the file only when it has changed.
+
+    Args:
+        path: Path to the Playwright storage state JSON file
+
+    Returns:
+        Optional[PersistedState]: The parsed state, or None if the file does not exist or is invalid
+    """
+    global _cache_key, _cached_state
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    with _cache_lock:
+        if _cache_key == key:
+            return _cached_state
+
+        try:
+            with open(path, 'rb') as f:
+                raw = f.read()
+            data = json.loads(raw)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict):
+            return None
+
+        _cached_state = PersistedState(path=path, data=data, fingerprint=hashlib.sha1(raw).hexdigest())
+        _cache_key = key
+        return _cached_state
+
+def invalidate_persisted_state() -> None:
+    """Drop the cached state, e.g. right after the state file was rewritten."""
+    global _cache_key, _cached_state
+    with _cache_lock:
+        _cache_key = None
+        _cached_state = None
@@ -8,13 +8,20 @@ import uuid
 import warnings
 import base64
 import os
+import time
 from contextlib import redirect_stdout, redirect_stderr
 from typing import Dict, Any, Tuple, List, Optional
 from collections import deque
 import pathlib # Added for file reading
 
 # Import log server function
-from .log_server import send_log
+from .log_server import send_log, send_memory_usage, send_input_latency, set_input_channel, get_current_run_id
+from .browser_state import load_persisted_state, PersistedState
+from .profiling import StepProfiler
+from .memory_budget import RunMemoryBudget
+from .console_groups import ConsoleGroups
+from .har_writer import HarWriter
+from .input_channel import InputChannel, cdp_input_commands
 
 # Import Playwright types
 from playwright.async_api import async_playwright, Error as PlaywrightError, Browser as PlaywrightBrowser, BrowserContext as PlaywrightBrowserContext, Page as PlaywrightPage
@@ -39,12 +46,25 @@ _original_bring_to_front = None
 async def _no_bring_to_front(self, *args, **kwargs):
     return None
 
+_original_screenshot = None
+
+# Hides the agent control overlay (see agent_overlay.js) in screenshots
+AGENT_CONTROL_HIDE_CSS = "#agent-control-host { display: none !important; }"
+
+# Keeps the overlay out of every screenshot taken during the run: the agent's own
+# (browser-use sends them to the LLM) and the ones stored for the report.
+async def _screenshot_without_overlay(self, *args, **kwargs):
+    kwargs['style'] = AGENT_CONTROL_HIDE_CSS + (kwargs.get('style') or '')
+    return await _original_screenshot(self, *args, **kwargs)
+
 # We'll apply and remove the patch in run_browser_task
 
 # Global variables
 agent_instance = None  # Store agent instance
+agent_run_id = None  # Dashboard run agent_instance belongs to
 original_create_context: Optional[callable] = None  # Store original patched method
 active_cdp_session = None  # Store active CDP session for input handling
+active_input_channel: Optional[InputChannel] = None  # Ordered input queue for active_cdp_session
 active_screencast_running = False  # Track if screencast is running
 browser_task_loop = None  # Store the asyncio loop used by run_browser_task
 screenshot_task = None  # Store the periodic screenshot task
@@ -90,13 +110,43 @@ network_request_storage: deque = deque(maxlen=MAX_LOG_ENTRIES)
 # --- Screenshot Storage (Global within this module) ---
 screenshot_storage: List[Dict[str, Any]] = []
 
+# --- Console messages aggregated by fingerprint (fed by run_memory.add_console) ---
+console_groups = ConsoleGroups()
+
+# --- Per-run byte budget across all captured artifacts; appends go through it ---
+run_memory = RunMemoryBudget(console_log_storage, network_request_storage, screenshot_storage,
+                             on_usage=send_memory_usage, console_groups=console_groups)
+
+# --- HAR export of the current run's network traffic (all resource types) ---
+har_writer: Optional[HarWriter] = None
+
+def start_har_writer(run_id: str) -> Optional[HarWriter]:
+    """Close any previous writer and start streaming this run's traffic to a HAR file."""
+    global har_writer
+    close_har_writer()
+    try:
+        har_writer = HarWriter(run_id)
+        send_log(f"Recording network HAR to {har_writer.path}", "🗂️", log_type='status')
+    except Exception as e:
+        har_writer = None
+        send_log(f"Could not start HAR recording: {e}", "⚠️", log_type='status')
+    return har_writer
+
+def close_har_writer() -> None:
+    global har_writer
+    if har_writer is not None:
+        har_writer.close()
+        har_writer = None
+
 # --- Log Handlers (Use deque's append and send_log with type) ---
+# Timestamps are wall-clock time.time() values taken synchronously in the event
+# listeners, so each storage stays in capture order regardless of task scheduling.
 # Async handler functions
-async def _handle_console_message(message):
+async def _handle_console_message(message, timestamp: float):
     try:
         text = message.text
-        log_entry = { "type": message.type, "text": text, "location": message.location, "timestamp": asyncio.get_event_loop().time() }
-        console_log_storage.append(log_entry)
+        log_entry = { "type": message.type, "text": text, "location": message.location, "timestamp": timestamp }
+        run_memory.add_console(log_entry)
         
         # Check if message has a failure attribute
         if hasattr(message, 'failure') and message.failure:
@@ -106,11 +156,22 @@ async def _handle_console_message(message):
     except Exception as e:
         send_log(f"Error handling console message: {e}", "❌", log_type='status')
 
-async def _handle_request(request):
+def _record_request(request, timestamp: float) -> Optional[Dict[str, Any]]:
+    """Append a request entry immediately; headers and post data are filled in by _handle_request."""
     try:
         if not should_log_network_request(request):
-            return
-            
+            return None
+        request_entry = { "url": request.url, "method": request.method, "headers": None, "postData": None, "timestamp": timestamp, "resourceType": request.resource_type, "is_navigation": request.is_navigation_request(), "id": id(request) }
+        run_memory.add_network(request_entry)
+        send_log(f"NET REQ [{request_entry['method']}]: {request_entry['url']}", "➡️", log_type='network')
+        return request_entry
+    except Exception as e:
+        url = request.url if request else 'Unknown URL'
+        send_log(f"Error handling request event for {url}: {e}", "❌", log_type='status')
+        return None
+
+async def _handle_request(request, request_entry: Dict[str, Any]):
+    try:
         try: headers = await request.all_headers()
         except PlaywrightError as e: headers = {"error": f"Req Header Error: {e}"}
         except Exception as e: headers = {"error": f"Unexpected Req Header Error: {e}"}
@@ -127,14 +188,13 @@ async def _handle_request(request):
         except PlaywrightError as e: post_data = f"Post Data Error: {e}"
         except Exception as e: post_data = f"Unexpected Post Data Error: {e}"
 
-        request_entry = { "url": request.url, "method": request.method, "headers": headers, "postData": post_data, "timestamp": asyncio.get_event_loop().time(), "resourceType": request.resource_type, "is_navigation": request.is_navigation_request(), "id": id(request) }
-        network_request_storage.append(request_entry)
-        send_log(f"NET REQ [{request_entry['method']}]: {request_entry['url']}", "➡️", log_type='network')
+        if not request_entry.get('details_evicted'):
+            run_memory.update_network(request_entry, {"headers": headers, "postData": post_data})
     except Exception as e:
         url = request.url if request else 'Unknown URL'
         send_log(f"Error handling request event for {url}: {e}", "❌", log_type='status')
 
-async def _handle_response(response):
+async def _handle_response(response, timestamp: float):
     req_id = id(response.request)
     url = response.url
     
@@ -163,10 +223,12 @@ async def _handle_response(response):
 
         for req in network_request_storage:
             if req.get("id") == req_id and "response_status" not in req:
-                req["response_status"] = status
-                req["response_headers"] = headers
-                req["response_body_size"] = body_size
-                req["response_timestamp"] = asyncio.get_event_loop().time()
+                run_memory.update_network(req, {
+                    "response_status": status,
+                    "response_headers": headers,
+                    "response_body_size": body_size,
+                    "response_timestamp": timestamp
+                })
                 send_log(f"NET RESP [{status}]: {url} (JSON)", "⬅️", log_type='network')
                 break
         else:
@@ -174,66 +236,84 @@ async def _handle_response(response):
     except Exception as e:
         send_log(f"Error handling response event for {url}: {e}", "❌", log_type='status')
 
-async def _handle_page_error(error):
+async def _handle_page_error(error, timestamp: float):
     try:
         error_text = f"PAGE ERROR: {error}"
         send_log(error_text, "🐛", log_type='console')
         # Add to console_log_storage with type 'error'
-        console_log_storage.append({
+        run_memory.add_console({
             "type": "error",
             "text": error_text,
             "location": None,
-            "timestamp": asyncio.get_event_loop().time()
+            "timestamp": timestamp
         })
     except Exception as e:
         send_log(f"Error handling page error: {e}", "❌", log_type='status')
 
-async def _handle_web_error(error):
+async def _handle_web_error(error, timestamp: float):
     try:
         error_text = f"JS ERROR: {error.error}: {error.page}"
         send_log(error_text, "🐛", log_type='console')
         # Add to console_log_storage with type 'error'
-        console_log_storage.append({
+        run_memory.add_console({
             "type": "error",
             "text": error_text,
             "location": error.page.url if hasattr(error.page, 'url') else None,
-            "timestamp": asyncio.get_event_loop().time()
+            "timestamp": timestamp
         })
     except Exception as e:
         send_log(f"Error handling web error: {e}", "❌", log_type='status')
 
-async def _handle_request_failed(error):
+async def _handle_request_failed(error, timestamp: float):
     try:
         error_text = f"REQUEST FAILED: {error}"
         send_log(error_text, "🐛", log_type='console')
         # Add to console_log_storage with type 'error'
-        console_log_storage.append({
+        run_memory.add_console({
             "type": "error",
             "text": error_text,
             "location": None,
-            "timestamp": asyncio.get_event_loop().time()
+            "timestamp": timestamp
         })
     except Exception as e:
         send_log(f"Error handling request failed: {e}", "❌", log_type='status')
 
+async def _handle_request_finished(request, failure: Optional[str] = None):
+    writer = har_writer
+    if writer is None:
+        return
+    try:
+        await writer.add_request(request, failure=failure)
+    except Exception as e:
+        send_log(f"Error writing HAR entry for {request.url}: {e}", "❌", log_type='status')
+
 # Non-async wrapper functions for event listeners
 def handle_console_message(message):
-    asyncio.create_task(_handle_console_message(message))
+    asyncio.create_task(_handle_console_message(message, time.time()))
 
 def handle_request(request):
-    asyncio.create_task(_handle_request(request))
+    request_entry = _record_request(request, time.time())
+    if request_entry is not None:
+        asyncio.create_task(_handle_request(request, request_entry))
 
 def handle_response(response):
-    asyncio.create_task(_handle_response(response))
+    asyncio.create_task(_handle_response(response, time.time()))
 
 def handle_page_error(error):
-    asyncio.create_task(_handle_page_error(error))
+    asyncio.create_task(_handle_page_error(error, time.time()))
 
 def handle_web_error(error):
-    asyncio.create_task(_handle_web_error(error))
+    asyncio.create_task(_handle_web_error(error, time.time()))
 
 def handle_request_failed(error):
-    asyncio.create_task(_handle_request_failed(error))
+    asyncio.create_task(_handle_request_failed(error, time.time()))
+    # requestfailed passes the Request; record it in the HAR as well
+    if har_writer is not None:
+        asyncio.create_task(_handle_request_finished(error, failure=error.failure or "failed"))
+
+def handle_request_finished(request):
+    if har_writer is not None:
+        asyncio.create_task(_handle_request_finished(request))
 
 # Read the JavaScript overlay code from the file
 try:
@@ -243,66 +323,70 @@ except Exception as e:
     send_log(f"CRITICAL ERROR: Failed to read agent_overlay.js: {e}", "🚨", log_type='status')
     AGENT_CONTROL_OVERLAY_JS = "console.error('Failed to load agent overlay script');" # Fallback
 
-# Function to inject the agent control overlay into a page
-async def inject_agent_control_overlay(page: PlaywrightPage):
-    """Inject the agent control overlay into a page."""
-    try:
-        # First try with evaluate
-        try:
-            await page.evaluate(AGENT_CONTROL_OVERLAY_JS)
-            return
-        except Exception as e1:
-            send_log(f"Failed to inject with page.evaluate(): {e1}", "⚠️", log_type='status')
-            
-        # Try with add_script_tag as fallback
-        try:
-            await page.add_script_tag(content=AGENT_CONTROL_OVERLAY_JS)
-            return
-        except Exception as e2:
-            send_log(f"Failed to inject with page.add_script_tag(): {e2}", "⚠️", log_type='status')
-            
-        # Try with evaluate_handle as last resort
-        try:
-            await page.evaluate_handle(f"() => {{ {AGENT_CONTROL_OVERLAY_JS} }}")
-            return
-        except Exception as e3:
-            send_log(f"Failed to inject with page.evaluate_handle(): {e3}", "⚠️", log_type='status')
-            raise Exception(f"All injection methods failed: {e1}, {e2}, {e3}")
-            
-    except Exception as e:
-        send_log(f"Failed to inject agent control overlay: {e}", "❌", log_type='status')
+# Only run the overlay in the top-level document, once the body exists. Its console
+# output is silenced so it doesn't show up among the page's console logs in the report.
+AGENT_CONTROL_INIT_SCRIPT = """
+(() => {
+    if (window.top !== window.self) return;
+    const installAgentOverlay = () => {
+        const noop = () => {};
+        const console = { log: noop, info: noop, warn: noop, error: noop, debug: noop };
+%s
+    };
+    if (document.body) {
+        installAgentOverlay();
+    } else {
+        document.addEventListener('DOMContentLoaded', installAgentOverlay, { once: true });
+    }
+})();
+""" % AGENT_CONTROL_OVERLAY_JS
 
-# Function to set up agent control functions for a page
-async def setup_page_agent_controls(page: PlaywrightPage):
-    """Set up agent control functions for a page."""
-    global agent_instance
+# Function to install the agent control overlay on a browser context
+async def install_agent_controls(context: PlaywrightBrowserContext):
+    """
+    Install the agent control bindings and overlay once per context.
+    
+    The overlay is registered as an init script, so every new document gets it from the
+    browser itself; pages that already exist get it through a single evaluate.
+    """
+    if getattr(context, "_operative_agent_controls_installed", False):
+        return
+    context._operative_agent_controls_installed = True
+    
+    bindings = {
+        'pauseAgent': pause_agent,
+        'resumeAgent': resume_agent,
+        'stopAgent': stop_agent,
+        'getAgentState': get_agent_state,
+    }
+    for name, control in bindings.items():
+        try:
+            await context.expose_binding(name, lambda source, control=control: control())
+        except Exception as e:
+            # Already registered on this context (e.g. reused across runs)
+            if "already registered" not in str(e):
+                send_log(f"Failed to expose {name}: {e}", "⚠️", log_type='status')
     
     try:
-        # Expose agent control functions to the page
-        await page.expose_function('pauseAgent', lambda: pause_agent())
-        await page.expose_function('resumeAgent', lambda: resume_agent())
-        await page.expose_function('stopAgent', lambda: stop_agent())
-        await page.expose_function('getAgentState', lambda: get_agent_state())
-        
-        # Add navigation listener to re-inject overlay after navigation
-        async def handle_frame_navigation(frame):
-            if frame is page.main_frame:
-                send_log(f"Page navigated to: {page.url}", "🧭", log_type='status')
-        
-        # Define async wrapper functions for event listeners
-        page.on("framenavigated", lambda frame: asyncio.create_task(handle_frame_navigation(frame)))
-        send_log("Added navigation listener to page", "🔄", log_type='status')
-        
-        # Also listen for load events to re-inject the overlay
-        async def handle_load():
-            send_log(f"Page load event on: {page.url}", "🔄", log_type='status')
-            await asyncio.sleep(0.5)  # Wait a bit for the page to stabilize
-            
-        page.on("load", lambda: asyncio.create_task(handle_load()))
-        send_log("Added load event listener to page", "🔄", log_type='status')
-        
+        await context.add_init_script(AGENT_CONTROL_INIT_SCRIPT)
     except Exception as e:
-        send_log(f"Failed to set up agent controls: {e}", "❌", log_type='status')
+        send_log(f"Failed to register agent control overlay: {e}", "❌", log_type='status')
+        return
+    
+    for page in context.pages:
+        try:
+            await page.evaluate(AGENT_CONTROL_INIT_SCRIPT)
+        except Exception:
+            pass  # The init script covers the page's next navigation
+
+# Function to set up per-page listeners
+def setup_page_agent_controls(page: PlaywrightPage):
+    """Log main-frame navigations for a page; the overlay itself is installed per context."""
+    def handle_frame_navigation(frame):
+        if frame is page.main_frame:
+            send_log(f"Page navigated to: {page.url}", "🧭", log_type='status')
+    
+    page.on("framenavigated", handle_frame_navigation)
 
 # Agent control functions
 def pause_agent():
@@ -312,8 +396,8 @@ def pause_agent():
         agent_instance.pause()
         send_log("Agent paused", "⏸️", log_type='status')
         # Send agent state update to frontend
-        from .log_server import socketio
-        socketio.emit('agent_state', {'state': {'paused': True, 'stopped': False}})
+        from .log_server import send_agent_state
+        send_agent_state({'paused': True, 'stopped': False})
         return True
     return False
 
@@ -324,8 +408,8 @@ def resume_agent():
         agent_instance.resume()
         send_log("Agent resumed", "▶️", log_type='status')
         # Send agent state update to frontend
-        from .log_server import socketio
-        socketio.emit('agent_state', {'state': {'paused': False, 'stopped': False}})
+        from .log_server import send_agent_state
+        send_agent_state({'paused': False, 'stopped': False})
         return True
     return False
 
@@ -336,8 +420,8 @@ def stop_agent():
         agent_instance.stop()
         send_log("Agent stopped", "⏹️", log_type='status')
         # Send agent state update to frontend
-        from .log_server import socketio
-        socketio.emit('agent_state', {'state': {'paused': False, 'stopped': True}})
+        from .log_server import send_agent_state
+        send_agent_state({'paused': False, 'stopped': True})
         return True
     return False
 
@@ -357,8 +441,8 @@ def get_agent_state():
     
     # Send agent state update to frontend
     try:
-        from .log_server import socketio
-        socketio.emit('agent_state', {'state': state})
+        from .log_server import send_agent_state
+        send_agent_state(state)
     except Exception as e:
         pass
         
@@ -372,7 +456,10 @@ def get_browser_task_loop():
 
 # --- Input Handling Functions ---
 async def handle_browser_input(event_type: str, details: Dict) -> None:
-    """Handle browser input events from the frontend.
+    """Dispatch one browser input event from the frontend on the active CDP session.
+    
+    Dashboard events normally go through active_input_channel, which pipelines the same
+    commands; this sends them one after another for callers outside the channel.
     
     Args:
         event_type: The type of input event (click, scroll, keydown, keyup)
@@ -381,11 +468,6 @@ async def handle_browser_input(event_type: str, details: Dict) -> None:
     Returns:
         None
     """
-    global active_cdp_session, active_screencast_running
-    
-    if event_type != 'scroll':
-        send_log(f"handle_browser_input called with event_type: {event_type}", "🔍", log_type='status')
-    
     # Check if we have an active CDP session
     if not active_cdp_session:
         send_log(f"Input error: No active CDP session", "❌", log_type='status')
@@ -396,168 +478,28 @@ async def handle_browser_input(event_type: str, details: Dict) -> None:
         send_log(f"Input error: Screencast not running", "❌", log_type='status')
         return
 
-    if event_type != 'scroll':
-        send_log(f"Processing input: {event_type}", "🔄", log_type='status')
-
+    commands = cdp_input_commands(event_type, details)
+    if not commands:
+        send_log(f"Unknown input type: {event_type}", "❓", log_type='status')
+        return
     try:
-        if event_type == 'click':
-            # CDP expects separate press and release events for a click
-            button = details.get('button', 'left')
-            x = details.get('x', 0)
-            y = details.get('y', 0)
-            click_count = details.get('clickCount', 1)
-            # Modifiers might be needed for complex interactions, but start simple
-            modifiers = 0 # TODO: Map ctrlKey, shiftKey etc. if needed
-            
-            # Mouse Pressed
-            mouse_pressed_params = {
-                "type": "mousePressed",
-                "button": button,
-                "x": x,
-                "y": y,
-                "modifiers": modifiers,
-                "clickCount": click_count
-            }
-            
-            # send_log(f"Dispatching mousePressed at ({x},{y})", "➡️", log_type='status')
-            try:
-                await active_cdp_session.send("Input.dispatchMouseEvent", mouse_pressed_params)
-                send_log(f"mousePressed dispatched successfully", "✅", log_type='status')
-            except Exception as press_error:
-                import traceback
-                send_log(f"Input error: Failed to send mousePressed: {press_error}", "❌", log_type='status')
-                return
-            
-            # Short delay often helps reliability
-            await asyncio.sleep(0.05)
-            
-            # Mouse Released
-            mouse_released_params = {
-                "type": "mouseReleased",
-                "button": button,
-                "x": x,
-                "y": y,
-                "modifiers": modifiers,
-                "clickCount": click_count
-            }
-            
-            # send_log(f"Dispatching mouseReleased at ({x},{y})", "➡️", log_type='status')
-            try:
-                await active_cdp_session.send("Input.dispatchMouseEvent", mouse_released_params)
-                send_log(f"mouseReleased dispatched successfully", "✅", log_type='status')
-            except Exception as release_error:
-                import traceback
-                send_log(f"Input error: Failed to send mouseReleased: {release_error}", "❌", log_type='status')
-                return
-            
-            send_log(f"Click sent at ({x},{y})", "👆", log_type='status')
-
-        elif event_type == 'keydown':
-            # Map frontend details to CDP key event parameters
-            key = details.get('key', '')
-            code = details.get('code', '')
-            modifiers = _map_modifiers(details)
-            
-            # For keyDown events, include the 'text' parameter for printable characters
-            # This is necessary for text to appear in input fields
-            key_params = {
-                "type": "keyDown",
-                "modifiers": modifiers,
-                "key": key,
-                "code": code,
-            }
-            
-            # Add text parameter for printable characters (letters, numbers, symbols)
-            # Skip for special keys like Enter, Escape, Arrow keys, etc.
-            if len(key) == 1:  # Simple check for printable characters (single character keys)
-                key_params["text"] = key
-            
-            # For Backspace, also send the 'deleteBackward' editing command
-            if key == 'Backspace':
-                 send_log("Adding 'deleteBackward' command for Backspace keydown", "🔧", log_type='status')
-                 key_params["commands"] = ["deleteBackward"]
-            
-            try:
-                await active_cdp_session.send("Input.dispatchKeyEvent", key_params)
-            except Exception as key_error:
-                import traceback
-                send_log(f"Input error: Failed to send keyDown: {key_error}", "❌", log_type='status')
-                return
-            
-            send_log(f"Key down sent: {key}", "⌨️", log_type='status')
-
-        elif event_type == 'keyup':
-            key = details.get('key', '')
-            code = details.get('code', '')
-            modifiers = _map_modifiers(details)
-            
-            key_params = {
-                "type": "keyUp",
-                "modifiers": modifiers,
-                "key": key,
-                "code": code,
-            }
-            
-            try:
-                await active_cdp_session.send("Input.dispatchKeyEvent", key_params)
-            except Exception as key_error:
-                import traceback
-                send_log(f"Input error: Failed to send keyUp: {key_error}", "❌", log_type='status')
-                return
-            
-            send_log(f"Key up sent: {key}", "⌨️", log_type='status')
-
-        elif event_type == 'scroll':
-            # Use dispatchMouseEvent with type 'mouseWheel'
-            x = details.get('x', 0)
-            y = details.get('y', 0)
-            delta_x = details.get('deltaX', 0)
-            delta_y = details.get('deltaY', 0)
-            
-            wheel_params = {
-                "type": "mouseWheel",
-                "x": x,
-                "y": y,
-                "deltaX": delta_x,
-                "deltaY": delta_y,
-                "modifiers": 0 # Modifiers usually not needed for scroll
-            }
-            
-            try:
-                await active_cdp_session.send("Input.dispatchMouseEvent", wheel_params)
-            except Exception as wheel_error:
-                import traceback
-                send_log(f"Input error: Failed to send mouseWheel: {wheel_error}", "❌", log_type='status')
-                return
-            
-            # send_log(f"Scroll sent: dY={delta_y}", "📜", log_type='status')
-
-        else:
-            send_log(f"Unknown input type: {event_type}", "❓", log_type='status')
-
+        for method, params in commands:
+            await active_cdp_session.send(method, params)
     except Exception as e:
-        import traceback
-        send_log(f"Input error: {e}", "❌", log_type='status')
-        
-        # Check if the session is closed
-        if "Target closed" in str(e) or "Session closed" in str(e) or "Connection closed" in str(e):
-            send_log("CDP session closed, stopping input handling", "⚠️", log_type='status')
-            active_screencast_running = False # Mark as stopped
-            if active_cdp_session:
-                try: 
-                    await active_cdp_session.detach()
-                except Exception as detach_error: 
-                    pass
-                active_cdp_session = None
-
-def _map_modifiers(details: Dict) -> int:
-    """Maps modifier keys from frontend details to CDP modifier bitmask."""
-    modifiers = 0
-    if details.get('altKey'): modifiers |= 1
-    if details.get('ctrlKey'): modifiers |= 2
-    if details.get('metaKey'): modifiers |= 4 # Command key on Mac
-    if details.get('shiftKey'): modifiers |= 8
-    return modifiers
+        _handle_input_error(e)
+
+def _handle_input_error(error: Exception) -> None:
+    """Log a failed input dispatch and stop input handling if the CDP session is gone."""
+    global active_cdp_session, active_screencast_running
+    send_log(f"Input error: {error}", "❌", log_type='status')
+    
+    # Check if the session is closed
+    if "Target closed" in str(error) or "Session closed" in str(error) or "Connection closed" in str(error):
+        send_log("CDP session closed, stopping input handling", "⚠️", log_type='status')
+        active_screencast_running = False # Mark as stopped
+        if active_cdp_session:
+            asyncio.ensure_future(active_cdp_session.detach()).add_done_callback(lambda t: t.cancelled() or t.exception())
+            active_cdp_session = None
 
 def set_screencast_running(running: bool = True) -> None:
     """Set the active_screencast_running flag.
@@ -572,18 +514,115 @@ def set_screencast_running(running: bool = True) -> None:
     active_screencast_running = running
 
 # Helper function to get persisted browser state
-def _get_persisted_state() -> Optional[str]:
+def _get_persisted_state() -> Optional[PersistedState]:
+    """
+    Return the persisted browser state if it exists, parsed once per file version.
+    
+    Returns:
+        Optional[PersistedState]: The parsed state with its fingerprint, None otherwise
     """
-    Check for and return the path to persisted browser state if it exists.
+    return load_persisted_state()
+
+async def _apply_persisted_state(context: PlaywrightBrowserContext, persisted_state: PersistedState) -> bool:
+    """
+    Add the persisted cookies to a context that was created without them.
+    
+    Skipped when the context already holds this exact state (same fingerprint).
     
     Returns:
-        Optional[str]: Path to the state file if it exists, None otherwise
+        bool: True if cookies were added, False if the context was already up to date
+    """
+    if getattr(context, "_operative_state_fingerprint", None) == persisted_state.fingerprint:
+        return False
+    cookies = persisted_state.data.get('cookies')
+    if cookies:
+        await context.add_cookies(cookies)
+    context._operative_state_fingerprint = persisted_state.fingerprint
+    return True
+
+def _create_llm(api_key: str, tool_call_id: str, task: Optional[str] = None) -> ChatAnthropic:
+    """Create the Anthropic chat model, routed through the Operative backend.
+    
+    With OPERATIVE_LLM_MODE=record or replay the model records responses to, or serves
+    them from, a cassette (see llm_replay).
     """
-    state_file = os.path.expanduser("~/.operative/browser_state/state.json")
-    return state_file if os.path.exists(state_file) else None
+    from .env_utils import get_backend_url
+    from .llm_replay import get_llm_mode, default_cassette_path, ReplayableChatAnthropic, LLM_REPLAY_TIMING_ENV, LLM_REPLAY_MATCH_ENV
+    
+    llm_kwargs = dict(model="claude-3-5-sonnet-20240620",
+        base_url=get_backend_url(f"v1beta/models/claude-3-5-sonnet-20240620"),
+        extra_headers={
+            "x-operative-api-key": api_key,
+            "x-operative-tool-call-id": tool_call_id
+        })
+    
+    mode = get_llm_mode()
+    if mode == "live":
+        return ChatAnthropic(**llm_kwargs)
+    
+    cassette_path = default_cassette_path(task)
+    send_log(f"LLM {mode} mode using cassette {cassette_path}", "📼", log_type='status')
+    return ReplayableChatAnthropic(
+        llm_mode=mode,
+        cassette_path=cassette_path,
+        replay_timing=os.environ.get(LLM_REPLAY_TIMING_ENV, "recorded").strip().lower(),
+        replay_match=os.environ.get(LLM_REPLAY_MATCH_ENV, "key").strip().lower(),
+        **llm_kwargs
+    )
+
+# --- Progress reporting to the MCP client ---
+# Longest action parameter value shown in a progress message
+PROGRESS_PARAM_CHARS = 60
+
+def _summarize_actions(agent_output) -> str:
+    """Short 'name(param=value)' summary of the actions the agent chose for a step."""
+    parts = []
+    for action in getattr(agent_output, 'action', None) or []:
+        dumped = action.model_dump(exclude_none=True)
+        for name, params in dumped.items():
+            args = ", ".join(
+                f"{key}={str(value)[:PROGRESS_PARAM_CHARS]}" for key, value in (params or {}).items()
+            )
+            parts.append(f"{name}({args})")
+    return ", ".join(parts) or "no action"
+
+def _collect_new_errors(since: float, last_result=None) -> List[str]:
+    """Errors captured after `since`: console errors, failed requests and failed actions of the previous step."""
+    errors = []
+    # Console storage is in capture order, so walk back only until older entries
+    for log in reversed(console_log_storage):
+        if log.get('timestamp', 0) <= since:
+            break
+        if log.get('type') == 'error':
+            errors.append(log.get('text', 'Unknown error'))
+    errors.reverse()
+    # Responses complete out of order, so failed requests are matched on their response time
+    for req in network_request_storage:
+        status = req.get('response_status')
+        if isinstance(status, int) and status >= 400 and req.get('response_timestamp', 0) > since:
+            errors.append(f"{req.get('method', 'GET')} {req.get('url')} - Status: {status}")
+    for result in last_result or []:
+        if getattr(result, 'error', None):
+            errors.append(f"Action error: {result.error.strip().splitlines()[-1]}")
+    return errors
+
+async def _report_step_progress(ctx: Context, step_number: int, url: str, agent_output, new_errors: List[str]) -> None:
+    """Send a progress notification and a log message for an agent step to the MCP client."""
+    message = f"Step {step_number}: {url} -> {_summarize_actions(agent_output)}"
+    if new_errors:
+        message += f" | {len(new_errors)} new error(s): " + "; ".join(e[:200] for e in new_errors[:5])
+    try:
+        await ctx.report_progress(step_number)
+        if new_errors:
+            await ctx.warning(message)
+        else:
+            await ctx.info(message)
+    except Exception as e:
+        # The client may have gone away; progress must never break the run
+        send_log(f"Failed to report progress to MCP client: {e}", "⚠️", log_type='status')
 
-async def run_browser_task(task: str, tool_call_id: str = None, api_key: str = None, headless: bool = True) -> Dict[str, Any]:
-    global browser_task_loop, screenshot_task
+async def run_browser_task(task: str, tool_call_id: str = None, api_key: str = None, headless: bool = True, llm: Any = None, ctx: Optional[Context] = None) -> Dict[str, Any]:
+    global browser_task_loop, screenshot_task, active_input_channel
     # Store the current asyncio loop for input handling
     browser_task_loop = asyncio.get_running_loop()
     """
@@ -593,20 +632,24 @@ async def run_browser_task(task: str, tool_call_id: str = None, api_key: str = N
         task: The task to run.
         tool_call_id: The tool call ID for API headers.
         api_key: The API key for authentication.
+        headless: Whether to run the browser headless.
+        llm: Chat model to drive the agent; defaults to the Operative-backed ChatAnthropic.
+        ctx: MCP context of the tool call; if given, each step is reported to the client as it starts.
 
     Returns:
         str: Agent's final result (stringified).
     """
-    global agent_instance, console_log_storage, network_request_storage, screenshot_storage, original_create_context, _original_bring_to_front
+    global agent_instance, agent_run_id, console_log_storage, network_request_storage, screenshot_storage, original_create_context, _original_bring_to_front
     global active_cdp_session, active_screencast_running
     
-    # Clear screenshot storage for this run
-    screenshot_storage.clear()
     import traceback # Make sure traceback is imported for error logging
 
-    # --- Clear Logs for this Run ---
-    console_log_storage.clear()
-    network_request_storage.clear()
+    # --- Clear screenshots and logs for this run ---
+    run_memory.reset()
+
+    # Per-step latency breakdown, streamed to the dashboard as each step finishes
+    from .log_server import send_step_timing
+    profiler = StepProfiler(on_step=send_step_timing)
 
     # Local Playwright variables for this run
     playwright = None
@@ -627,9 +670,12 @@ async def run_browser_task(task: str, tool_call_id: str = None, api_key: str = N
 
     try:
         # Apply the patch to prevent focus stealing
-        global _original_bring_to_front
+        global _original_bring_to_front, _original_screenshot
         _original_bring_to_front = PlaywrightPage.bring_to_front
         PlaywrightPage.bring_to_front = _no_bring_to_front
+        if PlaywrightPage.screenshot is not _screenshot_without_overlay:
+            _original_screenshot = PlaywrightPage.screenshot
+            PlaywrightPage.screenshot = _screenshot_without_overlay
         
         # --- Initialize Playwright Directly ---
         playwright = await async_playwright().start()
@@ -645,7 +691,7 @@ async def run_browser_task(task: str, tool_call_id: str = None, api_key: str = N
         # --- Check for persisted browser state ---
         persisted_state = _get_persisted_state()
         if persisted_state:
-            send_log(f"Loading persisted browser state from {persisted_state}", "💾", log_type='status')
+            send_log(f"Loading persisted browser state from {persisted_state.path}", "💾", log_type='status')
         
         # --- Create browser-use Browser ---
         browser_config = BrowserConfig(disable_security=True, headless=headless, cdp_url="http://127.0.0.1:9222")
@@ -659,16 +705,21 @@ async def run_browser_task(task: str, tool_call_id: str = None, api_key: str = N
         try:
             # Create a context and page as recommended
             context = await playwright_browser.new_context(
-                storage_state=persisted_state
+                storage_state=persisted_state.data if persisted_state else None
             )
+            if persisted_state:
+                context._operative_state_fingerprint = persisted_state.fingerprint
             first_page = await context.new_page()
             
             # Create a CDP session for the page
             try:
                 cdp_session = await context.new_cdp_session(first_page)
                 # Store the CDP session globally for input handling
-                global active_cdp_session
+                global active_cdp_session, active_input_channel
                 active_cdp_session = cdp_session
+                # Dashboard input for this session is queued, coalesced and dispatched in order
+                active_input_channel = InputChannel(cdp_session, on_stats=send_input_latency, on_error=_handle_input_error)
+                set_input_channel(active_input_channel)
             except Exception as cdp_error:
                 send_log(f"Failed to create CDP session: {cdp_error}", "❌", log_type='status')
                 import traceback
@@ -796,28 +847,35 @@ async def run_browser_task(task: str, tool_call_id: str = None, api_key: str = N
             if original_create_context is None:
                  raise RuntimeError("Original _create_context not stored correctly")
 
-            # Check for persisted browser state
+            # Check for persisted browser state (parsed once per file version)
             persisted_state = _get_persisted_state()
-            if persisted_state:
-                send_log(f"Loading persisted browser state in new context", "💾", log_type='status')
             
-            # Call the original method but with storage_state if available
-            raw_playwright_context = await original_create_context(self, browser_pw)
+            # Call the original method, passing storage_state natively if it creates a new context
+            created_with_state = []
+            if persisted_state:
+                async def new_context_with_state(*args, **kwargs):
+                    kwargs.setdefault("storage_state", persisted_state.data)
+                    new_context = await type(browser_pw).new_context(browser_pw, *args, **kwargs)
+                    new_context._operative_state_fingerprint = persisted_state.fingerprint
+                    created_with_state.append(new_context)
+                    return new_context
+                browser_pw.new_context = new_context_with_state
+            try:
+                raw_playwright_context = await original_create_context(self, browser_pw)
+            finally:
+                if persisted_state:
+                    del browser_pw.new_context  # Back to the class method
             
-            # Apply storage state after context creation if available
+            # If an existing context was reused, add cookies only if it does not hold this state yet
             if persisted_state and raw_playwright_context:
-                try:
-                    with open(persisted_state, 'r') as f:
-                        state_data = json.load(f)
-                    
-                    # Load cookies and localStorage from state
-                    if 'cookies' in state_data:
-                        await raw_playwright_context.add_cookies(state_data['cookies'])
-                    
-                    # Origins with storage set is already handled by Playwright internally
-                    send_log(f"Applied persisted browser state to context", "💾", log_type='status')
-                except Exception as e:
-                    send_log(f"Failed to apply persisted state to context: {e}", "⚠️", log_type='status')
+                if created_with_state:
+                    send_log("Created context with persisted browser state", "💾", log_type='status')
+                else:
+                    try:
+                        if await _apply_persisted_state(raw_playwright_context, persisted_state):
+                            send_log("Applied persisted browser state to context", "💾", log_type='status')
+                    except Exception as e:
+                        send_log(f"Failed to apply persisted state to context: {e}", "⚠️", log_type='status')
 
             if raw_playwright_context:
                 # Use the non-async wrapper functions for event listeners
@@ -825,19 +883,17 @@ async def run_browser_task(task: str, tool_call_id: str = None, api_key: str = N
                 raw_playwright_context.on("request", handle_request)
                 raw_playwright_context.on("requestfailed", handle_request_failed)
                 raw_playwright_context.on("response", handle_response)
+                raw_playwright_context.on("requestfinished", handle_request_finished)
                 raw_playwright_context.on("weberror", handle_web_error)
                 raw_playwright_context.on("pageerror", handle_page_error)
                 
-                # Set up agent controls for existing pages
-                for page in raw_playwright_context.pages:
-                    await setup_page_agent_controls(page)
-                
-                # Define non-async wrapper function for page event
-                def on_page(page):
-                    asyncio.create_task(setup_page_agent_controls(page))
+                # Install agent controls once for the whole context
+                await install_agent_controls(raw_playwright_context)
                 
-                # Set up agent controls for new pages using non-async wrapper
-                raw_playwright_context.on("page", on_page)
+                # Set up navigation logging for existing and new pages
+                for page in raw_playwright_context.pages:
+                    setup_page_agent_controls(page)
+                raw_playwright_context.on("page", setup_page_agent_controls)
                 
                 send_log("Log listeners and agent controls attached.", "👂", log_type='status') # Type: status
             else:
@@ -851,26 +907,32 @@ async def run_browser_task(task: str, tool_call_id: str = None, api_key: str = N
         if tool_call_id is None:
             tool_call_id = str(uuid.uuid4())
             send_log(f"Generated tool_call_id: {tool_call_id}", "🆔", log_type='status') # Type: status
+        start_har_writer(tool_call_id)
 
         # --- LLM Setup ---
-        from .env_utils import get_backend_url
-        
-        llm = ChatAnthropic(model="claude-3-5-sonnet-20240620",
-            base_url=get_backend_url(f"v1beta/models/claude-3-5-sonnet-20240620"),
-            extra_headers={
-                "x-operative-api-key": api_key,
-                "x-operative-tool-call-id": tool_call_id
-            })
-        send_log(f"LLM ({llm.model}) configured.", "🤖", log_type='status') # Type: status
+        if llm is None:
+            llm = _create_llm(api_key, tool_call_id, task)
+        model_name = getattr(llm, "model", None) or getattr(llm, "model_name", type(llm).__name__)
+        send_log(f"LLM ({model_name}) configured.", "🤖", log_type='status') # Type: status
 
         # --- Agent Callback ---
+        progress_since = time.time()
         async def state_callback(browser_state, agent_output, step_number):
             global agent_instance, screenshot_storage # Ensure we have access to the agent and screenshot storage
+            nonlocal progress_since
 
             # Send agent output with type 'agent'
             send_log(f"Step {step_number}", "📍", log_type='agent')
             send_log(f"URL: {browser_state.url}", "🔗", log_type='agent')
 
+            # Stream the step to the MCP client so it can follow (or cancel) the run
+            if ctx is not None:
+                reported_at = time.time()
+                last_result = agent_instance.state.last_result if agent_instance else None
+                new_errors = _collect_new_errors(progress_since, last_result)
+                progress_since = reported_at
+                await _report_step_progress(ctx, step_number, browser_state.url, agent_output, new_errors)
+
             # Capture screenshot at each step
             try:
                 if agent_instance and agent_instance.browser_context:
@@ -879,18 +941,20 @@ async def run_browser_task(task: str, tool_call_id: str = None, api_key: str = N
 
                     if current_page:
                         # Take screenshot
-                        screenshot_bytes = await current_page.screenshot(type='jpeg', quality=80)
-                        screenshot_base64 = base64.b64encode(screenshot_bytes).decode('utf-8')
+                        with profiler.span("screenshot_capture"):
+                            screenshot_bytes = await current_page.screenshot(type='jpeg', quality=80)
+                        with profiler.span("screenshot_encode"):
+                            screenshot_base64 = base64.b64encode(screenshot_bytes).decode('utf-8')
+                            # Store screenshot with metadata and include the data URL prefix
+                            screenshot_data_url = f"data:image/jpeg;base64,{screenshot_base64}"
                         
                         # Log screenshot size for debugging
                         send_log(f"Screenshot captured: {len(screenshot_bytes)} bytes, {len(screenshot_base64)} base64 chars", "📊", log_type='status')
                         
-                        # Store screenshot with metadata and include the data URL prefix
-                        screenshot_data_url = f"data:image/jpeg;base64,{screenshot_base64}"
-                        screenshot_storage.append({
+                        run_memory.add_screenshot({
                             'step': step_number,
                             'url': browser_state.url,
-                            'timestamp': asyncio.get_event_loop().time(),
+                            'timestamp': time.time(),
                             'screenshot': screenshot_data_url  # Store with prefix already included
                         })
                         
@@ -901,8 +965,6 @@ async def run_browser_task(task: str, tool_call_id: str = None, api_key: str = N
                         await send_browser_view(screenshot_data_url)
                         send_log(f"Screenshot sent to Operative Control Center dashboard", "🖼️", log_type='status')
                         
-                        # Re-inject the overlay
-                        send_log(f"Re-injecting overlay after step {step_number} into page {current_page.url}", "🔄", log_type='status')
                     else:
                         send_log(f"Could not get current page from agent context for step {step_number}", "⚠️", log_type='status')
                 else:
@@ -912,7 +974,7 @@ async def run_browser_task(task: str, tool_call_id: str = None, api_key: str = N
                 # Add traceback for debugging other potential errors
                 import traceback
                 tb_str = traceback.format_exc()
-                send_log(f"Failed to capture screenshot or re-inject overlay after step: {e}\n{tb_str}", "⚠️", log_type='status')
+                send_log(f"Failed to capture screenshot after step: {e}\n{tb_str}", "⚠️", log_type='status')
 
             # Ensure agent_output is a string before logging
             output_str = str(agent_output)
@@ -923,17 +985,35 @@ async def run_browser_task(task: str, tool_call_id: str = None, api_key: str = N
             task=task,
             llm=llm,
             browser=agent_browser,
-            register_new_step_callback=state_callback
+            register_new_step_callback=profiler.wrap("callback", state_callback)
         )
         agent_instance = agent
+        agent_run_id = get_current_run_id()
+
+        # --- Profile each step: model request, actions and page state extraction ---
+        original_step = agent.step
+        async def profiled_step(*args, **kwargs):
+            # n_steps starts at 1 and is the number browser-use logs as "Step N"
+            profiler.start_step(agent.state.n_steps)
+            try:
+                return await original_step(*args, **kwargs)
+            finally:
+                profiler.finish_step()
+        agent.step = profiled_step
+        agent.get_next_action = profiler.wrap("llm", agent.get_next_action)
+        agent.multi_act = profiler.wrap("actions", agent.multi_act)
+        agent.browser_context.get_state = profiler.wrap("page_settle", agent.browser_context.get_state)
 
         send_log(f"Agent starting task: {task}", "🏃", log_type='agent') # Type: agent
         agent_result = await agent.run()
         send_log(f"Agent run finished.", "🏁", log_type='agent') # Type: agent
 
         # --- Prepare Combined Results ---
-        # Convert AgentHistoryList to a serializable format (just stringify)
-        serialized_result = str(agent_result)
+        # The final result text; callers read steps and success from the structured history
+        final_result = agent_result.final_result() or ""
+
+        # Final memory usage for the dashboard
+        run_memory.report()
 
         # Log information about screenshots before returning
         send_log(f"Returning {len(screenshot_storage)} screenshots from run_browser_task", "📸", log_type='status')
@@ -943,10 +1023,14 @@ async def run_browser_task(task: str, tool_call_id: str = None, api_key: str = N
         else:
             send_log("No screenshots captured during task execution!", "⚠️", log_type='status')
 
-        # Return the agent result and screenshots
+        # Return the agent result, screenshots and step timings
         return {
-            "result": serialized_result,
-            "screenshots": screenshot_storage
+            "result": final_result,
+            "screenshots": screenshot_storage,
+            "timings": profiler.summary(),
+            "history": agent_result,
+            "memory": run_memory.usage(),
+            "har_run_id": har_writer.run_id if har_writer else None
         }
 
     except Exception as e:
@@ -954,10 +1038,18 @@ async def run_browser_task(task: str, tool_call_id: str = None, api_key: str = N
         send_log(error_message, "❌", log_type='status') # Type: status
         return {
             "result": error_message,
-            "screenshots": screenshot_storage
+            "screenshots": screenshot_storage,
+            "timings": profiler.summary()
         }
     finally:
         # --- Cleanup ---
+        # Stop queuing dashboard input for this run's CDP session
+        if active_input_channel is not None:
+            set_input_channel(None)
+            active_input_channel.report()
+            active_input_channel.close()
+            active_input_channel = None
+
         # Cancel the screenshot task if it's running
         if screenshot_task:
             screenshot_task.cancel()
@@ -971,6 +1063,8 @@ async def run_browser_task(task: str, tool_call_id: str = None, api_key: str = N
         # Restore the original bring_to_front method
         if _original_bring_to_front:
             PlaywrightPage.bring_to_front = _original_bring_to_front
+        if _original_screenshot:
+            PlaywrightPage.screenshot = _original_screenshot
             
         # Ensure patch is restored
         if local_original_create_context:
@@ -988,8 +1082,12 @@ async def run_browser_task(task: str, tool_call_id: str = None, api_key: str = N
             playwright = None
             send_log("Playwright instance for task stopped.", "🧹", log_type='status') # Type: status
 
+        # Terminate the HAR document; requests still in flight are not recorded
+        close_har_writer()
+
         # Clear the global instance if it was set
         agent_instance = None
+        agent_run_id = None
         
         # Clear the browser task loop reference
         browser_task_loop = None
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+import re
+from typing import Any, Dict, List, Optional
+
+# Distinct console fingerprints kept per run; further new messages are only counted
+MAX_CONSOLE_GROUPS = 1000
+# Characters of the first message kept as the group's sample
+MAX_SAMPLE_CHARS = 2000
+
+# Parts of a console message that vary between repeats of the same issue
+_FINGERPRINT_PATTERNS = [
+    (re.compile(r'\b[a-z][a-z0-9+.-]*://[^\s\'")]+', re.IGNORECASE), '<url>'),
+    (re.compile(r'\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b', re.IGNORECASE), '<uuid>'),
+    (re.compile(r'\b0x[0-9a-f]+\b', re.IGNORECASE), '<hex>'),
+    (re.compile(r'\b(?=[0-9a-f]*\d)[0-9a-f]{12,}\b', re.IGNORECASE), '<id>'),
+    (re.compile(r'\d+(\.\d+)?'), '<n>'),
+]
+
+def fingerprint(message_type: str, text: str) -> str:
+    """Normalize a console message so repeats of the same issue share a key."""
+    normalized = text or ''
+    for pattern, replacement in _FINGERPRINT_PATTERNS:
+        normalized = pattern.sub(replacement, normalized)
+    return f"{message_type}:{' '.join(normalized.split())[:500]}"
+
+class ConsoleGroups:
+    """
+    Aggregates console entries by fingerprint as they are captured.
+
+    Each group keeps the first message as a sample, the number of occurrences and the
+    first and last timestamps. Groups are kept in order of first appearance.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.groups: Dict[str, Dict[str, Any]] = {}
+        self.total = 0
+        self.ungrouped = 0  # Messages that arrived after MAX_CONSOLE_GROUPS was reached
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        message_type = entry.get('type', 'log')
+        text = entry.get('text', '')
+        timestamp = entry.get('timestamp', 0)
+        key = fingerprint(message_type, text)
+        self.total += 1
+
+        group = self.groups.get(key)
+        if group is not None:
+            group['count'] += 1
+            group['last_timestamp'] = timestamp
+            return
+        if len(self.groups) >= MAX_CONSOLE_GROUPS:
+            self.ungrouped += 1
+            return
+        self.groups[key] = {
+            'fingerprint': key,
+            'type': message_type,
+            'text': text[:MAX_SAMPLE_CHARS],
+            'location': entry.get('location'),
+            'count': 1,
+            'first_timestamp': timestamp,
+            'last_timestamp': timestamp,
+        }
+
+    def list(self, message_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Groups in order of first appearance, optionally only those of one message type."""
+        if message_type is None:
+            return list(self.groups.values())
+        return [g for g in self.groups.values() if g['type'] == message_type]
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+
+import base64
+import json
+import os
+import re
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+# One HAR file per run, named after the run's tool call id
+HAR_DIR = os.path.expanduser("~/.operative/har")
+# Older HAR files beyond this count are deleted when a new run starts
+HAR_KEEP_RUNS = 20
+
+# OPERATIVE_HAR_MAX_BODY_BYTES: include response bodies up to this size (0 = no bodies)
+HAR_MAX_BODY_BYTES_ENV = "OPERATIVE_HAR_MAX_BODY_BYTES"
+
+_RUN_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]+$")
+
+_HAR_HEADER = '{"log":{"version":"1.2","creator":{"name":"web-eval-agent","version":"1"},"pages":[],"entries":['
+_HAR_FOOTER = ']}}'
+
+# Writers of runs in progress, by run id (read by the log server's download endpoint)
+_active_writers: Dict[str, "HarWriter"] = {}
+_active_lock = threading.Lock()
+
+def get_har_max_body_bytes() -> int:
+    """Return the configured response body cap in bytes (0 disables bodies)."""
+    try:
+        return max(0, int(os.environ.get(HAR_MAX_BODY_BYTES_ENV, "0")))
+    except ValueError:
+        return 0
+
+def har_path(run_id: str) -> Optional[str]:
+    """Path of the HAR file for a run id, or None if the id is not a valid file name."""
+    if not run_id or not _RUN_ID_PATTERN.match(run_id):
+        return None
+    return os.path.join(HAR_DIR, f"{run_id}.har")
+
+def list_har_files() -> List[Dict[str, Any]]:
+    """Saved HAR files, newest first."""
+    try:
+        names = [n for n in os.listdir(HAR_DIR) if n.endswith(".har")]
+    except OSError:
+        return []
+    files = []
+    for name in names:
+        try:
+            stat = os.stat(os.path.join(HAR_DIR, name))
+        except OSError:
+            continue
+        run_id = name[:-len(".har")]
+        files.append({"run_id": run_id, "size": stat.st_size, "modified": stat.st_mtime, "active": run_id in _active_writers})
+    files.sort(key=lambda f: f["modified"], reverse=True)
+    return files
+
+def read_har(run_id: str) -> Optional[str]:
+    """Return the HAR document of a run as a string, closing it if the run is still in progress."""
+    with _active_lock:
+        writer = _active_writers.get(run_id)
+    if writer is not None:
+        return writer.snapshot()
+    path = har_path(run_id)
+    if path is None:
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+    except OSError:
+        return None
+    # A run that crashed before close() leaves the entries array open
+    return text if text.endswith(_HAR_FOOTER) else text + _HAR_FOOTER
+
+def _prune_old_files() -> None:
+    for stale in list_har_files()[HAR_KEEP_RUNS - 1:]:
+        if stale["active"]:
+            continue
+        try:
+            os.remove(os.path.join(HAR_DIR, f"{stale['run_id']}.har"))
+        except OSError:
+            pass
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat().replace("+00:00", "Z")
+
+def _name_values(items: Dict[str, str]) -> List[Dict[str, str]]:
+    return [{"name": k, "value": v} for k, v in (items or {}).items()]
+
+def _duration(start: float, end: float) -> float:
+    return round(end - start, 3) if start >= 0 and end >= 0 and end >= start else -1
+
+def _timings(timing: Dict[str, float]) -> Dict[str, float]:
+    """Map Playwright's resource timing (ms relative to startTime, -1 if unknown) to HAR timings."""
+    request_start = timing.get("requestStart", -1)
+    response_start = timing.get("responseStart", -1)
+    connect_start = timing.get("connectStart", -1)
+    ssl_start = timing.get("secureConnectionStart", -1)
+    # Queueing time before the first network phase that happened
+    first_phase = next((t for t in (timing.get("domainLookupStart", -1), connect_start, request_start) if t >= 0), -1)
+    return {
+        "blocked": round(first_phase, 3) if first_phase >= 0 else -1,
+        "dns": _duration(timing.get("domainLookupStart", -1), timing.get("domainLookupEnd", -1)),
+        "connect": _duration(connect_start, timing.get("connectEnd", -1)),
+        "ssl": _duration(ssl_start, timing.get("connectEnd", -1)) if ssl_start > 0 else -1,
+        "send": 0,
+        "wait": max(0, _duration(request_start, response_start)),
+        "receive": max(0, _duration(response_start, timing.get("responseEnd", -1))),
+    }
+
+class HarWriter:
+    """
+    Streams the network entries of one run to a HAR 1.2 file as requests complete.
+
+    Entries are appended to the open "entries" array and flushed one by one, so memory
+    stays bounded by the requests in flight. close() terminates the document; a file
+    left open by a crashed run is completed by read_har().
+    """
+
+    def __init__(self, run_id: str, max_body_bytes: Optional[int] = None):
+        path = har_path(run_id)
+        if path is None:
+            raise ValueError(f"Invalid HAR run id: {run_id!r}")
+        self.run_id = run_id
+        self.path = path
+        self.max_body_bytes = get_har_max_body_bytes() if max_body_bytes is None else max_body_bytes
+        self.entries = 0
+        self._lock = threading.Lock()
+        os.makedirs(HAR_DIR, exist_ok=True)
+        _prune_old_files()
+        self._file = open(path, "w", encoding="utf-8")
+        self._file.write(_HAR_HEADER)
+        self._file.flush()
+        with _active_lock:
+            _active_writers[run_id] = self
+
+    @property
+    def closed(self) -> bool:
+        return self._file is None
+
+    def write_entry(self, entry: Dict[str, Any]) -> None:
+        """Append one HAR entry and flush it to disk."""
+        data = json.dumps(entry, separators=(",", ":"), ensure_ascii=False, default=str)
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(("," if self.entries else "") + data)
+            self._file.flush()
+            self.entries += 1
+
+    def snapshot(self) -> str:
+        """The document written so far, terminated so it parses."""
+        with self._lock:
+            with open(self.path, "r", encoding="utf-8") as f:
+                text = f.read()
+        return text if text.endswith(_HAR_FOOTER) else text + _HAR_FOOTER
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(_HAR_FOOTER)
+            self._file.close()
+            self._file = None
+        with _active_lock:
+            _active_writers.pop(self.run_id, None)
+
+    async def add_request(self, request, failure: Optional[str] = None) -> None:
+        """Build the HAR entry for a finished or failed Playwright request and write it."""
+        if self.closed:
+            return
+        timing = request.timing or {}
+        started = timing.get("startTime", 0) / 1000
+
+        try:
+            request_headers = await request.all_headers()
+        except Exception:
+            request_headers = request.headers
+        response = None if failure else await request.response()
+        post_body = request.post_data_buffer
+
+        har_request = {
+            "method": request.method,
+            "url": request.url,
+            "httpVersion": "HTTP/1.1",
+            "cookies": [],
+            "headers": _name_values(request_headers),
+            "queryString": [{"name": k, "value": v} for k, v in parse_qsl(urlsplit(request.url).query, keep_blank_values=True)],
+            "headersSize": -1,
+            "bodySize": len(post_body or b""),
+        }
+        if post_body is not None:
+            har_request["postData"] = {"mimeType": request_headers.get("content-type", ""), "text": ""}
+            if self.max_body_bytes:
+                try:
+                    har_request["postData"]["text"] = post_body.decode("utf-8")[:self.max_body_bytes]
+                except UnicodeDecodeError:
+                    # request.post_data raises on non-UTF-8 bodies; keep them base64 encoded
+                    har_request["postData"]["text"] = base64.b64encode(post_body[:self.max_body_bytes]).decode("ascii")
+                    har_request["postData"]["encoding"] = "base64"
+
+        har_response = {
+            "status": 0,
+            "statusText": "",
+            "httpVersion": "HTTP/1.1",
+            "cookies": [],
+            "headers": [],
+            "content": {"size": 0, "mimeType": ""},
+            "redirectURL": "",
+            "headersSize": -1,
+            "bodySize": -1,
+        }
+        if response is not None:
+            try:
+                response_headers = await response.all_headers()
+            except Exception:
+                response_headers = response.headers
+            mime_type = response_headers.get("content-type", "")
+            har_response.update({
+                "status": response.status,
+                "statusText": response.status_text,
+                "headers": _name_values(response_headers),
+                "redirectURL": response_headers.get("location", ""),
+                "content": {"size": -1, "mimeType": mime_type},
+            })
+            await self._add_body(response, response_headers, har_response)
+        elif failure:
+            har_response["_failureText"] = failure
+
+        timings = _timings(timing)
+        response_end = timing.get("responseEnd", -1)
+        total = response_end if response_end >= 0 else sum(v for v in timings.values() if v > 0)
+        self.write_entry({
+            "startedDateTime": _iso(started),
+            "time": round(total, 3),
+            "request": har_request,
+            "response": har_response,
+            "cache": {},
+            "timings": timings,
+            "_resourceType": request.resource_type,
+        })
+
+    async def _add_body(self, response, headers: Dict[str, str], har_response: Dict[str, Any]) -> None:
+        if not self.max_body_bytes:
+            return
+        try:
+            declared = int(headers.get("content-length", "-1"))
+        except ValueError:
+            declared = -1
+        if declared > self.max_body_bytes:
+            har_response["content"]["size"] = declared
+            har_response["content"]["comment"] = f"Body omitted (over {self.max_body_bytes} bytes)"
+            return
+        try:
+            body = await response.body()
+        except Exception:
+            return
+        content = har_response["content"]
+        content["size"] = len(body)
+        har_response["bodySize"] = len(body)
+        if len(body) > self.max_body_bytes:
+            content["comment"] = f"Body omitted (over {self.max_body_bytes} bytes)"
+            return
+        try:
+            content["text"] = body.decode("utf-8")
+        except UnicodeDecodeError:
+            content["text"] = base64.b64encode(body).decode("ascii")
+            content["encoding"] = "base64"
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Scroll dispatches are spaced by at least one live view frame (the capture loop runs at
+# 30 FPS); deltas arriving in between are merged into the pending scroll
+FRAME_INTERVAL_SECONDS = 1 / 30
+# Input-to-frame latency samples kept for the percentiles
+LATENCY_SAMPLES = 1000
+# CDP input commands sent but not yet acknowledged before the worker waits
+MAX_IN_FLIGHT = 16
+# Longest dashboard-measured latency accepted, in milliseconds; the dashboard stops
+# waiting for an event's frame after the same time (INPUT_ACK_TIMEOUT_MS in index.html)
+MAX_CLIENT_LATENCY_MS = 10000
+# Minimum interval between input_latency updates to the dashboard
+STATS_REPORT_INTERVAL_SECONDS = 1.0
+
+def percentiles(samples, points=(50, 90, 99)) -> Dict[str, float]:
+    """Percentiles of latency samples in seconds, as milliseconds keyed "p50", "p90"..."""
+    if not samples:
+        return {f"p{p}": 0.0 for p in points}
+    ordered = sorted(samples)
+    return {f"p{p}": round(ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1000, 1) for p in points}
+
+def map_modifiers(details: Dict[str, Any]) -> int:
+    """Maps modifier keys from frontend details to CDP modifier bitmask."""
+    modifiers = 0
+    if details.get('altKey'): modifiers |= 1
+    if details.get('ctrlKey'): modifiers |= 2
+    if details.get('metaKey'): modifiers |= 4 # Command key on Mac
+    if details.get('shiftKey'): modifiers |= 8
+    return modifiers
+
+def cdp_input_commands(event_type: str, details: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    The CDP commands (method, params) that replay a dashboard input event, in order.
+
+    Returns an empty list for unknown event types.
+    """
+    if event_type == 'click':
+        # CDP expects separate press and release events for a click
+        mouse = {
+            "button": details.get('button', 'left'),
+            "x": details.get('x', 0),
+            "y": details.get('y', 0),
+            "modifiers": map_modifiers(details),
+            "clickCount": details.get('clickCount', 1),
+        }
+        return [("Input.dispatchMouseEvent", {"type": "mousePressed", **mouse}),
+                ("Input.dispatchMouseEvent", {"type": "mouseReleased", **mouse})]
+
+    if event_type in ('keydown', 'keyup'):
+        key = details.get('key', '')
+        key_params = {
+            "type": "keyDown" if event_type == 'keydown' else "keyUp",
+            "modifiers": map_modifiers(details),
+            "key": key,
+            "code": details.get('code', ''),
+        }
+        if event_type == 'keydown':
+            # Printable characters need 'text' to appear in input fields
+            if len(key) == 1:
+                key_params["text"] = key
+            # Backspace also needs the editing command to delete anything
+            if key == 'Backspace':
+                key_params["commands"] = ["deleteBackward"]
+        return [("Input.dispatchKeyEvent", key_params)]
+
+    if event_type == 'scroll':
+        return [("Input.dispatchMouseEvent", {
+            "type": "mouseWheel",
+            "x": details.get('x', 0),
+            "y": details.get('y', 0),
+            "deltaX": details.get('deltaX', 0),
+            "deltaY": details.get('deltaY', 0),
+            "modifiers": 0, # Modifiers usually not needed for scroll
+        })]
+
+    return []
+
+class InputChannel:
+    """
+    Ordered, coalescing, pipelined queue of dashboard input events for one CDP session.
+
+    submit() may be called from any thread. Events are handed to the browser loop and
+    turned into CDP commands by a single worker task, in arrival order. Consecutive
+    scroll events that have not been dispatched yet are merged by summing their deltas,
+    and scrolls are dispatched at most once per frame interval, so a burst of wheel
+    events costs one CDP call per frame. Clicks and keys are never merged or reordered.
+
+    Commands are pipelined: the worker starts each send without waiting for the previous
+    one to be acknowledged (up to MAX_IN_FLIGHT). Tasks start in creation order and
+    Playwright writes the message in the first step of send(), so commands reach the
+    session in order; CDP handles a session's commands in order. This replaces the
+    fixed sleep between mouse press and release.
+
+    Latency is measured two ways:
+      - input-to-frame: from submit() to the next live view frame sent after the event's
+        last command was acknowledged (frame_sent())
+      - end-to-end: the dashboard numbers its events (seq), frames carry the highest seq
+        each tab sent that is now on screen, and the dashboard reports back the time
+        between sending an event and displaying that frame (add_client_latencies()).
+        Events that fail are reported as dropped instead, so the dashboard doesn't count
+        them as shown by a later frame. A scroll merged into a later one is shown with it.
+    """
+
+    def __init__(self, session, on_stats: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 on_error: Optional[Callable[[Exception], None]] = None):
+        self.session = session
+        self.on_stats = on_stats
+        self.on_error = on_error
+        self.loop = asyncio.get_running_loop()
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.client_latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.received = 0
+        self.dispatched = 0
+        self.coalesced = 0
+        self.errors = 0
+        self._pending = deque()  # [event_type, details, received_at, seq, client], oldest first
+        self._in_flight = set()
+        self._awaiting_frame: List[float] = []
+        self._frame_seqs: Dict[str, int] = {}  # client -> highest seq dispatched since the last frame
+        self._dropped_seqs: Dict[str, List[int]] = {}  # client -> seqs that failed since the last frame
+        self._wakeup = asyncio.Event()
+        self._last_scroll = 0.0
+        self._last_report = 0.0
+        self._closed = False
+        self._worker = self.loop.create_task(self._run())
+
+    def submit(self, event_type: str, details: Dict[str, Any], seq: Optional[int] = None,
+               client: Optional[str] = None) -> bool:
+        """Queue an input event from any thread. Returns False if the channel is closed.
+
+        seq and client (the dashboard tab id) let frames report which events they show.
+        """
+        if self._closed:
+            return False
+        try:
+            self.loop.call_soon_threadsafe(self._enqueue, event_type, dict(details or {}), time.monotonic(), seq, client)
+        except RuntimeError:
+            return False  # Loop closed
+        return True
+
+    def _enqueue(self, event_type: str, details: Dict[str, Any], received_at: float,
+                 seq: Optional[int], client: Optional[str]) -> None:
+        self.received += 1
+        tail = self._pending[-1] if self._pending else None
+        if event_type == 'scroll' and tail is not None and tail[0] == 'scroll' and tail[4] == client:
+            # Merge into the scroll still waiting; latency counts from its first delta
+            merged = tail[1]
+            merged['deltaX'] = merged.get('deltaX', 0) + details.get('deltaX', 0)
+            merged['deltaY'] = merged.get('deltaY', 0) + details.get('deltaY', 0)
+            merged['x'] = details.get('x', merged.get('x', 0))
+            merged['y'] = details.get('y', merged.get('y', 0))
+            if seq is not None:
+                tail[3] = seq
+            self.coalesced += 1
+            return
+        self._pending.append([event_type, details, received_at, seq, client])
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        while not self._closed:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            event_type = self._pending[0][0]
+            if event_type == 'scroll':
+                wait = self._last_scroll + FRAME_INTERVAL_SECONDS - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)  # The scroll stays queued, so more deltas can merge
+                self._last_scroll = time.monotonic()
+            event_type, details, received_at, seq, client = self._pending.popleft()
+
+            commands = cdp_input_commands(event_type, details)
+            if not commands:
+                self._dropped(seq, client)
+                self._failed(ValueError(f"Unknown input type: {event_type}"))
+                continue
+            for method, params in commands:
+                while len(self._in_flight) >= MAX_IN_FLIGHT:
+                    await asyncio.wait(self._in_flight, return_when=asyncio.FIRST_COMPLETED)
+                task = self.loop.create_task(self.session.send(method, params))
+                self._in_flight.add(task)
+                task.add_done_callback(self._command_done)
+            # The event is on screen once its last command is acknowledged
+            task.add_done_callback(lambda t, r=received_at, s=seq, c=client: self._event_done(t, r, s, c))
+
+    def _command_done(self, task: asyncio.Task) -> None:
+        self._in_flight.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self._failed(task.exception())
+
+    def _event_done(self, task: asyncio.Task, received_at: float, seq: Optional[int], client: Optional[str]) -> None:
+        if task.cancelled() or task.exception() is not None:
+            self._dropped(seq, client)
+            return
+        self.dispatched += 1
+        self._awaiting_frame.append(received_at)
+        if seq is not None and client is not None:
+            self._frame_seqs[client] = max(seq, self._frame_seqs.get(client, seq))
+
+    def _dropped(self, seq: Optional[int], client: Optional[str]) -> None:
+        if seq is not None and client is not None:
+            self._dropped_seqs.setdefault(client, []).append(seq)
+
+    def _failed(self, error: Exception) -> None:
+        self.errors += 1
+        if self.on_error:
+            try:
+                self.on_error(error)
+            except Exception:
+                pass
+
+    def frame_sent(self) -> Tuple[Optional[Dict[str, int]], Optional[Dict[str, List[int]]]]:
+        """Record a live view frame: events acknowledged since the last one are now visible.
+
+        Returns, to send along with the frame, the highest event seq per dashboard tab that
+        it shows for the first time and the seqs per tab that failed since the last frame
+        (each None if there are none).
+        """
+        dropped, self._dropped_seqs = self._dropped_seqs, {}
+        if not self._awaiting_frame:
+            return None, dropped or None
+        now = time.monotonic()
+        self.latencies.extend(now - received_at for received_at in self._awaiting_frame)
+        self._awaiting_frame.clear()
+        seqs, self._frame_seqs = self._frame_seqs, {}
+        self.report(force=False)
+        return seqs or None, dropped or None
+
+    def add_client_latencies(self, samples_ms) -> None:
+        """Add end-to-end latencies measured by a dashboard (milliseconds); invalid values are ignored."""
+        for sample in samples_ms or []:
+            if isinstance(sample, (int, float)) and 0 <= sample <= MAX_CLIENT_LATENCY_MS:
+                self.client_latencies.append(sample / 1000)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'received': self.received,
+            'dispatched': self.dispatched,
+            'coalesced': self.coalesced,
+            'errors': self.errors,
+            'queued': len(self._pending),
+            'in_flight': len(self._in_flight),
+            'samples': len(self.latencies),
+            'input_to_frame_ms': percentiles(self.latencies),
+            'end_to_end_samples': len(self.client_latencies),
+            'end_to_end_ms': percentiles(self.client_latencies),
+        }
+
+    def report(self, force: bool = True) -> None:
+        """Send the current stats to on_stats; unforced reports are throttled."""
+        if not self.on_stats:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_report < STATS_REPORT_INTERVAL_SECONDS:
+            return
+        self._last_report = now
+        try:
+            self.on_stats(self.stats())
+        except Exception:
+            pass
+
+    def close(self) -> None:
+        """Stop the worker and cancel unacknowledged commands. Call from the channel's loop."""
+        self._closed = True
+        self._pending.clear()
+        self._worker.cancel()
+        for task in list(self._in_flight):
+            task.cancel()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_anthropic import ChatAnthropic
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import PrivateAttr
+
+from .log_server import send_log
+
+# OPERATIVE_LLM_MODE: "live" (default), "record" or "replay"
+LLM_MODE_ENV = "OPERATIVE_LLM_MODE"
+# OPERATIVE_LLM_CASSETTE: cassette file; defaults to one file per task under CASSETTE_DIR
+LLM_CASSETTE_ENV = "OPERATIVE_LLM_CASSETTE"
+# OPERATIVE_LLM_REPLAY_TIMING: "recorded" (default), "fixed:<seconds>" or "none"
+LLM_REPLAY_TIMING_ENV = "OPERATIVE_LLM_REPLAY_TIMING"
+# OPERATIVE_LLM_REPLAY_MATCH: "key" (default) or "order" (serve the next unused response on a miss)
+LLM_REPLAY_MATCH_ENV = "OPERATIVE_LLM_REPLAY_MATCH"
+
+CASSETTE_DIR = os.path.expanduser("~/.operative/llm_cassettes")
+# Version 2 cassettes are JSON lines: a header line, then one line per interaction.
+# Version 1 cassettes (a single JSON document) can still be replayed.
+CASSETTE_VERSION = 2
+
+# Parts of a request that change between otherwise identical runs
+_NORMALIZE_PATTERNS = [
+    # Screenshots and other inline images
+    (re.compile(r'"data"\s*:\s*"[A-Za-z0-9+/=]{64,}"'), '"data": "<image>"'),
+    (re.compile(r'data:image/[a-z]+;base64,[A-Za-z0-9+/=]+'), '<image>'),
+    # Dates and times
+    (re.compile(r'\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?(Z|[+-]\d{2}:?\d{2})?'), '<datetime>'),
+    (re.compile(r'\d{4}-\d{2}-\d{2}'), '<date>'),
+    (re.compile(r'\b\d{1,2}:\d{2}(:\d{2})?\b'), '<time>'),
+    # Ephemeral local ports (e.g. fixture servers)
+    (re.compile(r'(localhost|127\.0\.0\.1|0\.0\.0\.0):\d+'), r'\1:<port>'),
+]
+
+def normalize_request(payload: Dict[str, Any]) -> str:
+    """Serialize a request payload with images, timestamps and local ports masked."""
+    text = json.dumps(payload, sort_keys=True, default=str)
+    for pattern, replacement in _NORMALIZE_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+def request_key(payload: Dict[str, Any]) -> str:
+    """Stable hash of a normalized request payload."""
+    return hashlib.sha256(normalize_request(payload).encode("utf-8")).hexdigest()
+
+def default_cassette_path(task: Optional[str] = None) -> str:
+    """Cassette path from OPERATIVE_LLM_CASSETTE, or one file per task under CASSETTE_DIR."""
+    configured = os.environ.get(LLM_CASSETTE_ENV)
+    if configured:
+        return os.path.expanduser(configured)
+    name = hashlib.sha1((task or "default").strip().encode("utf-8")).hexdigest()[:16]
+    return os.path.join(CASSETTE_DIR, f"{name}.jsonl")
+
+def get_llm_mode() -> str:
+    """Return the configured LLM transport mode."""
+    mode = os.environ.get(LLM_MODE_ENV, "live").strip().lower()
+    return mode if mode in ("live", "record", "replay") else "live"
+
+class ReplayableChatAnthropic(ChatAnthropic):
+    """
+    ChatAnthropic that records responses to a cassette or replays them without network.
+
+    Requests are keyed by a hash of the normalized request payload (messages, tools and
+    model settings). A request whose key is not in the cassette fails the replay, so a
+    changed prompt never gets the answer recorded for another one. With
+    replay_match="order" the next unused interaction in recorded order is served instead.
+    """
+
+    llm_mode: str = "live"
+    cassette_path: str = ""
+    replay_timing: str = "recorded"
+    replay_match: str = "key"
+
+    _interactions: List[Dict[str, Any]] = PrivateAttr(default_factory=list)
+    _used: set = PrivateAttr(default_factory=set)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+    _loaded: bool = PrivateAttr(default=False)
+    _header_written: bool = PrivateAttr(default=False)
+
+    # --- Cassette storage ---
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        if self.llm_mode == "record":
+            return  # Recording starts a fresh cassette
+        try:
+            with open(self.cassette_path, "r", encoding="utf-8") as f:
+                lines = [line for line in f if line.strip()]
+        except FileNotFoundError:
+            raise RuntimeError(f"LLM replay cassette not found: {self.cassette_path}")
+        for index, line in enumerate(lines):
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # E.g. a line cut short when a recording was interrupted
+            if index == 0 and "version" in entry:
+                self._interactions.extend(entry.get("interactions", []))  # Version 1 keeps them in the header
+            else:
+                self._interactions.append(entry)
+        send_log(f"Replaying {len(self._interactions)} LLM responses from {self.cassette_path}", "📼", log_type='status')
+
+    def _append(self, interaction: Dict[str, Any]) -> None:
+        """Append one interaction to the cassette; the first call starts a new file with the header."""
+        if not self._header_written:
+            os.makedirs(os.path.dirname(self.cassette_path) or ".", exist_ok=True)
+            with open(self.cassette_path, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"version": CASSETTE_VERSION, "model": self.model}) + "\n")
+            self._header_written = True
+        with open(self.cassette_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(interaction) + "\n")
+
+    def _record(self, key: str, result: ChatResult, duration: float) -> None:
+        with self._lock:
+            self._load()
+            interaction = {
+                "key": key,
+                "duration": round(duration, 4),
+                "generations": [
+                    {"message": message_to_dict(g.message), "generation_info": g.generation_info}
+                    for g in result.generations
+                ],
+                "llm_output": result.llm_output,
+            }
+            self._interactions.append(interaction)
+            self._append(interaction)
+
+    def _lookup(self, key: str) -> Dict[str, Any]:
+        with self._lock:
+            self._load()
+            match = None
+            for index, interaction in enumerate(self._interactions):
+                if index not in self._used and interaction["key"] == key:
+                    match = index
+                    break
+            if match is None:
+                if self.replay_match != "order":
+                    raise RuntimeError(f"LLM replay miss: no recorded response for request key {key} in {self.cassette_path} "
+                                       f"(set {LLM_REPLAY_MATCH_ENV}=order to serve responses in recorded order)")
+                match = next((i for i in range(len(self._interactions)) if i not in self._used), None)
+                if match is None:
+                    raise RuntimeError(f"LLM replay cassette exhausted ({len(self._interactions)} responses): {self.cassette_path}")
+                send_log(f"LLM replay miss, serving response {match + 1} in recorded order", "📼", log_type='status')
+            self._used.add(match)
+            return self._interactions[match]
+
+    # --- Replay helpers ---
+
+    def _replay_delay(self, interaction: Dict[str, Any]) -> float:
+        timing = self.replay_timing
+        if timing == "none":
+            return 0.0
+        if timing.startswith("fixed:"):
+            try:
+                return max(0.0, float(timing.split(":", 1)[1]))
+            except ValueError:
+                return 0.0
+        return float(interaction.get("duration", 0.0))
+
+    @staticmethod
+    def _to_result(interaction: Dict[str, Any]) -> ChatResult:
+        generations = []
+        for g in interaction["generations"]:
+            message = messages_from_dict([g["message"]])[0]
+            generations.append(ChatGeneration(message=message, generation_info=g.get("generation_info")))
+        return ChatResult(generations=generations, llm_output=interaction.get("llm_output"))
+
+    # --- Transport ---
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.llm_mode == "live":
+            return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        key = request_key(self._get_request_payload(messages, stop=stop, **kwargs))
+        if self.llm_mode == "replay":
+            interaction = self._lookup(key)
+            time.sleep(self._replay_delay(interaction))
+            return self._to_result(interaction)
+        started = time.perf_counter()
+        result = super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        self._record(key, result, time.perf_counter() - started)
+        return result
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.llm_mode == "live":
+            return await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        key = request_key(self._get_request_payload(messages, stop=stop, **kwargs))
+        if self.llm_mode == "replay":
+            interaction = self._lookup(key)
+            await asyncio.sleep(self._replay_delay(interaction))
+            return self._to_result(interaction)
+        started = time.perf_counter()
+        result = await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        self._record(key, result, time.perf_counter() - started)
+        return result
@@ -1,18 +1,27 @@
 #!/usr/bin/env python3
 
 import asyncio
+import contextlib
+import contextvars
+import json
+import queue
+import socket
+import socketserver
 import threading
+import time
+import urllib.request
+import uuid
 import webbrowser
-from flask import Flask, render_template, send_from_directory, request, jsonify
-from flask_socketio import SocketIO
 import logging
 import os
 from datetime import datetime
 import sys
 
+# Flask and Flask-SocketIO are imported lazily by _get_socketio() so that importing
+# this module (e.g. for send_log) stays cheap until the dashboard is actually needed.
+
 # Track active dashboard tabs
 active_dashboard_tabs = {}
-last_tab_activity = {}
 
 # Store current URL and task information
 current_url = ""
@@ -20,8 +29,75 @@ current_task = ""
 
 # Store screenshots for the screenshots page
 stored_screenshots = []
+# Only the last this many valid screenshots are kept for the gallery, and only as many
+# of those as fit in the per-run memory budget (see memory_budget), since the gallery
+# outlives the run that filled it
+MAX_GALLERY_SCREENSHOTS = 50
+# Bumped on every gallery change; gallery_diff events carry it so pages can detect a missed diff
+gallery_version = 0
+
+# --- Per-run rooms ---
+# Dashboards follow one evaluation by joining its "run:<id>" room, or whichever
+# evaluation started last by staying in LATEST_ROOM (the default after connecting).
+LATEST_ROOM = "latest"
+# Screenshots pages join this room to receive gallery diffs
+GALLERY_ROOM = "gallery"
+# Runs remembered for /runs and /get_url_task?run=<id>
+MAX_TRACKED_RUNS = 20
+
+# Run id of the evaluation emitting in the current task, set by begin_run()
+_current_run = contextvars.ContextVar('operative_log_server_run', default=None)
+latest_run_id = None
+# Known runs, oldest first: run id -> {'run_id', 'url', 'task', 'started_at', 'agent_state', 'source'}
+# ('source' is the pid and session id of the process running it, which may be a hub client)
+runs = {}
+# Room each connected client is subscribed to, by sid
+client_rooms = {}
+
+# --- Server backend selection ---
+# OPERATIVE_LOG_SERVER_BACKEND: "threading" (Flask-SocketIO on Werkzeug, one thread per
+# connection) or "asgi" (python-socketio AsyncServer under uvicorn, one event loop)
+LOG_SERVER_BACKEND_ENV = "OPERATIVE_LOG_SERVER_BACKEND"
+LOG_SERVER_BACKENDS = ("threading", "asgi")
+# OPERATIVE_LOG_SERVER_MAX_CLIENTS: Socket.IO connections accepted at once
+LOG_SERVER_MAX_CLIENTS_ENV = "OPERATIVE_LOG_SERVER_MAX_CLIENTS"
+DEFAULT_MAX_CLIENTS = 50
+# Seconds stop_log_server() waits for the server thread to finish
+SHUTDOWN_TIMEOUT_SECONDS = 5.0
+# Seconds start_log_server() waits for the server to accept connections
+STARTUP_TIMEOUT_SECONDS = 10.0
+# Seconds a /healthz probe of an existing server may take
+HEALTH_CHECK_TIMEOUT_SECONDS = 0.5
+
+# Written once the server accepts connections, removed when it stops:
+# {"pid", "port", "backend", "session", "started_at"}
+PID_FILE_PATH = os.path.expanduser("~/.operative/log_server.pid")
+
+# --- Hub mode ---
+# The first process on the machine owns the dashboard and listens on HUB_SOCKET_PATH;
+# later processes forward their events to it as newline-delimited JSON instead of
+# starting their own server. OPERATIVE_LOG_HUB=0 disables this.
+LOG_HUB_ENV = "OPERATIVE_LOG_HUB"
+HUB_SOCKET_PATH = os.path.expanduser("~/.operative/log_hub.sock")
+# Messages a forwarding process buffers while the hub is slow; newer ones are dropped
+HUB_QUEUE_SIZE = 1000
+
+# Identifies this process's runs on a shared dashboard
+PROCESS_SESSION_ID = uuid.uuid4().hex[:8]
+
+def hub_enabled() -> bool:
+    return hasattr(socket, "AF_UNIX") and os.environ.get(LOG_HUB_ENV, "1").strip() != "0"
+
+def get_log_server_backend() -> str:
+    backend = os.environ.get(LOG_SERVER_BACKEND_ENV, "threading").strip().lower()
+    return backend if backend in LOG_SERVER_BACKENDS else "threading"
+
+def get_max_clients() -> int:
+    try:
+        return max(1, int(os.environ.get(LOG_SERVER_MAX_CLIENTS_ENV, DEFAULT_MAX_CLIENTS)))
+    except ValueError:
+        return DEFAULT_MAX_CLIENTS
 
-# --- Async mode selection ---
 _async_mode = 'threading'
 
 # Configure logging for Flask and SocketIO (optional, can be noisy)
@@ -32,42 +108,416 @@ logging.getLogger('engineio').setLevel(logging.ERROR)
 
 # Get the absolute path to the templates directory
 templates_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../templates'))
-app = Flask(__name__, template_folder=templates_dir, static_folder=os.path.join(templates_dir, 'static'))
-app.config['SECRET_KEY'] = 'secret!' # Replace with a proper secret if needed
 
-# Initialise SocketIO with chosen async_mode
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode=_async_mode)
+# Flask app and SocketIO server, created on first use by _get_socketio()
+_app = None
+# The static pages, loaded and precompressed when the app is created
+_static_assets = None
+_socketio = None
+_server_lock = threading.Lock()
+_backend = None
+
+# The running HTTP server (Werkzeug or uvicorn) and its thread
+_server = None
+_server_thread = None
+# Unix socket server accepting hub clients, while this process owns the dashboard
+_hub_server = None
+# Serializes start_log_server(), so concurrent callers start (or attach) only once
+_start_lock = threading.Lock()
+# Readiness of the latest start attempt (a _ServerStart)
+_server_start = None
+_server_started_at = None
+
+# InputChannel of the active CDP session, set by browser_utils (see set_input_channel()),
+# and the run it belongs to
+_input_channel = None
+_input_channel_run = None
+
+# Socket.IO session id of the event being handled on the asgi backend
+_current_sid = contextvars.ContextVar('operative_log_server_sid', default=None)
 
 # Store connected SIDs
 connected_clients = set()
 
-@app.route('/')
+# Emitted events and their approximate payload size, by event name (read by benchmarks)
+event_counts = {}
+event_bytes = {}
+
+def run_room(run_id: str) -> str:
+    return f"run:{run_id}"
+
+def _current_run_id():
+    return _current_run.get() or latest_run_id
+
+def get_current_run_id():
+    """Run id that events emitted from the calling context are attributed to (None before any run)."""
+    return _current_run_id()
+
+def _followed_run_id(sid):
+    """Run the client `sid` follows: the run it subscribed to, or the latest run."""
+    room = client_rooms.get(sid)
+    if room is None or room == LATEST_ROOM:
+        return latest_run_id
+    return room[len(run_room('')):]
+
+@contextlib.contextmanager
+def _client_run(sid):
+    """Attribute events emitted while handling a client's request to the run that client follows.
+
+    Handler threads have no run context of their own, so without this their events
+    would go to the latest run even when the client follows an older one.
+    """
+    token = _current_run.set(_followed_run_id(sid))
+    try:
+        yield
+    finally:
+        _current_run.reset(token)
+
+def _control_denied(sid, owner_run):
+    """Why the client `sid` may not control the browser or agent of run `owner_run`, or None if it may.
+
+    Only a run of this process can be controlled from here, and only the one that owns the
+    agent or input channel; a dashboard following another run (possibly a hub client's,
+    whose browser lives in another process) must not drive this one.
+    """
+    run_id = _followed_run_id(sid)
+    if run_id is None:
+        return None
+    source = runs.get(run_id, {}).get('source') or {}
+    if source.get('session', PROCESS_SESSION_ID) != PROCESS_SESSION_ID:
+        return f"run {run_id} is controlled by another process (pid {source.get('pid')})"
+    if owner_run is not None and run_id != owner_run:
+        return f"run {run_id} is not the active run"
+    return None
+
+def _run_rooms():
+    """Rooms interested in events of the current run, or None to broadcast (no run started yet)."""
+    run_id = _current_run_id()
+    if run_id is None:
+        return None
+    if run_id == latest_run_id:
+        return [run_room(run_id), LATEST_ROOM]
+    return [run_room(run_id)]
+
+def _emit(event: str, data: dict, to=None, broadcast: bool = False):
+    """Emit an event to the clients following the current run (or `to`, or everyone) and count it."""
+    event_counts[event] = event_counts.get(event, 0) + 1
+    event_bytes[event] = event_bytes.get(event, 0) + sum(len(value) for value in data.values() if isinstance(value, str))
+    if _forward({'op': 'emit', 'event': event, 'data': data, 'broadcast': broadcast}):
+        return
+    if to is None and not broadcast:
+        to = _run_rooms()
+    _socketio.emit(event, data, to=to)
+
+def _request_sid():
+    """Session id of the client whose event is being handled, on either backend."""
+    sid = _current_sid.get()
+    if sid is None:
+        from flask import request
+        sid = request.sid
+    return sid
+
+class _AsyncEmitter:
+    """
+    Emits on a python-socketio AsyncServer from any thread.
+
+    Agent code emits from the MCP and browser threads while the server runs its own
+    event loop in the log server thread, so emits are handed over to that loop.
+    """
+
+    def __init__(self, server):
+        self.server = server
+        self.loop = None  # Set once uvicorn is running
+
+    def _submit(self, coro):
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            coro.close()
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            loop.create_task(coro)
+        else:
+            asyncio.run_coroutine_threadsafe(coro, loop)
+
+    def emit(self, event, data=None, to=None):
+        self._submit(self.server.emit(event, data, to=to))
+
+    def disconnect(self, sid):
+        self._submit(self.server.disconnect(sid))
+
+    def enter_room(self, sid, room):
+        self._submit(self.server.enter_room(sid, room))
+
+    def leave_room(self, sid, room):
+        self._submit(self.server.leave_room(sid, room))
+
+class _HubClient:
+    """
+    Forwards this process's dashboard events to the hub process over its unix socket.
+
+    Messages are queued and written by a background thread, so a slow hub never blocks
+    the agent; when the queue is full new messages are dropped and counted.
+    """
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.connected = True
+        self.dropped = 0
+        self.queue = queue.Queue(HUB_QUEUE_SIZE)
+        self.thread = threading.Thread(target=self._write, name="operative-log-hub-client", daemon=True)
+        self.thread.start()
+
+    def forward(self, message: dict) -> None:
+        if not self.connected:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            self.dropped += 1
+
+    def _write(self):
+        while True:
+            message = self.queue.get()
+            if message is None:
+                break
+            try:
+                line = json.dumps(message, separators=(",", ":"), ensure_ascii=False, default=str) + "\n"
+                self.sock.sendall(line.encode("utf-8"))
+            except OSError:
+                break
+        self.connected = False
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+    def close(self, timeout: float = SHUTDOWN_TIMEOUT_SECONDS) -> None:
+        """Flush queued messages (up to timeout) and disconnect."""
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self.thread.join(timeout)
+
+def _connect_hub():
+    """Return a _HubClient if another process's hub is listening, else None."""
+    try:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    except OSError:
+        return None
+    try:
+        sock.connect(HUB_SOCKET_PATH)
+    except OSError:
+        sock.close()
+        return None
+    return _HubClient(sock)
+
+def _forward(message: dict) -> bool:
+    """Send a message to the hub if this process forwards to one. Returns True if it did."""
+    if _backend != 'hub':
+        return False
+    if message.get('op') != 'begin_run':
+        message['run'] = _current_run_id()
+    _socketio.forward(message)
+    return True
+
+def _apply_hub_message(message: dict) -> None:
+    """Replay a message forwarded by a hub client as if it happened in this process."""
+    op = message.get('op')
+    run_id = message.get('run')
+    if run_id is not None:
+        _current_run.set(run_id)
+    if op == 'emit':
+        _emit(message['event'], message.get('data') or {}, broadcast=bool(message.get('broadcast')))
+    elif op == 'begin_run':
+        begin_run(message['run_id'], message.get('url', ''), message.get('task', ''), source=message.get('source'))
+    elif op == 'url_task':
+        set_url_and_task(message.get('url', ''), message.get('task', ''))
+    elif op == 'agent_state':
+        send_agent_state(message.get('state') or {})
+    elif op == 'gallery':
+        set_gallery_screenshots(message.get('screenshots') or [])
+    elif op == 'open_dashboard':
+        open_log_dashboard(show_screenshots=bool(message.get('show_screenshots')))
+
+class _HubRequestHandler(socketserver.StreamRequestHandler):
+    """Reads one hub client's newline-delimited JSON messages until it disconnects."""
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            try:
+                # Each message runs in a fresh context so its run id doesn't leak into the next
+                contextvars.Context().run(_apply_hub_message, message)
+            except Exception:
+                pass
+
+def _start_hub_listener():
+    """Listen for hub clients on HUB_SOCKET_PATH (replacing a stale socket file)."""
+    global _hub_server
+    if not hub_enabled() or _hub_server is not None:
+        return
+    try:
+        os.makedirs(os.path.dirname(HUB_SOCKET_PATH), exist_ok=True)
+        try:
+            os.unlink(HUB_SOCKET_PATH)  # Nothing answered on it, so it's left over from a dead process
+        except FileNotFoundError:
+            pass
+        server = socketserver.ThreadingUnixStreamServer(HUB_SOCKET_PATH, _HubRequestHandler)
+    except OSError:
+        return
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="operative-log-hub", daemon=True).start()
+    _hub_server = server
+
+def _stop_hub_listener():
+    global _hub_server
+    server = _hub_server
+    if server is None:
+        return
+    server.shutdown()
+    server.server_close()
+    try:
+        os.unlink(HUB_SOCKET_PATH)
+    except OSError:
+        pass
+    _hub_server = None
+
+def _create_app():
+    global _static_assets
+    from flask import Flask, request
+    from .static_assets import StaticAssets, compress_response
+
+    # static_folder=None: /static/<path> is served from the precompressed asset cache
+    app = Flask(__name__, template_folder=templates_dir, static_folder=None)
+    app.config['SECRET_KEY'] = 'secret!' # Replace with a proper secret if needed
+    _static_assets = StaticAssets(os.path.join(templates_dir, 'static'))
+    app.after_request(lambda response: compress_response(response, request))
+    app.add_url_rule('/', view_func=index)
+    app.add_url_rule('/static/<path:path>', view_func=send_static)
+    app.add_url_rule('/get_url_task', view_func=get_url_task)
+    app.add_url_rule('/runs', view_func=get_runs)
+    app.add_url_rule('/screenshots', view_func=screenshots_page)
+    app.add_url_rule('/get_screenshots', view_func=get_screenshots)
+    app.add_url_rule('/screenshot/<int:index>', view_func=get_screenshot_by_index)
+    app.add_url_rule('/screenshot-view/<int:index>', view_func=screenshot_viewer)
+    app.add_url_rule('/har', view_func=get_har_list)
+    app.add_url_rule('/har/<run_id>', view_func=download_har)
+    app.add_url_rule('/healthz', view_func=healthz)
+    return app
+
+def _event_handlers():
+    """Socket.IO event name -> handler taking the event data (connect/disconnect take none)."""
+    return {
+        'register_dashboard_tab': handle_register_tab,
+        'subscribe_run': handle_subscribe_run,
+        'subscribe_gallery': handle_subscribe_gallery,
+        'connect': handle_connect,
+        'disconnect': handle_disconnect,
+        'agent_control': handle_agent_control,
+        'browser_input': handle_browser_input_event,
+        'input_latency_report': handle_input_latency_report,
+    }
+
+def _create_async_server():
+    import socketio
+
+    server = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins="*")
+
+    def register(event, handler):
+        async def on_event(sid, *args):
+            token = _current_sid.set(sid)
+            try:
+                if event in ('connect', 'disconnect'):
+                    return handler()
+                return handler(args[0] if args else {})
+            finally:
+                _current_sid.reset(token)
+        server.on(event, on_event)
+
+    for event, handler in _event_handlers().items():
+        register(event, handler)
+    return server
+
+def reset_event_counters():
+    """Reset the emitted event counters."""
+    event_counts.clear()
+    event_bytes.clear()
+
+def _get_socketio():
+    """Create the Flask app and SocketIO server on first use and register all handlers.
+
+    Returns the object used to emit: a Flask-SocketIO server on the threading backend,
+    an _AsyncEmitter on the asgi backend.
+    """
+    global _app, _socketio, _backend
+    with _server_lock:
+        if _socketio is None:
+            _backend = get_log_server_backend()
+            app = _create_app()
+
+            if _backend == 'asgi':
+                socketio = _AsyncEmitter(_create_async_server())
+            else:
+                from flask_socketio import SocketIO
+
+                # Initialise SocketIO with chosen async_mode
+                socketio = SocketIO(app, cors_allowed_origins="*", async_mode=_async_mode)
+                for event, handler in _event_handlers().items():
+                    socketio.on_event(event, handler)
+
+            _app = app
+            _socketio = socketio
+    return _socketio
+
+def __getattr__(name):
+    """Create the server lazily for callers that import `app` or `socketio` from this module."""
+    if name == 'socketio':
+        return _get_socketio()
+    if name == 'app':
+        _get_socketio()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 def index():
     """Serve the main HTML dashboard page."""
-    return render_template('static/index.html')
+    from flask import request
+    return _static_assets.response('index.html', request)
 
-@app.route('/static/<path:path>')
 def send_static(path):
-    """Serve static files (like CSS, JS if added later)."""
-    static_folder = os.path.join(os.path.dirname(__file__), '../templates/static')
-    return send_from_directory(static_folder, path)
+    """Serve static files, revalidated by ETag."""
+    from flask import request
+    return _static_assets.response(path, request)
 
-@app.route('/get_url_task')
 def get_url_task():
-    """Return the current URL and task as JSON."""
-    return {'url': current_url, 'task': current_task}
+    """Return the URL and task of the run given by ?run=<id>, or of the current run, as JSON."""
+    from flask import request
+    run = runs.get(request.args.get('run', ''))
+    if run is not None:
+        return {'url': run['url'], 'task': run['task'], 'run_id': run['run_id']}
+    return {'url': current_url, 'task': current_task, 'run_id': latest_run_id}
+
+def get_runs():
+    """Return the known runs, newest first, and the id of the latest one as JSON."""
+    return {'latest': latest_run_id, 'runs': list(reversed(runs.values()))}
 
-@app.route('/screenshots')
 def screenshots_page():
     """Serve the screenshots page."""
-    return render_template('static/screenshots.html')
+    from flask import request
+    return _static_assets.response('screenshots.html', request)
     
-@app.route('/get_screenshots')
 def get_screenshots():
     """Return the stored screenshots as JSON."""
+    from flask import jsonify
     return jsonify(stored_screenshots)
 
-@app.route('/screenshot/<int:index>')
 def get_screenshot_by_index(index):
     """Serve a specific screenshot by index."""
     if index < 0 or index >= len(stored_screenshots):
@@ -76,59 +526,165 @@ def get_screenshot_by_index(index):
     # Return the raw data URL content
     return {'screenshot': stored_screenshots[index]}
 
-@app.route('/screenshot-view/<int:index>')
 def screenshot_viewer(index):
     """Serve the screenshot viewer HTML page."""
-    return render_template('static/screenshot-view.html')
+    from flask import request
+    return _static_assets.response('screenshot-view.html', request)
+
+def get_har_list():
+    """Return the recorded HAR files as JSON, newest first."""
+    from flask import jsonify
+    from .har_writer import list_har_files
+    files = list_har_files()
+    for f in files:
+        f['url'] = f"/har/{f['run_id']}"
+    return jsonify(files)
+
+def download_har(run_id):
+    """Download the HAR file of a run; a run in progress is returned as recorded so far."""
+    from flask import Response
+    from .har_writer import read_har
+    text = read_har(run_id)
+    if text is None:
+        return "HAR not found", 404
+    return Response(text, mimetype='application/json',
+                    headers={'Content-Disposition': f'attachment; filename="{run_id}.har"'})
+
+def healthz():
+    """Report that the server is up and which process owns it, as JSON."""
+    return {
+        'status': 'ok',
+        'pid': os.getpid(),
+        'session': PROCESS_SESSION_ID,
+        'backend': _backend,
+        'clients': len(connected_clients),
+        'uptime_seconds': round(time.monotonic() - _server_started_at, 1) if _server_started_at else 0.0,
+    }
+
+def check_health(host='127.0.0.1', port=5009, timeout: float = HEALTH_CHECK_TIMEOUT_SECONDS):
+    """Return the /healthz document of the log server on host:port, or None if none answers."""
+    try:
+        with urllib.request.urlopen(f"http://{host}:{port}/healthz", timeout=timeout) as response:
+            health = json.loads(response.read())
+    except Exception:
+        return None
+    return health if isinstance(health, dict) and health.get('status') == 'ok' else None
+
+def read_pid_file():
+    """Return the PID file's contents, or None if it is missing or unreadable."""
+    try:
+        with open(PID_FILE_PATH, 'r', encoding='utf-8') as f:
+            info = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return info if isinstance(info, dict) else None
+
+def _write_pid_file(port):
+    info = {'pid': os.getpid(), 'port': port, 'backend': _backend, 'session': PROCESS_SESSION_ID,
+            'started_at': datetime.now().isoformat()}
+    try:
+        os.makedirs(os.path.dirname(PID_FILE_PATH), exist_ok=True)
+        tmp_path = f"{PID_FILE_PATH}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(info, f)
+        os.replace(tmp_path, PID_FILE_PATH)
+    except OSError:
+        pass
+
+def _remove_pid_file():
+    """Remove the PID file if it belongs to this process."""
+    info = read_pid_file()
+    if info is not None and info.get('pid') == os.getpid():
+        try:
+            os.remove(PID_FILE_PATH)
+        except OSError:
+            pass
 
 # Dashboard tab tracking handlers
-@socketio.on('register_dashboard_tab')
 def handle_register_tab(data):
     """Register an active dashboard tab."""
     tab_id = data.get('tabId')
     if tab_id:
-        active_dashboard_tabs[tab_id] = request.sid
-        last_tab_activity[tab_id] = datetime.now()
+        active_dashboard_tabs[tab_id] = _request_sid()
         send_log(f"Dashboard tab registered: {tab_id[:8]}...", "📋", log_type='status')
 
-@socketio.on('dashboard_ping')
-def handle_dashboard_ping(data):
-    """Update last activity time for a dashboard tab."""
-    tab_id = data.get('tabId')
-    if tab_id and tab_id in active_dashboard_tabs:
-        last_tab_activity[tab_id] = datetime.now()
+def _enter_room(sid, room):
+    if _backend == 'asgi':
+        _socketio.enter_room(sid, room)
+    else:
+        _socketio.server.enter_room(sid, room)
 
-@socketio.on('dashboard_visible')
-def handle_dashboard_visible(data):
-    """Mark a dashboard tab as currently visible."""
-    tab_id = data.get('tabId')
-    if tab_id and tab_id in active_dashboard_tabs:
-        # This tab is now the most recently active
-        last_tab_activity[tab_id] = datetime.now()
+def _leave_room(sid, room):
+    if _backend == 'asgi':
+        _socketio.leave_room(sid, room)
+    else:
+        _socketio.server.leave_room(sid, room)
+
+def _set_client_room(sid, room):
+    """Move a client from its current run room to `room`."""
+    previous = client_rooms.get(sid)
+    if previous == room:
+        return
+    if previous:
+        _leave_room(sid, previous)
+    _enter_room(sid, room)
+    client_rooms[sid] = room
+
+def _run_state(run_id):
+    """Dashboard state of a run: URL, task and agent state."""
+    run = runs.get(run_id)
+    if run is None:
+        # No run started through begin_run() yet; fall back to the last URL and task set
+        return {'run_id': run_id, 'url': current_url, 'task': current_task, 'agent_state': None}
+    return {'run_id': run_id, 'url': run['url'], 'task': run['task'], 'agent_state': run['agent_state']}
+
+def handle_subscribe_run(data):
+    """Subscribe the client to one run's events ({'run': <id>}) or to the latest run ({'run': 'latest'}).
+
+    Replies with a dashboard_state snapshot; later changes arrive as state_update diffs.
+    """
+    sid = _request_sid()
+    run_id = (data or {}).get('run') or LATEST_ROOM
+    room = LATEST_ROOM if run_id == LATEST_ROOM else run_room(run_id)
+    _set_client_room(sid, room)
+    state = _run_state(latest_run_id if run_id == LATEST_ROOM else run_id)
+    _emit('dashboard_state', {'run': run_id, 'known': run_id in runs or run_id == LATEST_ROOM, 'state': state}, to=sid)
+
+def handle_subscribe_gallery(data):
+    """Send the client the whole gallery once; later changes arrive as gallery_diff events."""
+    sid = _request_sid()
+    _enter_room(sid, GALLERY_ROOM)
+    # Read the version first: a diff racing with this snapshot rebuilds the same list either way
+    version = gallery_version
+    _emit('gallery_state', {'version': version, 'screenshots': stored_screenshots}, to=sid)
 
-@socketio.on('connect')
 def handle_connect():
+    sid = _request_sid()
+    # Refuse connections beyond the configured limit
+    if len(connected_clients) >= get_max_clients():
+        return False
     # Add client to connected_clients set
-    connected_clients.add(request.sid)
+    connected_clients.add(sid)
+    # Follow the latest run until the dashboard subscribes to a specific one
+    _set_client_room(sid, LATEST_ROOM)
     
     # Send status message to dashboard
     send_log(f"Connected to log server at {datetime.now().strftime('%H:%M:%S')}", "✅", log_type='status')
 
-@socketio.on('disconnect')
 def handle_disconnect():
-    # Remove client from connected_clients set
-    if request.sid in connected_clients:
-        connected_clients.remove(request.sid)
+    sid = _request_sid()
+    # Remove client from connected_clients set (Socket.IO drops its rooms itself)
+    connected_clients.discard(sid)
+    client_rooms.pop(sid, None)
     
     # Remove any dashboard tabs associated with this session
     tabs_to_remove = []
     for tab_id, tab_sid in active_dashboard_tabs.items():
-        if tab_sid == request.sid:
+        if tab_sid == sid:
             tabs_to_remove.append(tab_id)
     
     for tab_id in tabs_to_remove:
         active_dashboard_tabs.pop(tab_id, None)
-        last_tab_activity.pop(tab_id, None)
     
     # Send status message to dashboard
     # Use try-except as send_log might fail if server isn't fully ready/shutting down
@@ -138,29 +694,95 @@ def handle_disconnect():
         pass
 
 def set_url_and_task(url: str, task: str):
-    """Sets the current URL and task and broadcasts it to all connected clients."""
+    """Sets the current URL and task and pushes them to the clients following the current run."""
     global current_url, current_task
     current_url = url
     current_task = task
+    run = runs.get(_current_run_id())
+    if run is not None:
+        run['url'] = url
+        run['task'] = task
+    if _socketio is None or _forward({'op': 'url_task', 'url': url, 'task': task}):
+        return
+    try:
+        _emit('state_update', {'url': url, 'task': task})
+    except Exception:
+        pass
+
+def begin_run(run_id: str, url: str, task: str, source: dict = None):
+    """Start routing the calling task's events to the run's room and make it the latest run.
+
+    The run id is kept in a context variable, so events emitted by other concurrent
+    evaluations (each in its own task) keep going to their own rooms. Events emitted
+    outside any run (e.g. from the log server's own handlers) follow the latest run.
+    `source` identifies the process running it (defaults to this one).
+    """
+    global latest_run_id
+    source = source or {'pid': os.getpid(), 'session': PROCESS_SESSION_ID}
+    _current_run.set(run_id)
+    latest_run_id = run_id
+    runs[run_id] = {'run_id': run_id, 'url': url, 'task': task, 'started_at': datetime.now().isoformat(),
+                    'agent_state': None, 'source': source}
+    while len(runs) > MAX_TRACKED_RUNS:
+        runs.pop(next(iter(runs)))
+    if _socketio is None or _forward({'op': 'begin_run', 'run_id': run_id, 'url': url, 'task': task, 'source': source}):
+        return
+    try:
+        _emit('run_started', dict(runs[run_id]), broadcast=True)
+    except Exception:
+        pass
 
 def send_log(message: str, emoji: str = "➡️", log_type: str = 'agent'):
-    """Send a log message with an emoji prefix and type to all connected clients."""
-    # Ensure socketio context is available. If called from a non-SocketIO thread,
-    # use socketio.emit directly.
+    """Send a log message with an emoji prefix and type to the clients following the current run."""
+    # Nothing can be connected before the server exists, so don't create it just to log.
+    if _socketio is None:
+        return
     try:
         log_entry = f"{emoji} {message}"
         # Include log_type in the emitted data
-        socketio.emit('log_message', {'data': log_entry, 'type': log_type})
+        _emit('log_message', {'data': log_entry, 'type': log_type})
+    except Exception:
+        pass
+
+def send_step_timing(timing: dict):
+    """Send the latency breakdown of a finished agent step to the clients following the current run."""
+    if _socketio is None:
+        return
+    try:
+        _emit('step_timing', timing)
+    except Exception:
+        pass
+
+def send_memory_usage(usage: dict):
+    """Send the current run's artifact memory usage to the clients following it."""
+    if _socketio is None:
+        return
+    try:
+        _emit('memory_usage', usage)
+    except Exception:
+        pass
+
+def send_agent_state(state: dict):
+    """Send the agent's paused/stopped state to the clients following the current run."""
+    run = runs.get(_current_run_id())
+    if run is not None:
+        run['agent_state'] = state  # Part of the snapshot sent to dashboards that subscribe later
+    if _socketio is None or _forward({'op': 'agent_state', 'state': state}):
+        return
+    try:
+        _emit('agent_state', {'state': state})
     except Exception:
         pass
 
 # --- Browser View Update Function ---
 async def send_browser_view(image_data_url: str):
-    """Sends the browser view image data URL to all connected clients for LIVE VIEW.
+    """Sends the browser view image data URL to the clients following the current run for LIVE VIEW.
        This does NOT update the persistent screenshot gallery.
     """
     if not image_data_url or not image_data_url.startswith("data:image/"):
         return
+    if _socketio is None:
+        return
     
     try:
         from .browser_utils import set_screencast_running
@@ -170,49 +792,128 @@ async def send_browser_view(image_data_url: str):
     except Exception:
         pass
         
+    update = {'data': image_data_url}
+    # Input acknowledged before this frame is now visible; tell each tab which of its events,
+    # and which of them failed and will never show
+    channel = _input_channel
+    if channel is not None:
+        input_seqs, dropped_seqs = channel.frame_sent()
+        if input_seqs:
+            update['inputSeqs'] = input_seqs
+        if dropped_seqs:
+            update['inputDropped'] = dropped_seqs
+
     try:
-        socketio.emit('browser_update', {'data': image_data_url})
+        _emit('browser_update', update)
     except Exception:
         pass # Log server might not be fully up
 
+def send_input_latency(stats: dict):
+    """Send the input channel's counters and input-to-frame latency to the clients following the current run."""
+    if _socketio is None:
+        return
+    try:
+        _emit('input_latency', stats)
+    except Exception:
+        pass
+
+def gallery_screenshot(screenshot):
+    """The gallery data URL for a screenshot's data, or None if it is not a valid image."""
+    if not isinstance(screenshot, str):
+        return None
+    # Check if it's a valid data URL
+    if screenshot.startswith('data:image/') and 'base64,' in screenshot:
+        return screenshot
+    # Check if it's raw base64 JPEG data (starts with /9j/ which is the beginning of JPEG in base64)
+    if screenshot.startswith('/9j/'):
+        return f"data:image/jpeg;base64,{screenshot}"
+    return None
+
+def _gallery_indexes(screenshot_data_urls: list) -> list:
+    """Indexes of the valid screenshots the gallery keeps: the newest ones, up to
+    MAX_GALLERY_SCREENSHOTS and the memory budget (the newest is always kept)."""
+    from .memory_budget import get_run_memory_budget_bytes
+    budget = get_run_memory_budget_bytes()
+    kept = []
+    used = 0
+    for index in range(len(screenshot_data_urls) - 1, -1, -1):
+        if len(kept) == MAX_GALLERY_SCREENSHOTS:
+            break
+        data_url = gallery_screenshot(screenshot_data_urls[index])
+        if data_url is None:
+            continue
+        used += len(data_url)
+        if kept and used > budget:
+            break
+        kept.append(index)
+    kept.reverse()
+    return kept
+
+def gallery_positions(screenshot_data_urls: list) -> list:
+    """The gallery index (as used by /screenshot/<index>) each data URL gets from set_gallery_screenshots(), or None if it is skipped."""
+    positions = [None] * len(screenshot_data_urls)
+    for position, index in enumerate(_gallery_indexes(screenshot_data_urls)):
+        positions[index] = position
+    return positions
+
 def set_gallery_screenshots(screenshot_data_urls: list[str]):
     """Sets the screenshots for the gallery page and notifies clients.
     Args:
         screenshot_data_urls: A list of base64 data URLs for the screenshots.
     """
-    global stored_screenshots
+    global stored_screenshots, gallery_version
+    if _socketio is not None and _forward({'op': 'gallery', 'screenshots': screenshot_data_urls}):
+        return
     
     # Validate screenshot data URLs
-    valid_screenshots = []
     for i, screenshot in enumerate(screenshot_data_urls):
         # Ensure it's a string
         if not isinstance(screenshot, str):
             send_log(f"Skipping non-string screenshot data at index {i}", "⚠️", log_type='status')
             continue
-            
-        # Check if it's a valid data URL
-        if screenshot.startswith('data:image/') and 'base64,' in screenshot:
-            valid_screenshots.append(screenshot)
-        # Check if it's raw base64 JPEG data (starts with /9j/ which is the beginning of JPEG in base64)
-        elif screenshot.startswith('/9j/'):
-            send_log(f"Converting raw base64 JPEG to data URL at index {i}", "🔧", log_type='status')
-            valid_screenshots.append(f"data:image/jpeg;base64,{screenshot}")
-        else:
+        data_url = gallery_screenshot(screenshot)
+        if data_url is None:
             send_log(f"Skipping invalid screenshot data at index {i}", "⚠️", log_type='status')
+        elif data_url is not screenshot:
+            send_log(f"Converting raw base64 JPEG to data URL at index {i}", "🔧", log_type='status')
     
-    # Limit stored screenshots to, for example, the last 50 to save memory
+    # Limit stored screenshots to the last MAX_GALLERY_SCREENSHOTS within the memory budget.
     # The MCP response will have its own limits, this is for the gallery page.
-    stored_screenshots = valid_screenshots[-50:] 
+    new_screenshots = [gallery_screenshot(screenshot_data_urls[i]) for i in _gallery_indexes(screenshot_data_urls)]
+    # Screenshots shared with the previous gallery are not sent again
+    keep = 0
+    for old, new in zip(stored_screenshots, new_screenshots):
+        if old != new:
+            break
+        keep += 1
+    stored_screenshots = new_screenshots
+    gallery_version += 1
+    if _socketio is None:
+        return
     try:
-        socketio.emit('gallery_updated', {})
+        # The gallery is shared by all runs, so the diff goes to every screenshots page
+        _emit('gallery_diff', {'version': gallery_version, 'keep': keep, 'added': new_screenshots[keep:],
+                               'total': len(new_screenshots)}, to=GALLERY_ROOM)
         send_log(f"Screenshot gallery updated with {len(stored_screenshots)} images.", "🖼️", log_type='status')
     except Exception:
         pass # Log server might not be fully up
 
 # --- Agent Control Handler ---
-@socketio.on('agent_control')
 def handle_agent_control(data):
-    """Handles agent control events received from the frontend."""
+    """Handles agent control events received from the frontend, for the run the sending dashboard follows."""
+    sid = _request_sid()
+    with _client_run(sid):
+        try:
+            from .browser_utils import agent_run_id
+        except ImportError:
+            agent_run_id = None
+        denied = _control_denied(sid, agent_run_id)
+        if denied:
+            send_log(f"Agent control rejected: {denied}", "🚫", log_type='status')
+            return
+        _agent_control(data)
+
+def _agent_control(data):
     action = data.get('action')
     
     # Log to the dashboard
@@ -236,19 +937,19 @@ def handle_agent_control(data):
             agent_instance.pause()
             send_log("Agent paused", "⏸️", log_type='status')
             # Send updated state
-            socketio.emit('agent_state', {'state': {'paused': True, 'stopped': False}})
+            send_agent_state({'paused': True, 'stopped': False})
             
         elif action == 'resume':
             agent_instance.resume()
             send_log("Agent resumed", "▶️", log_type='status')
             # Send updated state
-            socketio.emit('agent_state', {'state': {'paused': False, 'stopped': False}})
+            send_agent_state({'paused': False, 'stopped': False})
             
         elif action == 'stop':
             agent_instance.stop()
             send_log("Agent stopped", "⏹️", log_type='status')
             # Send updated state
-            socketio.emit('agent_state', {'state': {'paused': False, 'stopped': True}})
+            send_agent_state({'paused': False, 'stopped': True})
             
         else:
             error_msg = f"Unknown agent control action: {action}"
@@ -259,67 +960,162 @@ def handle_agent_control(data):
         send_log(f"Agent control error: {error_msg}", "❌", log_type='status')
 
 # --- Browser Input Handler ---
-@socketio.on('browser_input')
+def set_input_channel(channel, run_id=None):
+    """Set (or clear with None) the InputChannel that dashboard input events are queued on.
+
+    run_id is the run it belongs to, by default the caller's current run.
+    """
+    global _input_channel, _input_channel_run
+    _input_channel_run = (run_id or _current_run_id()) if channel is not None else None
+    _input_channel = channel
+
 def handle_browser_input_event(data):
-    """Handles browser interaction events received from the frontend."""
-    event_type = data.get('type')
-    details = data.get('details')
-    
-    # Log to the dashboard as well
-    if event_type != 'scroll':
-        send_log(f"Received browser input: {event_type}", "🖱️", log_type='status')
-    
-    # Import the handle_browser_input function and other utilities from browser_utils
-    try:
-        from .browser_utils import handle_browser_input, active_cdp_session, active_screencast_running, get_browser_task_loop
-    except ImportError:
-        error_msg = "Could not import handle_browser_input from browser_utils"
-        send_log(f"Input error: {error_msg}", "❌", log_type='status')
+    """Queue a browser interaction event received from the frontend on the input channel.
+
+    The channel hands the event over to the browser loop itself, so this stays cheap
+    enough to run for every wheel event; only failures are logged.
+    """
+    sid = _request_sid()
+    channel = _input_channel
+    if channel is None:
+        _input_dropped(data)
+        with _client_run(sid):
+            send_log("Input error: No active CDP session for input handling", "❌", log_type='status')
         return
-    
-    # Check if we have an active CDP session
-    if not active_cdp_session:
-        error_msg = "No active CDP session for input handling"
-        send_log(f"Input error: {error_msg}", "❌", log_type='status')
+    denied = _control_denied(sid, _input_channel_run)
+    if denied:
+        _input_dropped(data)
+        with _client_run(sid):
+            send_log(f"Input rejected: {denied}", "🚫", log_type='status')
         return
-    
-    # Since the browser runs in an asyncio loop, and this handler
-    # likely runs in a separate thread (Flask/SocketIO default), we need
-    # to schedule the async input handler function in the main loop.
-    try:
-        # Get the browser task loop from browser_utils
-        loop = get_browser_task_loop()
-        
-        if loop is None:
-            send_log(f"Input error: Browser task loop not available", "❌", log_type='status')
-            return
-        
-        # send_log(f"Scheduling {event_type} input handler in browser task loop", "🔄", log_type='status')
-        # Schedule the coroutine call
-        task = asyncio.run_coroutine_threadsafe(
-            handle_browser_input(event_type, details),
-            loop
-        )
-        if event_type == 'scroll':
-            return 
-        send_log(f"Input {event_type} scheduled for processing", "✅", log_type='status')
-        
-    except RuntimeError as e:
-        error_msg = f"No running asyncio event loop found: {e}"
-        send_log(f"Input error: {error_msg}", "❌", log_type='status')
-    except Exception as e:
-        error_msg = f"Error scheduling browser input handler: {e}"
-        send_log(f"Input error: {error_msg}", "❌", log_type='status')
+    if not channel.submit(data.get('type'), data.get('details'), seq=data.get('seq'), client=data.get('tabId')):
+        _input_dropped(data)
+        with _client_run(sid):
+            send_log("Input error: Browser task loop not available", "❌", log_type='status')
+
+def _input_dropped(data):
+    """Tell the sending dashboard its input event was not queued, so it stops waiting for a frame showing it."""
+    if data.get('seq') is not None:
+        _emit('input_dropped', {'seqs': [data['seq']]}, to=_request_sid())
+
+def handle_input_latency_report(data):
+    """Add the end-to-end input latencies (ms) a dashboard measured to the channel's percentiles."""
+    channel = _input_channel
+    if channel is not None:
+        channel.add_client_latencies((data or {}).get('samples'))
+
+
+class _ServerStart:
+    """One attempt to start the server thread: ready is set once it accepts connections
+    or has failed (then error is set)."""
 
+    def __init__(self):
+        self.ready = threading.Event()
+        self.error = None
+
+def _run_threading_server(host, port, ready):
+    """Serve the Flask-SocketIO app on Werkzeug's threaded server until shutdown()."""
+    global _server
+    from werkzeug.serving import make_server
+    _server = make_server(host, port, _app, threaded=True)
+    ready.set()  # Bound and listening; requests queue until serve_forever runs
+    _server.serve_forever()
+
+def _run_asgi_server(host, port, ready):
+    """Serve the Socket.IO AsyncServer and the Flask routes from one uvicorn event loop."""
+    global _server
+    import socketio
+    import uvicorn
+    from starlette.middleware.wsgi import WSGIMiddleware
+
+    emitter = _socketio
+    asgi_app = socketio.ASGIApp(emitter.server, other_asgi_app=WSGIMiddleware(_app))
+    config = uvicorn.Config(asgi_app, host=host, port=port, log_level='error', access_log=False,
+                            # Frames are already-compressed JPEGs; deflating them only costs CPU
+                            ws_per_message_deflate=False, lifespan='off', timeout_graceful_shutdown=int(SHUTDOWN_TIMEOUT_SECONDS))
+    _server = uvicorn.Server(config)
+
+    async def signal_ready():
+        # uvicorn sets `started` once its sockets listen (and exits the process on bind errors)
+        while not _server.started:
+            if _server.should_exit:
+                return
+            await asyncio.sleep(0.005)
+        ready.set()
+
+    async def serve():
+        emitter.loop = asyncio.get_running_loop()
+        ready_task = asyncio.create_task(signal_ready())
+        try:
+            await _server.serve()
+        finally:
+            ready_task.cancel()
+            emitter.loop = None
+
+    asyncio.run(serve())
+
+def _attach_to_running_server(host, port) -> bool:
+    """Use a dashboard another process already serves. Returns False if there is none.
+
+    A hub is joined as a client so this process's events show up there. A healthy server
+    without a hub (hub mode disabled) is left alone; this process then has no dashboard
+    output, but it no longer kills that server to take the port.
+    """
+    global _socketio, _backend
+    if hub_enabled():
+        client = _connect_hub()
+        if client is not None:
+            with _server_lock:
+                _socketio = client
+                _backend = 'hub'
+            send_log(f"Forwarding to the dashboard of another process (session {PROCESS_SESSION_ID}).", "🔗", log_type='status')
+            return True
+    return check_health(host, port) is not None
+
+def start_log_server(host='127.0.0.1', port=5009, timeout: float = STARTUP_TIMEOUT_SECONDS) -> bool:
+    """Starts the log server (backend from OPERATIVE_LOG_SERVER_BACKEND) in a background thread.
+
+    If another process already serves the dashboard, this process forwards its events to
+    it (hub mode) instead; if that hub has gone away, this process takes over. Waits until
+    the server accepts connections, so callers don't need to sleep.
+
+    Returns:
+        bool: True if a dashboard is being served (by this or another process)
+    """
+    with _start_lock:
+        return _start_log_server(host, port, timeout)
+
+def _start_log_server(host, port, timeout):
+    global _server_thread, _socketio, _backend, _server_start, _server_started_at
+    if _backend == 'hub':
+        if _socketio.connected:
+            return True
+        with _server_lock:
+            _socketio = None
+            _backend = None
+    if _server_thread is not None and _server_thread.is_alive():
+        start = _server_start  # A previous attempt that timed out may still come up
+        return start.ready.wait(timeout) and start.error is None
+
+    if _attach_to_running_server(host, port):
+        return True
+    _get_socketio()
+
+    start = _ServerStart()
 
-def start_log_server(host='127.0.0.1', port=5009):
-    """Starts the Flask-SocketIO server in a background thread."""
     def run_server():
-        # Use eventlet or gevent for production? For local dev, default Flask dev server is fine.
         # Setting log_output=False to reduce console noise from SocketIO itself
         sys.stdout = open(os.devnull, 'w')
         sys.stderr = open(os.devnull, 'w')
-        socketio.run(app, host=host, port=port, log_output=False, use_reloader=False, allow_unsafe_werkzeug=True)
+        try:
+            if _backend == 'asgi':
+                _run_asgi_server(host, port, start.ready)
+            else:
+                _run_threading_server(host, port, start.ready)
+        except BaseException as e:  # uvicorn raises SystemExit when it can't bind
+            start.error = e
+        finally:
+            start.ready.set()  # Don't leave start_log_server() waiting on a failed start
 
     # Check if templates directory exists
     template_dir = os.path.join(os.path.dirname(__file__), '../templates')
@@ -338,37 +1134,96 @@ def start_log_server(host='127.0.0.1', port=5009):
 
     # Start the server in a separate thread.
     # run_server uses host/port from the outer scope, so no args needed here.
-    server_thread = threading.Thread(target=run_server)
+    _server_start = start
+    server_thread = threading.Thread(target=run_server, name="operative-log-server")
     server_thread.daemon = True
     server_thread.start()
+    _server_thread = server_thread
+
+    if not start.ready.wait(timeout):
+        return False
+    if start.error is not None:
+        # Usually another process bound the port first; use its dashboard instead
+        _server_thread = None
+        return _attach_to_running_server(host, port)
+
+    _server_started_at = time.monotonic()
+    _write_pid_file(port)
+    # Let later processes forward to this dashboard
+    _start_hub_listener()
     
     # Send initial status message
-    send_log("Log server thread started.", "🚀", log_type='status')
+    send_log(f"Log server started on port {port} ({_backend} backend).", "🚀", log_type='status')
+    return True
+
+def stop_log_server(timeout: float = SHUTDOWN_TIMEOUT_SECONDS) -> bool:
+    """Gracefully stop the log server: tell clients, disconnect them and stop the HTTP server.
+
+    Returns:
+        bool: True if the server thread finished within the timeout (or nothing was running)
+    """
+    global _server, _server_thread, _socketio, _backend
+    if _backend == 'hub':
+        # Forwarding to another process's dashboard: just disconnect from it
+        client = _socketio
+        with _server_lock:
+            _socketio = None
+            _backend = None
+        client.close(timeout)
+        return True
+    _stop_hub_listener()
+    thread = _server_thread
+    if thread is None or not thread.is_alive():
+        return True
+    try:
+        _emit('server_shutdown', {}, broadcast=True)
+        for sid in list(connected_clients):
+            if _backend == 'asgi':
+                _socketio.disconnect(sid)
+            else:
+                _socketio.server.disconnect(sid)
+    except Exception:
+        pass
+
+    server = _server
+    if server is not None:
+        if _backend == 'asgi':
+            server.should_exit = True
+        else:
+            server.shutdown()
+    thread.join(timeout)
+    stopped = not thread.is_alive()
+    if stopped:
+        _remove_pid_file()
+        _server = None
+        _server_thread = None
+        connected_clients.clear()
+        client_rooms.clear()
+    return stopped
 
 def has_active_dashboard():
     """Check if there are any active dashboard tabs."""
-    # Clean up stale tabs (inactive for more than 30 seconds)
-    now = datetime.now()
-    stale_tabs = []
-    for tab_id, last_activity in last_tab_activity.items():
-        if (now - last_activity).total_seconds() > 30:
-            stale_tabs.append(tab_id)
+    # Clean up tabs whose socket is gone. Tabs don't poll, so a tab is alive as long as its
+    # connection is; Engine.IO's own ping/pong detects dead connections.
+    stale_tabs = [tab_id for tab_id, sid in active_dashboard_tabs.items() if sid not in connected_clients]
     
     for tab_id in stale_tabs:
         active_dashboard_tabs.pop(tab_id, None)
-        last_tab_activity.pop(tab_id, None)
     
     return len(active_dashboard_tabs) > 0
 
 def refresh_dashboard():
     """Send refresh signal to all connected dashboard tabs."""
-    if active_dashboard_tabs:
-        socketio.emit('refresh_dashboard', {})
+    if active_dashboard_tabs and _socketio is not None:
+        _emit('refresh_dashboard', {}, broadcast=True)
         return True
     return False
 
 def open_log_dashboard(url=None, show_screenshots=False):
     """Opens or refreshes the dashboard in the browser."""
+    # The process owning the dashboard knows its tabs, so let it decide
+    if _socketio is not None and _forward({'op': 'open_dashboard', 'show_screenshots': show_screenshots}):
+        return
     if url is None:
         # Default to localhost but allow customization
         import os
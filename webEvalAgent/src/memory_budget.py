@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+
+import base64
+import bisect
+import io
+import os
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from PIL import Image  # In requirements.txt; without it, screenshots are dropped instead of downsampled
+except ImportError:
+    Image = None
+
+# Set once the missing Pillow has been reported
+_downsample_unavailable_reported = False
+
+# OPERATIVE_RUN_MEMORY_BUDGET_MB: bytes a single run may hold in captured artifacts
+RUN_MEMORY_BUDGET_ENV = "OPERATIVE_RUN_MEMORY_BUDGET_MB"
+DEFAULT_RUN_MEMORY_BUDGET_MB = 256
+
+# Minimum interval between memory_usage updates to the dashboard
+USAGE_REPORT_INTERVAL_SECONDS = 1.0
+
+# Fixed overhead per stored entry (dict, keys, small fields)
+_ENTRY_OVERHEAD_BYTES = 200
+
+# Screenshots evicted by downsampling are re-encoded at this scale and JPEG quality
+DOWNSAMPLE_SCALE = 0.5
+DOWNSAMPLE_QUALITY = 40
+
+def get_run_memory_budget_bytes() -> int:
+    """Return the configured per-run artifact budget in bytes."""
+    try:
+        megabytes = float(os.environ.get(RUN_MEMORY_BUDGET_ENV, DEFAULT_RUN_MEMORY_BUDGET_MB))
+    except ValueError:
+        megabytes = DEFAULT_RUN_MEMORY_BUDGET_MB
+    return int(max(1.0, megabytes) * 1024 * 1024)
+
+def _size(value: Any) -> int:
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(len(str(k)) + _size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(_size(v) for v in value)
+    return 16
+
+def screenshot_bytes(entry: Dict[str, Any]) -> int:
+    return _ENTRY_OVERHEAD_BYTES + _size(entry.get('screenshot')) + _size(entry.get('url'))
+
+def console_bytes(entry: Dict[str, Any]) -> int:
+    return _ENTRY_OVERHEAD_BYTES + _size(entry.get('text')) + _size(entry.get('location'))
+
+def network_bytes(entry: Dict[str, Any]) -> int:
+    return (_ENTRY_OVERHEAD_BYTES + _size(entry.get('url')) + _size(entry.get('headers'))
+            + _size(entry.get('postData')) + _size(entry.get('response_headers')))
+
+def is_error_network_entry(entry: Dict[str, Any]) -> bool:
+    status = entry.get('response_status')
+    return bool(entry.get('failed')) or (isinstance(status, int) and status >= 400)
+
+def _report_downsample_unavailable() -> None:
+    global _downsample_unavailable_reported
+    if _downsample_unavailable_reported:
+        return
+    _downsample_unavailable_reported = True
+    try:
+        from .log_server import send_log
+        send_log("Pillow is not installed: screenshots over the memory budget are dropped instead of downsampled", "⚠️", log_type='status')
+    except Exception:
+        pass
+
+def downsample_data_url(data_url: Any) -> Optional[str]:
+    """Re-encode an image data URL as a smaller, lower quality JPEG; None if that isn't possible or smaller."""
+    if Image is None or not isinstance(data_url, str):
+        return None
+    _, separator, payload = data_url.partition("base64,")
+    if not separator:
+        return None
+    try:
+        image = Image.open(io.BytesIO(base64.b64decode(payload))).convert("RGB")
+        size = (max(1, int(image.width * DOWNSAMPLE_SCALE)), max(1, int(image.height * DOWNSAMPLE_SCALE)))
+        output = io.BytesIO()
+        image.resize(size).save(output, format="JPEG", quality=DOWNSAMPLE_QUALITY, optimize=True)
+    except Exception:
+        return None
+    smaller = "data:image/jpeg;base64," + base64.b64encode(output.getvalue()).decode("ascii")
+    return smaller if len(smaller) < len(data_url) else None
+
+class RunMemoryBudget:
+    """
+    Accounts the bytes held by a run's screenshots, console logs and network entries.
+
+    All appends to the storages go through this class. When the total exceeds the
+    budget, artifacts are evicted in this order until the run fits again:
+      1. headers and post data of non-error network entries
+      2. screenshots other than the first, the last and those next to an error:
+         downsampled first (needs Pillow), then dropped (oldest first)
+      3. non-error console logs (oldest first)
+      4. non-error network entries (oldest first)
+    Error-related artifacts are never evicted; for screenshots that is the one taken
+    just before and the one just after each console or network error. Console entries
+    are also fed to console_groups, whose per-fingerprint counts survive eviction.
+    """
+
+    def __init__(self, console_logs: deque, network_requests: deque, screenshots: List[Dict[str, Any]],
+                 on_usage: Optional[Callable[[Dict[str, Any]], None]] = None, console_groups: Any = None):
+        self.console_logs = console_logs
+        self.network_requests = network_requests
+        self.screenshots = screenshots
+        self.on_usage = on_usage
+        self.console_groups = console_groups
+        self.budget = get_run_memory_budget_bytes()
+        self.reset()
+
+    def reset(self) -> None:
+        """Clear all storages and counters for a new run."""
+        self.console_logs.clear()
+        self.network_requests.clear()
+        self.screenshots.clear()
+        if self.console_groups is not None:
+            self.console_groups.reset()
+        self.budget = get_run_memory_budget_bytes()
+        self.bytes = {'screenshots': 0, 'console': 0, 'network': 0}
+        self.evicted = {'network_details': 0, 'screenshots_downsampled': 0, 'screenshots': 0, 'console': 0, 'network': 0}
+        self._last_report = 0.0
+
+    @property
+    def used(self) -> int:
+        return sum(self.bytes.values())
+
+    # --- Appends ---
+
+    def _append_bounded(self, storage: deque, entry: Dict[str, Any], kind: str, measure: Callable) -> None:
+        if storage.maxlen is not None and len(storage) == storage.maxlen:
+            self.bytes[kind] -= measure(storage[0])  # deque drops the oldest entry
+            storage[0]['dropped'] = True
+        storage.append(entry)
+        self.bytes[kind] += measure(entry)
+
+    def add_console(self, entry: Dict[str, Any]) -> None:
+        if self.console_groups is not None:
+            self.console_groups.add(entry)
+        self._append_bounded(self.console_logs, entry, 'console', console_bytes)
+        self._enforce()
+
+    def add_network(self, entry: Dict[str, Any]) -> None:
+        self._append_bounded(self.network_requests, entry, 'network', network_bytes)
+        self._enforce()
+
+    def update_network(self, entry: Dict[str, Any], updates: Dict[str, Any]) -> None:
+        """Apply updates (e.g. response details) to a stored network entry."""
+        if entry.get('dropped'):
+            entry.update(updates)  # No longer stored, nothing to account
+            return
+        before = network_bytes(entry)
+        entry.update(updates)
+        self.bytes['network'] += network_bytes(entry) - before
+        self._enforce()
+
+    def add_screenshot(self, entry: Dict[str, Any]) -> None:
+        self.screenshots.append(entry)
+        self.bytes['screenshots'] += screenshot_bytes(entry)
+        self._enforce()
+
+    # --- Eviction ---
+
+    def _enforce(self) -> None:
+        if self.used > self.budget:
+            self._evict()
+        self.report(force=False)
+
+    def _evict(self) -> None:
+        # 1. Strip bulky details from non-error network entries
+        for entry in self.network_requests:
+            if self.used <= self.budget:
+                break
+            if is_error_network_entry(entry) or entry.get('details_evicted'):
+                continue
+            before = network_bytes(entry)
+            for key in ('headers', 'postData', 'response_headers'):
+                entry.pop(key, None)
+            entry['details_evicted'] = True
+            self.bytes['network'] += network_bytes(entry) - before
+            self.evicted['network_details'] += 1
+
+        # 2. Downsample, then drop, screenshots other than the first, the last and those next to errors
+        if self.used > self.budget and len(self.screenshots) > 2:
+            if Image is None:
+                _report_downsample_unavailable()
+            protected = self._protected_screenshots()
+            candidates = [entry for entry in self.screenshots if id(entry) not in protected]
+            for entry in candidates:
+                if self.used <= self.budget:
+                    break
+                if entry.get('downsampled'):
+                    continue
+                entry['downsampled'] = True  # Re-encoding twice would only lose more detail
+                smaller = downsample_data_url(entry.get('screenshot'))
+                if smaller is None:
+                    continue
+                before = screenshot_bytes(entry)
+                entry['screenshot'] = smaller
+                self.bytes['screenshots'] += screenshot_bytes(entry) - before
+                self.evicted['screenshots_downsampled'] += 1
+            dropped = set()
+            for entry in candidates:
+                if self.used <= self.budget:
+                    break
+                dropped.add(id(entry))
+                self.bytes['screenshots'] -= screenshot_bytes(entry)
+                self.evicted['screenshots'] += 1
+            if dropped:
+                self.screenshots[:] = [entry for entry in self.screenshots if id(entry) not in dropped]
+
+        # 3. Drop non-error console logs, oldest first
+        if self.used > self.budget:
+            self.evicted['console'] += self._drop_oldest(self.console_logs, 'console', console_bytes,
+                                                         lambda e: e.get('type') == 'error')
+
+        # 4. Drop non-error network entries, oldest first
+        if self.used > self.budget:
+            self.evicted['network'] += self._drop_oldest(self.network_requests, 'network', network_bytes,
+                                                         is_error_network_entry)
+
+    def _protected_screenshots(self) -> set:
+        """ids of the first and last screenshots and of those taken just before and after an error."""
+        protected = {id(self.screenshots[0]), id(self.screenshots[-1])}
+        timed = [entry for entry in self.screenshots if isinstance(entry.get('timestamp'), (int, float))]
+        times = [entry['timestamp'] for entry in timed]
+        error_times = [entry.get('timestamp') for entry in self.console_logs if entry.get('type') == 'error']
+        error_times += [entry.get('timestamp') for entry in self.network_requests if is_error_network_entry(entry)]
+        for error_time in error_times:
+            if not isinstance(error_time, (int, float)):
+                continue
+            after = bisect.bisect_left(times, error_time)
+            for index in (after - 1, after):
+                if 0 <= index < len(timed):
+                    protected.add(id(timed[index]))
+        return protected
+
+    def _drop_oldest(self, storage: deque, kind: str, measure: Callable, keep: Callable) -> int:
+        kept = []
+        dropped = 0
+        while storage and self.used > self.budget:
+            entry = storage.popleft()
+            if keep(entry):
+                kept.append(entry)
+                continue
+            self.bytes[kind] -= measure(entry)
+            entry['dropped'] = True
+            dropped += 1
+        storage.extendleft(reversed(kept))
+        return dropped
+
+    # --- Reporting ---
+
+    def usage(self) -> Dict[str, Any]:
+        """Current usage for the dashboard and reports."""
+        return {
+            'used': self.used,
+            'budget': self.budget,
+            'bytes': dict(self.bytes),
+            'counts': {
+                'screenshots': len(self.screenshots),
+                'console': len(self.console_logs),
+                'network': len(self.network_requests),
+            },
+            'evicted': dict(self.evicted),
+        }
+
+    def report(self, force: bool = True) -> None:
+        """Send the current usage to on_usage; unforced reports are throttled."""
+        if not self.on_usage:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_report < USAGE_REPORT_INTERVAL_SECONDS:
+            return
+        self._last_report = now
+        try:
+            self.on_usage(self.usage())
+        except Exception:
+            pass
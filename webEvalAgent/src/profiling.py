@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+
+import functools
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+# Span names in the order they are reported
+SPAN_NAMES = (
+    "llm",                 # Model request in agent.get_next_action
+    "actions",             # Action execution in agent.multi_act
+    "page_settle",         # DOM/state extraction in browser_context.get_state
+    "screenshot_capture",  # page.screenshot in the step callback
+    "screenshot_encode",   # base64 encoding and storage in the step callback
+    "callback",            # Remaining step callback overhead (logging, dashboard updates)
+)
+
+class StepProfiler:
+    """
+    Records where the wall-clock time of each agent step goes.
+
+    Spans are exclusive: when a span opens inside another (e.g. page_settle while
+    actions run), the outer span is paused, so the per-step numbers add up to the
+    step's attributed time and anything left over is reported as "other".
+    """
+
+    def __init__(self, on_step: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.on_step = on_step
+        self.steps: List[Dict[str, Any]] = []
+        self._current: Optional[Dict[str, Any]] = None
+        self._stack: List[List[Any]] = []  # [name, resumed_at]
+
+    def start_step(self, step_number: int) -> None:
+        """Begin recording a step, finishing any step still open."""
+        if self._current is not None:
+            self.finish_step()
+        self._current = {
+            "step": step_number,
+            "started_at": time.perf_counter(),
+            "spans": {name: 0.0 for name in SPAN_NAMES},
+        }
+
+    def finish_step(self) -> Optional[Dict[str, Any]]:
+        """Close the current step and hand its timing to on_step."""
+        current = self._current
+        if current is None:
+            return None
+        self._current = None
+        self._stack.clear()
+
+        total = time.perf_counter() - current.pop("started_at")
+        spans = {name: round(seconds, 4) for name, seconds in current["spans"].items()}
+        timing = {
+            "step": current["step"],
+            "total": round(total, 4),
+            "spans": spans,
+            "other": round(max(0.0, total - sum(spans.values())), 4),
+        }
+        self.steps.append(timing)
+        if self.on_step:
+            try:
+                self.on_step(timing)
+            except Exception:
+                pass
+        return timing
+
+    @contextmanager
+    def span(self, name: str):
+        """Attribute the time spent in the block to a span of the current step."""
+        if self._current is None:
+            yield
+            return
+
+        now = time.perf_counter()
+        if self._stack:
+            parent = self._stack[-1]
+            self._add(parent[0], now - parent[1])
+        self._stack.append([name, now])
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            if self._stack and self._stack[-1][0] == name:
+                entry = self._stack.pop()
+                self._add(name, now - entry[1])
+                if self._stack:
+                    self._stack[-1][1] = now
+
+    def wrap(self, name: str, coroutine_function: Callable) -> Callable:
+        """Wrap an async callable so each call is recorded as a span."""
+        @functools.wraps(coroutine_function)
+        async def wrapper(*args, **kwargs):
+            with self.span(name):
+                return await coroutine_function(*args, **kwargs)
+        return wrapper
+
+    def _add(self, name: str, seconds: float) -> None:
+        if self._current is not None:
+            spans = self._current["spans"]
+            spans[name] = spans.get(name, 0.0) + seconds
+
+    def totals(self) -> Dict[str, Any]:
+        """Sum the recorded steps per span."""
+        spans = {name: 0.0 for name in SPAN_NAMES}
+        total = other = 0.0
+        for timing in self.steps:
+            total += timing["total"]
+            other += timing["other"]
+            for name, seconds in timing["spans"].items():
+                spans[name] = spans.get(name, 0.0) + seconds
+        return {
+            "steps": len(self.steps),
+            "total": round(total, 4),
+            "spans": {name: round(seconds, 4) for name, seconds in spans.items()},
+            "other": round(other, 4),
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        """Return the per-step timings and their totals."""
+        return {"steps": list(self.steps), "totals": self.totals()}
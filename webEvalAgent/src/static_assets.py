@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+
+import gzip
+import hashlib
+import mimetypes
+import os
+from typing import Any, Dict, Optional
+
+try:
+    import brotli  # Optional: responses fall back to gzip when it's not installed
+except ImportError:
+    brotli = None
+
+# Responses smaller than this are sent uncompressed
+MIN_COMPRESS_BYTES = 512
+# Dynamic responses are compressed per request, so favour speed over ratio
+DYNAMIC_GZIP_LEVEL = 5
+DYNAMIC_BROTLI_QUALITY = 4
+
+# Assets are revalidated on every use; unchanged ones cost a 304 without a body
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+_COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "image/svg+xml")
+
+def is_compressible(mimetype: Optional[str]) -> bool:
+    return bool(mimetype) and mimetype.startswith(_COMPRESSIBLE_TYPES)
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick "br" or "gzip" from an Accept-Encoding header, or None for identity."""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+def compress(body: bytes, encoding: str, precompute: bool = False) -> bytes:
+    """Compress a body; precomputed copies use the slowest, smallest settings."""
+    if encoding == "br":
+        return brotli.compress(body, quality=11 if precompute else DYNAMIC_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=9 if precompute else DYNAMIC_GZIP_LEVEL, mtime=0)
+
+class StaticAssets:
+    """
+    The dashboard's static files, read once at startup.
+
+    Each asset keeps its body, a content hash used as ETag, and precompressed gzip (and
+    brotli, if installed) copies, so requests only pick one.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.assets: Dict[str, Dict[str, Any]] = {}
+        for root, _, files in os.walk(directory):
+            for name in files:
+                path = os.path.join(root, name)
+                self.add(os.path.relpath(path, directory).replace(os.sep, "/"), path)
+
+    def add(self, name: str, path: str) -> None:
+        with open(path, "rb") as f:
+            body = f.read()
+        mimetype = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        if mimetype.startswith("text/"):
+            mimetype += "; charset=utf-8"
+        asset = {
+            "body": body,
+            "mimetype": mimetype,
+            "hash": hashlib.sha256(body).hexdigest()[:16],
+            "encoded": {},
+        }
+        if is_compressible(mimetype) and len(body) >= MIN_COMPRESS_BYTES:
+            for encoding in ("br", "gzip") if brotli is not None else ("gzip",):
+                encoded = compress(body, encoding, precompute=True)
+                if len(encoded) < len(body):
+                    asset["encoded"][encoding] = encoded
+        self.assets[name] = asset
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        return self.assets.get(name)
+
+    def response(self, name: str, request):
+        """Build the Flask response for an asset: 304 if the ETag matches, else the best encoding."""
+        from flask import Response
+
+        asset = self.assets.get(name)
+        if asset is None:
+            return "Not found", 404
+        headers = {"ETag": f'"{asset["hash"]}"', "Cache-Control": REVALIDATE_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+        if asset["hash"] in request.if_none_match:
+            return Response(status=304, headers=headers)
+
+        body = asset["body"]
+        encoding = choose_encoding(request.headers.get("Accept-Encoding", ""))
+        if encoding in asset["encoded"]:
+            body = asset["encoded"][encoding]
+            headers["Content-Encoding"] = encoding
+        response = Response(body, headers=headers, content_type=asset["mimetype"])
+        response.direct_passthrough = True  # Already encoded; keep compress_response() off it
+        return response
+
+def compress_response(response, request):
+    """Flask after_request hook: compress text and JSON responses the client accepts compressed."""
+    if (response.direct_passthrough or response.is_streamed or response.status_code < 200
+            or response.status_code in (204, 304) or "Content-Encoding" in response.headers
+            or not is_compressible(response.mimetype)):
+        return response
+    body = response.get_data()
+    if len(body) < MIN_COMPRESS_BYTES:
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = choose_encoding(request.headers.get("Accept-Encoding", ""))
+    if encoding is None:
+        return response
+    response.set_data(compress(body, encoding))
+    response.headers["Content-Encoding"] = encoding
+    return response
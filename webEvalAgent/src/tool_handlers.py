@@ -7,7 +7,7 @@ import uuid
 import re
 import os
 from contextlib import redirect_stdout, redirect_stderr
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 
 from mcp.server.fastmcp import Context
 from mcp.types import TextContent, ImageContent # Added ImageContent import
@@ -15,14 +15,19 @@ from mcp.types import TextContent, ImageContent # Added ImageContent import
 # Import the manager directly
 from webEvalAgent.src.browser_manager import PlaywrightBrowserManager
 # Only import run_browser_task from browser_utils
-from webEvalAgent.src.browser_utils import run_browser_task, console_log_storage, network_request_storage, screenshot_storage
+from webEvalAgent.src.browser_utils import run_browser_task, console_log_storage, network_request_storage, screenshot_storage, console_groups
+from webEvalAgent.src.browser_state import STATE_DIR, STATE_FILE, invalidate_persisted_state
+from webEvalAgent.src.action_replay import load_action_script, save_action_script, replay_action_script
+from webEvalAgent.src.memory_budget import is_error_network_entry
 # Import your prompt function
 from webEvalAgent.src.prompts import get_web_evaluation_prompt
 # Import log server functions directly
-from .log_server import send_log, start_log_server, open_log_dashboard, set_url_and_task, send_browser_view, set_gallery_screenshots
+from .log_server import send_log, start_log_server, open_log_dashboard, set_url_and_task, begin_run, send_browser_view, set_gallery_screenshots, gallery_positions
 # For sleep
 import asyncio
+import heapq
 import time  # Ensure time is imported at the top level
+from datetime import datetime
 
 # Import playwright directly for browser state setup
 from playwright.async_api import async_playwright
@@ -31,6 +36,11 @@ from playwright.async_api import async_playwright
 MAX_ERROR_OUTPUT_CHARS = 100000  # Maximum characters to include in error output (increased from 10000)
 MAX_TIMELINE_CHARS = 100000      # Maximum characters for the timeline section (increased from 60000)
 
+# output_format="json": document version and cap on console error / failed request entries
+JSON_RESULT_VERSION = 1
+MAX_JSON_LIST_ITEMS = 200
+OUTPUT_FORMATS = ("text", "json")
+
 # Function to get the singleton browser manager instance
 def get_browser_manager() -> PlaywrightBrowserManager:
     """Get the singleton browser manager instance.
@@ -59,10 +69,8 @@ async def handle_web_evaluation(arguments: Dict[str, Any], ctx: Context, api_key
     """
     # Initialize log server immediately (if not already running)
     try:
-        # stop_log_server() # Commented out stop_log_server
-        start_log_server()
-        # Give the server a moment to start
-        await asyncio.sleep(1)
+        # Returns once the server accepts connections (or reuses a running one)
+        await asyncio.to_thread(start_log_server)
         # Open the dashboard in a new tab
         open_log_dashboard()
     except Exception as log_server_error:
@@ -79,6 +87,8 @@ async def handle_web_evaluation(arguments: Dict[str, Any], ctx: Context, api_key
     task = arguments["task"]
     tool_call_id = arguments.get("tool_call_id", str(uuid.uuid4()))
     headless = arguments.get("headless", True)
+    replay_actions = arguments.get("replay_actions", False)
+    output_format = arguments.get("output_format", "text")
 
     send_log(f"Handling web evaluation call with context: {ctx}", "🤔")
 
@@ -100,19 +110,28 @@ async def handle_web_evaluation(arguments: Dict[str, Any], ctx: Context, api_key
             text="Error: 'task' must be a non-empty string describing the UX/UI aspect to test."
         )]
     
+    if output_format not in OUTPUT_FORMATS:
+        return [TextContent(
+            type="text",
+            text=f"Error: 'output_format' must be one of {', '.join(OUTPUT_FORMATS)}."
+        )]
+    
     # Send initial status to dashboard
     send_log(f"🚀 Received web evaluation task: {task}", "🚀")
     send_log(f"🔗 Target URL: {url}", "🔗")
     
-    # Update the URL and task in the dashboard
-    set_url_and_task(url, task)
-
     # Get the singleton browser manager and initialize it
     browser_manager = get_browser_manager()
     if not browser_manager.is_initialized:
         # Note: browser_manager.initialize will no longer need to start the log server
         # since we've already done it above
         await browser_manager.initialize()
+
+    # Route this run's events to its room and push the URL and task to the dashboard.
+    # This comes after the shared browser manager starts so its event handlers don't
+    # inherit this run's id.
+    begin_run(tool_call_id, url, task)
+    set_url_and_task(url, task)
         
     # Get the evaluation task prompt
     evaluation_task = get_web_evaluation_prompt(url, task)
@@ -121,17 +140,46 @@ async def handle_web_evaluation(arguments: Dict[str, Any], ctx: Context, api_key
     # Run the browser task
     agent_result_data = None # Changed to agent_result_data
     try:
-        # run_browser_task now returns a dictionary with result and screenshots # Updated comment
-        agent_result_data = await run_browser_task(
-            evaluation_task,
-            headless=headless, # Pass the headless parameter
-            tool_call_id=tool_call_id,
-            api_key=api_key
-        )
+        # Re-run a saved action script without the LLM if requested and available
+        if replay_actions:
+            script = load_action_script(url, task)
+            if script:
+                replay_result = await replay_action_script(script, headless=headless)
+                if "fallback_reason" in replay_result:
+                    send_log(f"Action replay fell back to the agent: {replay_result['fallback_reason']}", "⚠️")
+                else:
+                    if replay_result.get("replay_error"):
+                        send_log(f"Action replay failed: {replay_result['replay_error']}", "❌")
+                    agent_result_data = replay_result
+            else:
+                send_log("No saved action script for this URL and task, running the agent", "ℹ️")
         
-        # Extract the final result string
+        # run_browser_task now returns a dictionary with result and screenshots # Updated comment
+        if agent_result_data is None:
+            agent_result_data = await run_browser_task(
+                evaluation_task,
+                headless=headless, # Pass the headless parameter
+                tool_call_id=tool_call_id,
+                api_key=api_key,
+                ctx=ctx
+            )
+            
+            # Save the action sequence of successful runs for later replays
+            history = agent_result_data.get("history")
+            if history is not None and history.is_successful():
+                try:
+                    script_path = save_action_script(url, task, history)
+                    if script_path:
+                        send_log(f"Saved action script for replay to {script_path}", "💾")
+                except Exception as e:
+                    send_log(f"Failed to save action script: {e}", "⚠️")
+        
+        # Extract the final result text and the structured history
         agent_final_result = agent_result_data.get("result", "No result provided")
+        history = agent_result_data.get("history")
         screenshots = agent_result_data.get("screenshots", []) # Added this line
+        step_timings = agent_result_data.get("timings")
+        har_run_id = agent_result_data.get("har_run_id")
 
         # Log detailed screenshot information
         send_log(f"Received {len(screenshots)} screenshots from run_browser_task", "📸")
@@ -150,16 +198,12 @@ async def handle_web_evaluation(arguments: Dict[str, Any], ctx: Context, api_key
         send_log(error_msg, "❌")
         agent_final_result = f"Error: {browser_task_error}" # Provide error as result
         screenshots = [] # Ensure screenshots is defined even on error
+        step_timings = None
+        history = None
+        har_run_id = None
 
-    # Format the agent result in a more user-friendly way, including console and network errors
-    formatted_result = format_agent_result(agent_final_result, url, task, console_log_storage, network_request_storage)
-    
     # Determine if the task was successful
-    task_succeeded = True
-    if agent_final_result.startswith("Error:"):
-        task_succeeded = False
-    elif "success=False" in agent_final_result and "is_done=True" in agent_final_result:
-        task_succeeded = False
+    task_succeeded = is_task_successful({"result": agent_final_result, "history": history})
     
     # Use appropriate status emoji
     status_emoji = "✅" if task_succeeded else "❌"
@@ -170,12 +214,12 @@ async def handle_web_evaluation(arguments: Dict[str, Any], ctx: Context, api_key
     custom_host = os.environ.get('OPERATIVE_DASHBOARD_HOST', '127.0.0.1')
     dashboard_url = f'http://{custom_host}:5009'
     screenshots_url = f'{dashboard_url}/screenshots'
-    
-    confirmation_text = f"{formatted_result}\n\n👁️ See the 'Operative Control Center' dashboard for detailed live logs.\n📸 View all screenshots at {screenshots_url}\nWeb Evaluation completed!"
-    send_log(f"Web evaluation task completed for {url}.", status_emoji) # Also send confirmation to dashboard
+    har_url = f'{dashboard_url}/har/{har_run_id}' if har_run_id else None
     
     # Prepare screenshots for the gallery
+    gallery_ids = {}  # Index in `screenshots` -> index on the screenshots page
     gallery_screenshot_data_urls = []
+    gallery_sources = []  # Index in `screenshots` of each gallery data URL
     if screenshots: # Ensure screenshots is not None and not empty
         for i, s_data in enumerate(screenshots):
             if (s_data and isinstance(s_data, dict) and 'screenshot' in s_data and isinstance(s_data['screenshot'], str)):
@@ -189,6 +233,7 @@ async def handle_web_evaluation(arguments: Dict[str, Any], ctx: Context, api_key
                     # add the prefix to make it a valid data URL
                     send_log(f"Adding missing prefix to screenshot data at index {i}", "🔧")
                     gallery_screenshot_data_urls.append(f"data:image/jpeg;base64,{screenshot_data}")
+                gallery_sources.append(i)
             else:
                 # Log issue with this specific screenshot
                 if isinstance(s_data, dict):
@@ -206,17 +251,44 @@ async def handle_web_evaluation(arguments: Dict[str, Any], ctx: Context, api_key
                 else:
                     send_log(f"Screenshot data at index {i} is not a dict: {type(s_data)}", "⚠️")
         
+        # Where each screenshot ends up on the screenshots page, for the JSON result
+        for source, position in zip(gallery_sources, gallery_positions(gallery_screenshot_data_urls)):
+            if position is not None:
+                gallery_ids[source] = position
+
         try:
             send_log(f"Sending {len(gallery_screenshot_data_urls)} valid screenshots to gallery", "📸")
             set_gallery_screenshots(gallery_screenshot_data_urls)
         except Exception as e:
             send_log(f"Error updating screenshot gallery: {e}", "❌")
 
+    if output_format == "json":
+        # Structured result only; screenshots are referenced by gallery index, not inlined
+        document = build_result_document(agent_final_result, url, task, console_log_storage, network_request_storage,
+                                         step_timings, history=history, screenshots=screenshots,
+                                         console_groups=console_groups, gallery_ids=gallery_ids)
+        document["dashboard_url"] = dashboard_url
+        document["screenshots_url"] = screenshots_url
+        document["har_url"] = har_url
+        confirmation_text = json.dumps(document, separators=(",", ":"), ensure_ascii=False, default=str)
+    else:
+        # Format the agent result in a more user-friendly way, including console and network errors
+        formatted_result = format_agent_result(agent_final_result, url, task, console_log_storage, network_request_storage, step_timings,
+                                               history=history, console_groups=console_groups)
+        confirmation_text = f"{formatted_result}\n\n👁️ See the 'Operative Control Center' dashboard for detailed live logs.\n📸 View all screenshots at {screenshots_url}\n"
+        if har_url:
+            confirmation_text += f"🗂️ Download the network HAR at {har_url}\n"
+        confirmation_text += "Web Evaluation completed!"
+    send_log(f"Web evaluation task completed for {url}.", status_emoji) # Also send confirmation to dashboard
+    
     # Log final screenshot count before constructing response
     send_log(f"Constructing final response with {len(screenshots)} screenshots for MCP.", "🧩")
     
     # Create the final response structure
     response = [TextContent(type="text", text=confirmation_text)]
+    if output_format == "json":
+        send_log(f"Returning JSON result ({len(confirmation_text)} chars) without inline screenshots", "🎁")
+        return [response]
     
     # Add all captured screenshots to the MCP response
     # The user's log indicated "Adding screenshot 1...", so we iterate from the start.
@@ -251,418 +323,461 @@ async def handle_web_evaluation(arguments: Dict[str, Any], ctx: Context, api_key
     # i.e., a list containing a single list of mixed content items
     return [response]
 
-def format_agent_result(result_str: str, url: str, task: str, console_logs=None, network_requests=None) -> str:
+# Labels for the step timing spans recorded by StepProfiler
+STEP_TIMING_LABELS = {
+    "llm": "LLM request",
+    "actions": "Action execution",
+    "page_settle": "Page settle",
+    "screenshot_capture": "Screenshot capture",
+    "screenshot_encode": "Screenshot encode",
+    "callback": "Step callback",
+}
+
+def format_step_timings(step_timings: Dict[str, Any]) -> str:
+    """Format the per-step latency breakdown returned by run_browser_task.
+    
+    Args:
+        step_timings: The profiler summary with 'steps' and 'totals'
+        
+    Returns:
+        str: Totals per span followed by one line per step, or an empty string if nothing was recorded
+    """
+    totals = (step_timings or {}).get("totals") or {}
+    if not totals.get("steps"):
+        return ""
+    
+    total = totals.get("total", 0) or 0
+    def share(seconds):
+        return f"{seconds:.2f}s ({seconds / total * 100:.0f}%)" if total else f"{seconds:.2f}s"
+    
+    formatted = f"\n⏱️ Step Timing Breakdown ({totals['steps']} steps, {total:.2f}s total):\n"
+    spans = totals.get("spans", {})
+    for name, label in STEP_TIMING_LABELS.items():
+        formatted += f"  {label}: {share(spans.get(name, 0))}\n"
+    formatted += f"  Other: {share(totals.get('other', 0))}\n"
+    
+    for timing in step_timings.get("steps", []):
+        parts = [f"{name} {seconds:.2f}s" for name, seconds in timing["spans"].items() if seconds >= 0.005]
+        formatted += f"  Step {timing['step']}: {timing['total']:.2f}s ({', '.join(parts) or 'no spans'})\n"
+    return formatted
+
+def iter_agent_steps(history) -> List[Dict[str, Any]]:
+    """Flatten an AgentHistoryList into one entry per action result.
+    
+    Args:
+        history: The AgentHistoryList returned by run_browser_task
+        
+    Returns:
+        List[Dict[str, Any]]: Entries with the step number, URL, step start/end time, content,
+        error and done/success flags. Results without content or error are skipped.
+    """
+    steps = []
+    for index, item in enumerate(history.history):
+        metadata = item.metadata
+        step_number = metadata.step_number if metadata else index + 1
+        for result in item.result:
+            if not result.error and result.extracted_content is None:
+                continue
+            steps.append({
+                "step": step_number,
+                "url": item.state.url if item.state else None,
+                "started_at": metadata.step_start_time if metadata else None,
+                "ended_at": metadata.step_end_time if metadata else None,
+                "content": result.extracted_content or "",
+                "error": result.error.strip().splitlines()[-1] if result.error else None,
+                "is_done": bool(result.is_done),
+                "success": result.success,
+            })
+    return steps
+
+def is_task_successful(agent_result_data: Dict[str, Any]) -> bool:
+    """Decide whether an evaluation succeeded from the structured agent history.
+    
+    A run fails if it errored before producing a history or if the agent finished with success=False.
+    """
+    history = (agent_result_data or {}).get("history")
+    if history is None:
+        return not str((agent_result_data or {}).get("result", "")).startswith("Error")
+    return history.is_successful() is not False
+
+def _event_time(event: Dict[str, Any]) -> float:
+    return event.get('timestamp', 0)
+
+def format_timeline_event(event: Dict[str, Any]) -> str:
+    """Format one timeline event as a line with its time of day."""
+    event_type = event.get('type')
+    # Format timestamp as HH:MM:SS.ms
+    time_str = datetime.fromtimestamp(event.get('timestamp', 0)).strftime('%H:%M:%S.%f')[:-3]
+    
+    if event_type == 'console':
+        subtype = event.get('subtype', 'log')
+        emoji = "❌" if subtype == 'error' else "⚠️" if subtype == 'warning' else "🖥️"
+        return f"  {time_str} {emoji} Console [{subtype}]: {event.get('text', '')}\n"
+    if event_type == 'network_request':
+        return f"  {time_str} ➡️ Network Request: {event.get('method', 'GET')} {event.get('url', '')}\n"
+    if event_type == 'network_response':
+        status = event.get('status', 'N/A')
+        status_emoji = "❌" if str(status).startswith(('4', '5')) else "✅"
+        return f"  {time_str} ⬅️ Network Response: {event.get('method', 'GET')} {event.get('url', '')} - Status: {status} {status_emoji}\n"
+    if event_type == 'agent_error':
+        return f"  {time_str} 🤖 Agent Error: {event.get('text', '')}\n"
+    if event_type in ('agent_step', 'conclusion'):
+        return f"  {time_str} 🤖 {event.get('text', '')}\n"
+    return ""
+
+class ReportSection:
+    """Collects the lines of one report section up to a character budget.
+    
+    Once the budget is reached the remaining items are only counted, not rendered,
+    so large log buffers cost little more than a short one.
+    """
+    
+    def __init__(self, budget: int):
+        self.budget = budget
+        self.parts: List[str] = []
+        self.length = 0
+        self.rendered = 0
+        self.omitted = 0
+    
+    def extend(self, items, item_formatter, total: Optional[int] = None) -> "ReportSection":
+        """Render items with item_formatter(index, item) until the budget is reached.
+        
+        Args:
+            items: Any iterable of items
+            item_formatter: Function that takes (index, item) and returns a formatted line
+            total: Number of items, if known; iteration then stops at the budget instead of
+                consuming the rest of items to count them
+        """
+        for i, item in enumerate(items):
+            if self.omitted:
+                if total is not None:
+                    self.omitted = total - self.rendered
+                    break
+                self.omitted += 1
+                continue
+            line = item_formatter(i, item)
+            if self.length + len(line) > self.budget:
+                if not self.parts:
+                    # Never leave a section empty because its first line is huge
+                    line = line[:self.budget].rstrip("\n") + "\n"
+                    self.parts.append(line)
+                    self.length += len(line)
+                    self.rendered += 1
+                else:
+                    self.omitted = 1
+                continue
+            self.parts.append(line)
+            self.length += len(line)
+            self.rendered += 1
+        return self
+    
+    def render(self, noun: str = "items") -> str:
+        """Return the rendered lines plus a note about omitted items."""
+        text = "".join(self.parts)
+        if self.omitted:
+            text += f"  ... [Output truncated, {self.omitted} more {noun} not shown]\n"
+        return text
+
+def format_console_group(i: int, group: Dict[str, Any]) -> str:
+    """Format one aggregated console issue, with its repeat count and time range."""
+    line = f"  {i+1}. [{group['type']}] {group['text']}"
+    if group['count'] > 1:
+        first = datetime.fromtimestamp(group['first_timestamp']).strftime('%H:%M:%S')
+        last = datetime.fromtimestamp(group['last_timestamp']).strftime('%H:%M:%S')
+        line += f" (×{group['count']}, {first}–{last})"
+    return line + "\n"
+
+def format_agent_result(result_str: str, url: str, task: str, console_logs=None, network_requests=None, step_timings=None, history=None, console_groups=None) -> str:
     """Format the agent result in a readable way with emojis.
     
     Args:
-        result_str: Raw string representation of the agent result
+        result_str: Final result text of the run, or the error message if the run failed
         url: The URL that was evaluated
         task: The task that was executed
         console_logs: Collected console logs from the browser
         network_requests: Collected network requests from the browser
+        step_timings: Per-step latency breakdown from run_browser_task
+        history: The structured AgentHistoryList of the run
+        console_groups: ConsoleGroups of the run; if given, console sections show one line per distinct message
         
     Returns:
         str: Formatted result with steps and conclusion
     """
-    # Start with a header
-    formatted = f"📊 Web Evaluation Report for {url} complete!\n"
-    formatted += f"📝 Completed Task: {task}\n\n"
+    # Start with a header; sections are appended to a list and joined once at the end
+    report = [
+        f"📊 Web Evaluation Report for {url} complete!\n",
+        f"📝 Completed Task: {task}\n\n",
+    ]
     
     # Check if there's an error
     if result_str.startswith("Error:"):
-        return f"{formatted}❌ {result_str}"
-    
-    # Flag to track if the task was successful
-    task_succeeded = True
+        report.append(f"❌ {result_str}")
+        return "".join(report)
     
     # List to collect all agent steps with timestamps for the timeline
     agent_steps_timeline = []
     
     # Helper function for formatting error lists with character limit
-    def format_error_list(items, item_formatter):
+    def format_error_list(items, item_formatter, occurrences=None):
         """Format a list of error items with character limit.
         
         Args:
-            items: List of error items to format
+            items: Sized collection of error items to format
             item_formatter: Function that takes (index, item) and returns a formatted string
+            occurrences: Total occurrences when items are aggregated groups
             
         Returns:
-            str: Formatted error list with potential truncation
+            str: Formatted error list, with a count of the items past the budget
         """
         if not items:
             return " No items found.\n"
-            
-        result = f" ({len(items)} items)\n"
-        
-        # Combine all items with line breaks
-        all_items_text = ""
-        for i, item in enumerate(items):
-            item_line = item_formatter(i, item)
-            all_items_text += item_line
-            
-        # Truncate if necessary and add indicator
-        if len(all_items_text) > MAX_ERROR_OUTPUT_CHARS:
-            truncated_text = all_items_text[:MAX_ERROR_OUTPUT_CHARS]
-            # Try to end at a newline if possible
-            last_newline = truncated_text.rfind('\n')
-            if last_newline > MAX_ERROR_OUTPUT_CHARS * 0.9:  # Only if we're not losing too much
-                truncated_text = truncated_text[:last_newline+1]
-                
-            result += truncated_text
-            result += f"  ... [Output truncated, {len(all_items_text) - len(truncated_text)} more characters not shown]\n"
-        else:
-            result += all_items_text
-            
-        return result
+        section = ReportSection(MAX_ERROR_OUTPUT_CHARS).extend(items, item_formatter)
+        if occurrences is not None:
+            return f" ({len(items)} distinct, {occurrences} total)\n" + section.render()
+        return f" ({len(items)} items)\n" + section.render()
     
-    # Try to extract action results from the string
     try:
-        # Look for the all_results list in the string
-        # This approach is more reliable than regex for simple extraction
-        if "all_results=[" in result_str:
-            # Get the part between all_results=[ and the next ]
-            results_part = result_str.split("all_results=[")[1].split("]")[0]
-            
-            # Split by ActionResult to get individual results
-            action_results = results_part.split("ActionResult(")
-            
-            # Skip the first empty item
-            action_results = [r for r in action_results if r.strip()]
-            
-            # Check if the final action has success=False
-            for action in action_results:
-                if "is_done=True" in action:
-                    if "success=False" in action:
-                        task_succeeded = False
-                    break
-            
-            # Format steps with emojis
-            formatted += "🔍 Agent Steps:\n"
-            
-            # Approximate timestamps for steps - align with browser events rather than using current time
-            # First, check if we have browser events to align with
-            earliest_browser_time = None
-            latest_browser_time = None
+        # Format the agent's steps and conclusion from the structured history
+        agent_steps = iter_agent_steps(history) if history is not None else []
+        if agent_steps:
+            report.append("🔍 Agent Steps:\n")
+        
+        # Steps are placed at the wall-clock time their actions finished (StepMetadata)
+        step_timestamp = 0
+        for step in agent_steps:
+            # Keep the agent stream ordered even if a step has no metadata
+            step_timestamp = max(step_timestamp, step["ended_at"] or step["started_at"] or time.time())
             
-            # Get timeframe from console logs
-            if console_logs:
-                for log in console_logs:
-                    timestamp = log.get('timestamp', 0)
-                    if timestamp > 0:
-                        if earliest_browser_time is None or timestamp < earliest_browser_time:
-                            earliest_browser_time = timestamp
-                        if latest_browser_time is None or timestamp > latest_browser_time:
-                            latest_browser_time = timestamp
-            
-            # Check network requests too
-            if network_requests:
-                for req in network_requests:
-                    timestamp = req.get('timestamp', 0)
-                    if timestamp > 0:
-                        if earliest_browser_time is None or timestamp < earliest_browser_time:
-                            earliest_browser_time = timestamp
-                        if latest_browser_time is None or timestamp > latest_browser_time:
-                            latest_browser_time = timestamp
-                    
-                    # Also check response timestamp
-                    resp_timestamp = req.get('response_timestamp', 0)
-                    if resp_timestamp > 0:
-                        if latest_browser_time is None or resp_timestamp > latest_browser_time:
-                            latest_browser_time = resp_timestamp
+            if step["error"]:
+                error_content = f"❌ Step {step['step']}: {step['error']}"
+                report.append(f"  {error_content}\n")
+                agent_steps_timeline.append({
+                    "type": "agent_error",
+                    "text": error_content,
+                    "timestamp": step_timestamp
+                })
+                continue
             
-            # Now set the agent step timings based on browser events
-            current_time = time.time()
+            content = step["content"]
+            # Add emoji if not present, using a "finished" emoji for the final message
+            if not content.startswith(("🔗", "🖱️", "⌨️", "🔍", "✅", "❌", "⚠️", "🏁")):
+                content = f"🏁 {content}" if step["is_done"] else f"✅ {content}"
+            elif content.startswith("✅") and step["is_done"]:
+                content = "🏁" + content[1:]
             
-            # If we have browser events, position agent steps after the browser events
-            # Otherwise, fall back to the current time approach
-            if earliest_browser_time and latest_browser_time:
-                # Position agent steps right after the browser events with a small gap (2 seconds)
-                step_base_time = latest_browser_time + 2
-                # Spread steps evenly over reasonable time period (5 sec per step)
-                step_interval = 5
+            if step["is_done"]:
+                # The final message is shown as is (already has 🏁)
+                formatted_line = f"  {content}"
+                timeline_content = content
             else:
-                # Fall back to current time approach but with a better baseline
-                step_base_time = current_time - (len(action_results) * 5)
-                step_interval = 5
+                formatted_line = f"  📍 Step {step['step']}: {content}"
+                timeline_content = f"📍 Step {step['step']}: {content}"
             
-            for i, action in enumerate(action_results):
-                # Extract the extracted_content which contains the step description
-                if "extracted_content=" in action:
-                    content_part = action.split("extracted_content=")[1].split(",")[0]
-                    # Clean up the content
-                    content = content_part.strip("'\"")
-                    
-                    # Skip None values
-                    if content == "None":
-                        continue
-                        
-                    # Estimate timestamp for this step
-                    step_timestamp = step_base_time + (i * step_interval)
-                    
-                    # Check if there's an error
-                    if "error=" in action and not "error=None" in action:
-                        error_part = action.split("error=")[1].split(",")[0]
-                        error = error_part.strip("'\"")
-                        if error != "None":
-                            # Include the step number for error messages too
-                            error_content = f"❌ Step {i+1}: {error}"
-                            formatted += f"  {error_content}\n"
-                            # Add to timeline
-                            agent_steps_timeline.append({
-                                "type": "agent_error",
-                                "text": error_content,
-                                "timestamp": step_timestamp
-                            })
-                            task_succeeded = False
-                            continue
-                    
-                    # Check if this is a final message/conclusion step
-                    is_final_message = "is_done=True" in action
-                    
-                    # Add emoji if not present, using a different emoji for the final message
-                    if not content.startswith(("🔗", "🖱️", "⌨️", "🔍", "✅", "❌", "⚠️", "🏁")):
-                        if is_final_message:
-                            # Use a "finished" emoji rather than a checkmark for the completion message
-                            content = f"🏁 {content}"
-                        else:
-                            content = f"✅ {content}"
-                    
-                    # If it has a checkmark but is a final message, replace with completion emoji
-                    if content.startswith("✅") and is_final_message:
-                        content = "🏁" + content[1:]
-                    
-                    # Format the output with step number for non-final messages
-                    if not is_final_message:
-                        # Add step number with 📍 emoji for display (i+1 to start from 1)
-                        formatted_line = f"  📍 Step {i+1}: {content}"
-                        # Store the content with step number for timeline
-                        timeline_content = f"📍 Step {i+1}: {content}"
-                    else:
-                        # For final message, just use the content as is (already has 🏁)
-                        formatted_line = f"  {content}"
-                        timeline_content = content
-                    
-                    # Add to formatted output
-                    formatted += formatted_line + "\n"
-                    
-                    # Add to timeline
-                    agent_steps_timeline.append({
-                        "type": "agent_step",
-                        "text": timeline_content,
-                        "timestamp": step_timestamp
-                    })
-        
-        # Look for the 'done' action in the model outputs to extract the conclusion
-        conclusion = ""
-        if "'done':" in result_str or "\"done\":" in result_str:
-            # Try to find the 'done' action and its text
-            done_match = None
-            if "'done':" in result_str:
-                done_parts = result_str.split("'done':")[1].split("}")[0]
-                done_match = done_parts
-            elif "\"done\":" in result_str:
-                done_parts = result_str.split("\"done\":")[1].split("}")[0]
-                done_match = done_parts
-                
-            if done_match:
-                # Extract the 'text' field from the done action
-                if "'text':" in done_match:
-                    text_part = done_match.split("'text':")[1].split(",")[0]
-                    conclusion = text_part.strip("' \"")
-                elif "\"text\":" in done_match:
-                    text_part = done_match.split("\"text\":")[1].split(",")[0]
-                    conclusion = text_part.strip("' \"")
-                
-                # Also check for success field in the done action
-                if "'success': False" in done_match or "\"success\": False" in done_match:
-                    task_succeeded = False
-        
-        # If we still don't have a conclusion, try the original method as fallback
-        if not conclusion and "is_done=True" in result_str:
-            for action in action_results:
-                if "is_done=True" in action and "extracted_content=" in action:
-                    content = action.split("extracted_content=")[1].split(",")[0].strip("'\"")
-                    if content and content != "None":
-                        conclusion = content
-                        break
+            report.append(formatted_line + "\n")
+            agent_steps_timeline.append({
+                "type": "agent_step",
+                "text": timeline_content,
+                "timestamp": step_timestamp
+            })
         
-        # Add conclusion with appropriate status emoji
+        # The conclusion is the final result of a finished run
+        conclusion = history.final_result() if history is not None and history.is_done() else ""
         if conclusion:
             # Use a neutral conclusion emoji instead of success/failure indicator
-            formatted += f"\n📋 Conclusion:\n{conclusion}\n"
+            report.append(f"\n📋 Conclusion:\n{conclusion}\n")
             
-            # Add conclusion to timeline
-            if agent_steps_timeline:
-                # Set timestamp a bit after the last step
-                conclusion_timestamp = agent_steps_timeline[-1]["timestamp"] + 2
-            else:
-                conclusion_timestamp = time.time()
-                
+            # Add conclusion to timeline at the end of the last step
             agent_steps_timeline.append({
                 "type": "conclusion",
                 "text": f"📋 Conclusion: {conclusion}",
-                "timestamp": conclusion_timestamp
+                "timestamp": agent_steps_timeline[-1]["timestamp"] if agent_steps_timeline else time.time()
             })
+        elif history is None and result_str:
+            # No structured history (e.g. an unexpected result shape); show what we got
+            report.append(f"⚠️ No structured agent history available.\nRaw result: {result_str[:10000]}\n")
         
-        # First identify console errors for easier debugging
-        console_errors = []
-        if console_logs:
-            for log in console_logs:
-                if log.get('type') == 'error':
-                    console_errors.append(log.get('text', 'Unknown error'))
-        
-        # Show console errors first (if any)
-        if console_errors:
-            formatted += f"\n🔴 Console Errors:"
-            formatted += format_error_list(
-                console_errors,
-                lambda i, error: f"  {i+1}. {error}\n"
-            )
+        all_console_logs = console_logs or []
+        all_network_requests = network_requests or []
         
-        # Identify failed network requests for easier debugging
-        failed_requests = []
-        if network_requests:
-            for req in network_requests:
-                # Check if it's an XHR/fetch request and has a failure status code (4xx or 5xx)
-                is_xhr = req.get('resourceType') == 'xhr' or req.get('resourceType') == 'fetch'
-                status = req.get('response_status')
-                if is_xhr and status and (status >= 400):
-                    failed_requests.append({
-                        'url': req.get('url', 'Unknown URL'),
-                        'method': req.get('method', 'GET'),
-                        'status': status
-                    })
+        # First identify console errors for easier debugging
+        if console_groups is not None:
+            # One line per distinct issue, with repeat counts from capture time
+            error_groups = console_groups.list('error')
+            if error_groups:
+                report.append("\n🔴 Console Errors:")
+                report.append(format_error_list(
+                    error_groups,
+                    format_console_group,
+                    occurrences=sum(g['count'] for g in error_groups)
+                ))
+        else:
+            console_errors = [log.get('text', 'Unknown error') for log in all_console_logs if log.get('type') == 'error']
+            
+            # Show console errors first (if any)
+            if console_errors:
+                report.append("\n🔴 Console Errors:")
+                report.append(format_error_list(
+                    console_errors,
+                    lambda i, error: f"  {i+1}. {error}\n"
+                ))
+        
+        # Identify failed network requests for easier debugging (same criteria as the JSON output)
+        failed_requests = [
+            {
+                'url': req.get('url', 'Unknown URL'),
+                'method': req.get('method', 'GET'),
+                'status': req.get('response_status') or 'failed'
+            }
+            for req in all_network_requests if is_error_network_entry(req)
+        ]
         
         # Show failed network requests next (if any)
         if failed_requests:
-            formatted += f"\n❌ Failed Network Requests:"
-            formatted += format_error_list(
+            report.append("\n❌ Failed Network Requests:")
+            report.append(format_error_list(
                 failed_requests,
                 lambda i, req: f"  {i+1}. {req['method']} {req['url']} - Status: {req['status']}\n"
-            )
+            ))
         
         # Then show all console logs
-        all_console_logs = []
-        if console_logs:
-            all_console_logs = list(console_logs)  # Convert deque to list for easier handling
-        
-        formatted += f"\n🖥️ All Console Logs:"
-        formatted += format_error_list(
-            all_console_logs,
-            lambda i, log: f"  {i+1}. [{log.get('type', 'log')}] {log.get('text', 'Unknown message')}\n"
-        )
+        report.append("\n🖥️ All Console Logs:")
+        if console_groups is not None:
+            report.append(format_error_list(console_groups.list(), format_console_group, occurrences=console_groups.total))
+            if console_groups.ungrouped:
+                report.append(f"  ... [{console_groups.ungrouped} further messages not grouped]\n")
+        else:
+            report.append(format_error_list(
+                all_console_logs,
+                lambda i, log: f"  {i+1}. [{log.get('type', 'log')}] {log.get('text', 'Unknown message')}\n"
+            ))
         
         # Finally show all network requests
-        all_network_requests = []
-        if network_requests:
-            all_network_requests = list(network_requests)  # Convert deque to list
-        
-        formatted += f"\n🌐 All Network Requests:"
-        formatted += format_error_list(
+        report.append("\n🌐 All Network Requests:")
+        report.append(format_error_list(
             all_network_requests,
             lambda i, req: f"  {i+1}. {req.get('method', 'GET')} {req.get('url', 'Unknown URL')} - Status: {req.get('response_status', 'N/A')}\n"
-        )
-        
-        # Add a chronological timeline of all events
-        # Combine all events into a single list
-        all_events = []
-        
-        # Add console logs to events
-        for log in all_console_logs:
-            all_events.append({
-                "type": "console",
-                "subtype": log.get('type', 'log'),
-                "text": log.get('text', 'Unknown message'),
-                "timestamp": log.get('timestamp', 0)
-            })
-        
-        # Add network requests to events
-        for req in all_network_requests:
-            # Add request
-            all_events.append({
-                "type": "network_request",
-                "method": req.get('method', 'GET'),
-                "url": req.get('url', 'Unknown URL'),
-                "timestamp": req.get('timestamp', 0)
-            })
-            
-            # Add response if available
-            if 'response_timestamp' in req:
-                all_events.append({
-                    "type": "network_response",
-                    "method": req.get('method', 'GET'),
-                    "url": req.get('url', 'Unknown URL'),
-                    "status": req.get('response_status', 'N/A'),
-                    "timestamp": req.get('response_timestamp', 0)
-                })
-        
-        # Add agent steps to events
-        all_events.extend(agent_steps_timeline)
-        
-        # Sort all events by timestamp
-        all_events.sort(key=lambda x: x.get('timestamp', 0))
-        
-        # Format the timeline
-        formatted += f"\n\n⏱️ Chronological Timeline of All Events:\n"
-        
-        timeline_text = ""
-        for event in all_events:
-            event_type = event.get('type')
-            timestamp = event.get('timestamp', 0)
-            
-            # Format timestamp as HH:MM:SS.ms
-            from datetime import datetime
-            time_str = datetime.fromtimestamp(timestamp).strftime('%H:%M:%S.%f')[:-3]
-            
-            if event_type == 'console':
-                subtype = event.get('subtype', 'log')
-                text = event.get('text', '')
-                emoji = "❌" if subtype == 'error' else "⚠️" if subtype == 'warning' else "🖥️"
-                timeline_text += f"  {time_str} {emoji} Console [{subtype}]: {text}\n"
-                
-            elif event_type == 'network_request':
-                method = event.get('method', 'GET')
-                url = event.get('url', '')
-                timeline_text += f"  {time_str} ➡️ Network Request: {method} {url}\n"
-                
-            elif event_type == 'network_response':
-                method = event.get('method', 'GET')
-                url = event.get('url', '')
-                status = event.get('status', 'N/A')
-                status_emoji = "❌" if str(status).startswith(('4', '5')) else "✅"
-                timeline_text += f"  {time_str} ⬅️ Network Response: {method} {url} - Status: {status} {status_emoji}\n"
-                
-            elif event_type == 'agent_step':
-                text = event.get('text', '')
-                timeline_text += f"  {time_str} 🤖 {text}\n"
-                
-            elif event_type == 'agent_error':
-                text = event.get('text', '')
-                timeline_text += f"  {time_str} 🤖 Agent Error: {text}\n"
-                
-            elif event_type == 'conclusion':
-                text = event.get('text', '')
-                timeline_text += f"  {time_str} 🤖 {text}\n"
-        
-        # Truncate if necessary
-        if len(timeline_text) > MAX_TIMELINE_CHARS:
-            truncated_text = timeline_text[:MAX_TIMELINE_CHARS]
-            # Try to end at a newline if possible
-            last_newline = truncated_text.rfind('\n')
-            if last_newline > MAX_TIMELINE_CHARS * 0.9:  # Only if we're not losing too much
-                truncated_text = truncated_text[:last_newline+1]
-                
-            formatted += truncated_text
-            formatted += f"  ... [Timeline truncated, {len(timeline_text) - len(truncated_text)} more characters not shown]\n"
-        else:
-            formatted += timeline_text
+        ))
+        
+        # Show where the run's wall-clock time went
+        report.append(format_step_timings(step_timings))
+        
+        # Add a chronological timeline of all events. Console logs, requests and agent
+        # steps are each stored in capture order, so a lazy k-way merge interleaves them
+        # and stops being consumed once the timeline budget is reached.
+        console_events = ({
+            "type": "console",
+            "subtype": log.get('type', 'log'),
+            "text": log.get('text', 'Unknown message'),
+            "timestamp": log.get('timestamp', 0)
+        } for log in all_console_logs)
+        
+        request_events = ({
+            "type": "network_request",
+            "method": req.get('method', 'GET'),
+            "url": req.get('url', 'Unknown URL'),
+            "timestamp": req.get('timestamp', 0)
+        } for req in all_network_requests)
+        
+        # Responses complete in any order, so only this (JSON-only) stream needs sorting
+        response_events = sorted(({
+            "type": "network_response",
+            "method": req.get('method', 'GET'),
+            "url": req.get('url', 'Unknown URL'),
+            "status": req.get('response_status', 'N/A'),
+            "timestamp": req.get('response_timestamp', 0)
+        } for req in all_network_requests if 'response_timestamp' in req), key=_event_time)
+        
+        all_events = heapq.merge(console_events, request_events, response_events, agent_steps_timeline, key=_event_time)
+        total_events = len(all_console_logs) + len(all_network_requests) + len(response_events) + len(agent_steps_timeline)
+        
+        # Format the timeline, rendering events only until the budget is reached
+        report.append("\n\n⏱️ Chronological Timeline of All Events:\n")
+        timeline = ReportSection(MAX_TIMELINE_CHARS).extend(all_events, lambda i, event: format_timeline_event(event), total=total_events)
+        report.append(timeline.render("events"))
     
     except Exception as e:
-        # If parsing fails, return a simpler message with the raw result
-        # Show more of the raw result (increased from 200 to 10000 characters)
-        return f"{formatted}⚠️ Result parsing failed: {e}\nRaw result: {result_str[:10000]}...\n"
+        # If formatting fails, return a simpler message with the raw result
+        report.append(f"⚠️ Result formatting failed: {e}\nRaw result: {result_str[:10000]}...\n")
     
-    return formatted
+    return "".join(report)
+
+def build_result_document(result_str: str, url: str, task: str, console_logs=None, network_requests=None,
+                          step_timings=None, history=None, screenshots=None, console_groups=None,
+                          gallery_ids=None) -> Dict[str, Any]:
+    """Build the machine-readable evaluation result for output_format="json".
+    
+    Built directly from the captured structures, without the text report. Screenshots are
+    referenced by their index in the dashboard gallery instead of being inlined; the id is
+    None for screenshots the gallery does not keep (invalid, or beyond its last 50).
+    
+    Args:
+        result_str: Final result text of the run, or the error message if the run failed
+        url: The URL that was evaluated
+        task: The task that was executed
+        console_logs: Collected console logs from the browser
+        network_requests: Collected network requests from the browser
+        step_timings: Per-step latency breakdown from run_browser_task
+        history: The structured AgentHistoryList of the run
+        screenshots: Screenshot entries captured during the run
+        console_groups: ConsoleGroups of the run; if given, console errors are aggregated
+        gallery_ids: Gallery index by index in `screenshots` (see log_server.gallery_positions)
+        
+    Returns:
+        Dict[str, Any]: JSON-serializable result document
+    """
+    console_logs = console_logs or []
+    network_requests = network_requests or []
+    screenshots = screenshots or []
+    gallery_ids = gallery_ids or {}
+    failed = result_str.startswith("Error")
+    
+    if console_groups is not None:
+        console_errors = [
+            {"text": g['text'], "location": g['location'], "count": g['count'],
+             "first_timestamp": g['first_timestamp'], "last_timestamp": g['last_timestamp']}
+            for g in console_groups.list('error')
+        ]
+    else:
+        console_errors = [
+            {"text": log.get('text', ''), "location": log.get('location'), "count": 1,
+             "first_timestamp": log.get('timestamp'), "last_timestamp": log.get('timestamp')}
+            for log in console_logs if log.get('type') == 'error'
+        ]
+    failed_requests = [
+        {
+            "method": req.get('method', 'GET'),
+            "url": req.get('url'),
+            "status": req.get('response_status'),
+            "timestamp": req.get('timestamp'),
+        }
+        for req in network_requests if is_error_network_entry(req)
+    ]
+    
+    return {
+        "version": JSON_RESULT_VERSION,
+        "url": url,
+        "task": task,
+        "success": is_task_successful({"result": result_str, "history": history}),
+        "done": bool(history is not None and history.is_done()),
+        "result": None if failed else result_str,
+        "error": result_str if failed else None,
+        "steps": iter_agent_steps(history) if history is not None else [],
+        "console_errors": console_errors[:MAX_JSON_LIST_ITEMS],
+        "failed_requests": failed_requests[:MAX_JSON_LIST_ITEMS],
+        "counts": {
+            "console_logs": len(console_logs),
+            "console_errors": sum(e['count'] for e in console_errors),
+            "distinct_console_errors": len(console_errors),
+            "network_requests": len(network_requests),
+            "failed_requests": len(failed_requests),
+            "screenshots": len(screenshots),
+        },
+        "timings": (step_timings or {}).get("totals"),
+        "screenshots": [
+            {"id": gallery_ids.get(i), "step": s.get('step'), "url": s.get('url'), "timestamp": s.get('timestamp')}
+            for i, s in enumerate(screenshots) if isinstance(s, dict)
+        ],
+    }
 
 async def handle_setup_browser_state(arguments: Dict[str, Any], ctx: Context, api_key: str) -> list[TextContent]:
     """Handle setup_browser_state tool calls
@@ -680,8 +795,7 @@ async def handle_setup_browser_state(arguments: Dict[str, Any], ctx: Context, ap
     """
     # Initialize log server
     try:
-        start_log_server()
-        await asyncio.sleep(1)
+        await asyncio.to_thread(start_log_server)
         open_log_dashboard()
         send_log("Log dashboard initialized for browser state setup", "🚀")
     except Exception as log_server_error:
@@ -696,9 +810,9 @@ async def handle_setup_browser_state(arguments: Dict[str, Any], ctx: Context, ap
         send_log(f"Added https:// protocol to URL: {url}", "🔗")
     
     # Ensure the state directory exists
-    state_dir = os.path.expanduser("~/.operative/browser_state")
+    state_dir = STATE_DIR
     os.makedirs(state_dir, exist_ok=True)
-    state_file = os.path.join(state_dir, "state.json")
+    state_file = STATE_FILE
     
     send_log(f"🚀 Starting interactive login session", "🚀")
     send_log(f"Browser state will be saved to {state_file}", "💾")
@@ -805,6 +919,7 @@ async def handle_setup_browser_state(arguments: Dict[str, Any], ctx: Context, ap
         
         # Save the browser state to a file
         await context.storage_state(path=state_file)
+        invalidate_persisted_state()
         
         # Also save cookies for debugging purposes
         cookies = await context.cookies()